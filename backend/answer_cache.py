@@ -0,0 +1,98 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# --- CONFIGURATION ---
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))  # cosine similarity
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "500"))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", str(6 * 3600)))  # seconds
+
+
+class SemanticAnswerCache:
+    """
+    Answers keyed by query embedding. A lookup returns a stored answer when a
+    previous question is at least `threshold` cosine-similar, so paraphrases
+    of the same FAQ skip retrieval and the LLM.
+
+    Entries expire after `ttl`, the least recently used one is evicted past
+    `max_entries`, and everything is dropped when the knowledge-base
+    generation changes (a new ingest was published).
+    """
+
+    def __init__(self, threshold=ANSWER_CACHE_THRESHOLD, max_entries=ANSWER_CACHE_MAX_ENTRIES, ttl=ANSWER_CACHE_TTL):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.generation = None
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+        self._entries = OrderedDict()  # id -> (unit vector, answer, stored_at)
+        self._matrix = None            # stacked unit vectors, rebuilt lazily
+        self._ids = []
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _unit(vector):
+        v = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(v)
+        return v / norm if norm else v
+
+    def _check_generation(self, generation):
+        if generation != self.generation:
+            if self._entries:
+                self.stats["invalidations"] += 1
+            self._entries.clear()
+            self._matrix = None
+            self.generation = generation
+
+    def _expire(self):
+        cutoff = time.monotonic() - self.ttl
+        stale = [k for k, (_, _, stored_at) in self._entries.items() if stored_at < cutoff]
+        for k in stale:
+            del self._entries[k]
+        if stale:
+            self.stats["expirations"] += len(stale)
+            self._matrix = None
+
+    def get(self, query_vector, generation):
+        """Returns the cached answer for a similar enough question, or None."""
+        with self._lock:
+            self._check_generation(generation)
+            self._expire()
+            if not self._entries:
+                self.stats["misses"] += 1
+                return None
+            if self._matrix is None:
+                self._ids = list(self._entries.keys())
+                self._matrix = np.stack([self._entries[k][0] for k in self._ids])
+            scores = self._matrix @ self._unit(query_vector)
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                self.stats["misses"] += 1
+                return None
+            key = self._ids[best]
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return self._entries[key][1]
+
+    def put(self, query_vector, answer, generation):
+        with self._lock:
+            self._check_generation(generation)
+            self._entries[self._next_id] = (self._unit(query_vector), answer, time.monotonic())
+            self._next_id += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+            self._matrix = None
+
+    def snapshot(self):
+        total = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "entries": len(self._entries),
+            "hit_ratio": round(self.stats["hits"] / total, 4) if total else 0.0,
+            "generation": self.generation,
+        }
@@ -366,37 +366,209 @@
 
 #--------------------------------------------------------------------------------------------------------------
 
-from datetime import time
+import asyncio
 import os
+import time
+import threading
 from typing import TypedDict, Annotated, List, Union, Literal
 from langchain_core.messages import SystemMessage, AIMessage, BaseMessage
 from langgraph.graph import StateGraph, END
-from langgraph.checkpoint.memory import MemorySaver
 from langgraph.graph.message import add_messages
 
-# Validation Imports
-from email_validator import validate_email, EmailNotValidError
-import phonenumbers
-from phonenumbers import NumberParseException
-
-# Model Imports
-from langchain_google_genai import ChatGoogleGenerativeAI, GoogleGenerativeAIEmbeddings
-from langchain_pinecone import PineconeVectorStore
-from backend.dynamo_db import save_lead_dynamo, get_user_stats, increment_counter, append_chat_history
+# Validation and model SDKs (phonenumbers, langchain_google_genai, langchain_pinecone)
+# are imported where they're first used: a Lambda cold start only pays for the ones
+# the first request actually needs. email_validator is imported up front: FastAPI
+# loads it at start-up anyway (scripts/bench_cold_start.py times it with the rest).
+from email_validator import EmailNotValidError
+from backend.dynamo_db import (
+    asave_lead_dynamo, aget_user_stats, aincrement_counter, arecord_turn, get_index_generation
+)
+from backend.answer_cache import SemanticAnswerCache
+from backend.index_registry import current_index
+from backend import retrieval
+from backend.context_packer import pack_context
+from backend.lexical_index import doc_key, fuse, lexical_only
+from backend import intents
+from backend.validators import acheck_email
+from backend import metrics
+from backend.clients import Lazy, LazyProxy
+from backend.checkpointer import build_checkpointer
+from backend.resilience import (
+    llm_breaker, embedding_breaker, call_with_backoff, backoff_delay, is_rate_limit_error, BreakerOpen,
+)
 
 # --- CONFIGURATION ---
 PINECONE_INDEX_NAME = os.getenv("PINECONE_INDEX_NAME")
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
+# "pinecone" (default) or "local": memory-mapped snapshot from `scripts/ingest.py --snapshot`
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "pinecone").lower()
+LOCAL_INDEX_PATH = os.getenv("LOCAL_INDEX_PATH", "backend/index")
+# BM25 index from `scripts/ingest.py`, fused with the vector results (absent = vector only)
+LEXICAL_INDEX_PATH = os.getenv("LEXICAL_INDEX_PATH", "backend/lexical")
+# Messages kept in the session state (0 = keep all). Nodes only read the latest
+# one, and the full conversation is in the messages table, so a short window
+# keeps every checkpoint the same size however long the chat runs. Min 2: the
+# email node greets a session that has no earlier message.
+MESSAGE_WINDOW = int(os.getenv("MESSAGE_WINDOW", "6"))
+# Gemini retries: a throttled turn gives up (and answers in degraded mode) after
+# LLM_DEADLINE seconds instead of queueing behind the provider's quota
+LLM_MAX_ATTEMPTS = int(os.getenv("LLM_MAX_ATTEMPTS", "3"))
+LLM_DEADLINE = float(os.getenv("LLM_DEADLINE", "12"))
+# Used until an index alias with its own model has been published
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "models/text-embedding-004")
+
+# --- CLIENTS (built on first use, thread-safe) ---
+def _build_llm():
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    return ChatGoogleGenerativeAI(model="gemini-flash-latest", temperature=0, google_api_key=GOOGLE_API_KEY)
+
+llm = LazyProxy(_build_llm, "gemini")
+
+# One embeddings client per model and one vector store per (index, model): the
+# published alias picks which (scripts/reindex.py switches it blue/green)
+_embedders = {}
+_stores = {}
+_clients_lock = threading.Lock()
+
+def get_embeddings(model=EMBEDDING_MODEL):
+    with _clients_lock:
+        if model not in _embedders:
+            from langchain_google_genai import GoogleGenerativeAIEmbeddings
+            _embedders[model] = GoogleGenerativeAIEmbeddings(model=model)
+        return _embedders[model]
+
+def _build_local_index():
+    from backend.local_index import LocalVectorIndex
+    index = LocalVectorIndex(LOCAL_INDEX_PATH)
+    index.embeddings = get_embeddings(index.model or EMBEDDING_MODEL)
+    return index
+
+_local_index = Lazy(_build_local_index, "local_index")
+
+def _build_lexical_index():
+    from backend.lexical_index import LexicalIndex, META_FILE
+    if not os.path.exists(os.path.join(LEXICAL_INDEX_PATH, META_FILE)):
+        print(f"⚠️ No lexical index at {LEXICAL_INDEX_PATH}: retrieval is vector-only (run scripts/ingest.py)")
+        return None
+    return LexicalIndex(LEXICAL_INDEX_PATH)
+
+_lexical_index = Lazy(_build_lexical_index, "lexical_index")
+
+def lexical_search(text):
+    """BM25 candidates for the question: (results, decisive). ([], False) without an index."""
+    index = _lexical_index.get()
+    return index.search(text) if index is not None else ([], False)
+
+def get_vector_store(index_name=PINECONE_INDEX_NAME, model=EMBEDDING_MODEL):
+    # The local snapshot only serves queries embedded with its own model; otherwise Pinecone does
+    if VECTOR_BACKEND == "local" and _local_index.get().matches(model):
+        return _local_index.get()
+    embedder = get_embeddings(model)
+    with _clients_lock:
+        key = (index_name, model)
+        if key not in _stores:
+            from langchain_pinecone import PineconeVectorStore
+            if _stores:
+                print(f"🔀 Switching to vector index '{index_name}' ({model})")
+            _stores[key] = PineconeVectorStore(index_name=index_name, embedding=embedder)
+        return _stores[key]
+
+def resolve_index(published):
+    """(embeddings, vector_store) for the published alias; falls back to the env-configured index."""
+    model = published.get("embedding_model") or EMBEDDING_MODEL
+    return get_embeddings(model), get_vector_store(published.get("index_name") or PINECONE_INDEX_NAME, model)
+
+def warm_up():
+    """
+    Builds every client and opens its connections before the first request
+    (Lambda init phase, scheduled warmer pings). Failures are reported, not
+    raised. Returns seconds spent per step.
+    """
+    timings = {}
+    steps = [
+        ("dynamodb", get_index_generation),  # boto3 + config table + TLS handshake
+        ("gemini", llm.get),
+        ("vector_store", lambda: resolve_index(get_index_generation())),
+        ("lexical_index", _lexical_index.get),
+        ("intent_model", intents.model.get),
+    ]
+    if VECTOR_BACKEND != "local":
+        steps.append(("pinecone", lambda: resolve_index(get_index_generation())[1].index.describe_index_stats()))
+    for name, step in steps:
+        started = time.perf_counter()
+        try:
+            step()
+        except Exception as e:
+            print(f"⚠️ Warm-up {name} failed: {e}")
+        timings[name] = round(time.perf_counter() - started, 3)
+    print(f"🔥 Warm-up done: {timings}")
+    return timings
 
-llm = ChatGoogleGenerativeAI(model="gemini-flash-latest", temperature=0, google_api_key=GOOGLE_API_KEY)
-embeddings = GoogleGenerativeAIEmbeddings(model="models/text-embedding-004")
-vector_store = PineconeVectorStore(index_name=PINECONE_INDEX_NAME, embedding=embeddings)
+# FAQ answers reused across sessions (see backend/answer_cache.py)
+answer_cache = SemanticAnswerCache()
 
 # --- STATE ---
+class LeadProfile(TypedDict):
+    is_registered: bool
+    guest_count: int
+    post_reg_count: int
+
+def add_messages_window(left, right):
+    """add_messages, then drop all but the newest MESSAGE_WINDOW messages."""
+    merged = add_messages(left, right)
+    if MESSAGE_WINDOW <= 0: return merged
+    return merged[-max(MESSAGE_WINDOW, 2):]
+
 class AgentState(TypedDict):
-    messages: Annotated[List[BaseMessage], add_messages]
+    messages: Annotated[List[BaseMessage], add_messages_window]
     email: Union[str, None]
     dialog_state: Literal["chatting", "asking_details", "limit_reached"]
+    # Write-through copy of the lead's counters, so a turn reads DynamoDB at most once
+    profile: Union[LeadProfile, None]
+
+# Dynamo reads done vs. avoided thanks to the cached profile
+PROFILE_STATS = {"dynamo_reads": 0, "reads_saved": 0}
+# Replies served without Gemini, by source
+DEGRADED_STATS = {"cached_answer": 0, "context": 0, "apology": 0}
+
+BUSY_REPLY = "I'm experiencing high traffic right now. Please try asking again in a moment."
+
+# --- HELPERS ---
+def get_text(raw_content) -> str:
+    """Extracts plain text from a Gemini message content (str or list of blocks)."""
+    # Gemini sometimes returns a list [{'text': '...', 'extras': ...}]
+    if isinstance(raw_content, list):
+        return " ".join([
+            block if isinstance(block, str) else block.get("text", "")
+            for block in raw_content
+            if isinstance(block, str) or block.get("type") == "text"
+        ])
+    return str(raw_content)
+
+async def load_profile(state: AgentState) -> LeadProfile:
+    """Returns the cached profile, reading DynamoDB only when the session has none yet. Raises if the read fails."""
+    profile = state.get("profile")
+    if profile:
+        PROFILE_STATS["reads_saved"] += 1
+        return profile
+    PROFILE_STATS["dynamo_reads"] += 1
+    return await aget_user_stats(state.get("email"))
+
+# --- PROFILE NODE ---
+async def load_profile_node(state: AgentState):
+    """
+    Entry step: makes sure `profile` is populated before the router looks at
+    it. If DynamoDB fails it stays unset, so the next turn reads it again.
+    """
+    if not state.get("email"):
+        return {}
+    cached = state.get("profile")
+    try:
+        profile = await load_profile(state)
+    except Exception as e:
+        print(f"⚠️ Profile not loaded, retrying next turn: {e}")
+        return {}
+    return {} if profile is cached else {"profile": profile}
 
 # --- ROUTER NODE ---
 def router_node(state: AgentState):
@@ -404,17 +576,23 @@ def router_node(state: AgentState):
         email = state.get("email")
         if not email: return "email_collection"
 
-        stats = get_user_stats(email)
-        
         # Check explicit dialog state first
         if state.get("dialog_state") == "asking_details":
             return "process_details_simple"
 
-        # Check Limits
-        if stats["is_registered"]:
-            return "limit_exhausted" if stats["post_reg_count"] >= 6 else "rag_chat"
-        else:
-            return "ask_details_consolidated" if stats["guest_count"] >= 3 else "rag_chat"
+        stats = state.get("profile")
+        if stats:
+            # Check Limits
+            if stats["is_registered"] and stats["post_reg_count"] >= 6:
+                return "limit_exhausted"
+            if not stats["is_registered"] and stats["guest_count"] >= 3:
+                return "ask_details_consolidated"
+
+        # Fast path: greetings, thanks and FAQ intents skip retrieval (and the LLM)
+        intent = intents.classify(get_text(state["messages"][-1].content))
+        if intent:
+            return "intent_reply" if intents.canned_answer(intent) else "small_talk"
+        return "rag_chat"
             
     except Exception as e:
         print(f"❌ Router Error: {e}")
@@ -422,7 +600,7 @@ def router_node(state: AgentState):
 
 # --- NODES ---
 
-def email_collection_node(state: AgentState):
+async def email_collection_node(state: AgentState):
     try:
         messages = state["messages"]
         last_msg = messages[-1].content.strip()
@@ -430,20 +608,20 @@ def email_collection_node(state: AgentState):
         if len(messages) <= 1:
             return {"messages": [AIMessage(content="Welcome to MH Cockpit! To get started, please share your **Email ID**.")]}
 
-        # Validate Email (check_deliverability=False is faster and safer)
-        v = validate_email(last_msg, check_deliverability=False) 
-        normalized_email = v.email 
+        # Validate Email: syntax, then the domain's MX/A records through the
+        # per-domain cache (common providers and known domains cost nothing)
+        normalized_email = await acheck_email(last_msg)
         
         # Save
-        save_lead_dynamo(email=normalized_email)
-        append_chat_history(normalized_email, "user", last_msg)
+        await asave_lead_dynamo(email=normalized_email)
         
         bot_msg = "Thanks! How can I help you today?"
-        append_chat_history(normalized_email, "bot", bot_msg)
+        await arecord_turn(normalized_email, ("user", last_msg), ("bot", bot_msg))
         
         return {
             "email": normalized_email, 
-            "messages": [AIMessage(content=bot_msg)]
+            "messages": [AIMessage(content=bot_msg)],
+            "profile": None # Loaded once on the next turn (returning leads keep their counts)
         }
     except EmailNotValidError:
         return {"messages": [AIMessage(content="That doesn't look like a valid email. Please try again.")]}
@@ -451,18 +629,17 @@ def email_collection_node(state: AgentState):
         print(f"❌ Email Node Error: {e}")
         return {"messages": [AIMessage(content="Something went wrong. Please enter your email again.")]}
 
-def ask_details_consolidated_node(state: AgentState):
+async def ask_details_consolidated_node(state: AgentState):
     try:
         email = state.get("email")
         user_query = state["messages"][-1].content
-        append_chat_history(email, "user", user_query)
 
         msg = (
             "To continue providing you with accurate details, please share your info in this **EXACT format**:\n\n"
             "**Name, School, City, Phone Number**\n"
             "*(Example: Koppesh, DPS, Chennai, 9876543210)*"
         )
-        append_chat_history(email, "bot", msg)
+        await arecord_turn(email, ("user", user_query), ("bot", msg))
 
         return {
             "messages": [AIMessage(content=msg)],
@@ -472,11 +649,10 @@ def ask_details_consolidated_node(state: AgentState):
         print(f"❌ Ask Details Error: {e}")
         return {"messages": [AIMessage(content="Please share your Name, School, City, and Phone.")], "dialog_state": "asking_details"}
 
-def process_details_simple_node(state: AgentState):
+async def process_details_simple_node(state: AgentState):
     try:
         user_input = state["messages"][-1].content.strip()
         email = state.get("email")
-        append_chat_history(email, "user", user_input)
 
         parts = [p.strip() for p in user_input.split(",")]
 
@@ -484,149 +660,332 @@ def process_details_simple_node(state: AgentState):
             name, school, city, phone_raw = parts[0], parts[1], parts[2], parts[3]
             
             # Strict Phone Check
+            import phonenumbers
             try:
                 parsed_number = phonenumbers.parse(phone_raw, "IN")
                 if phonenumbers.is_valid_number(parsed_number):
                     formatted_phone = phonenumbers.format_number(parsed_number, phonenumbers.PhoneNumberFormat.E164)
                     
                     # SAVE TO DB
-                    success = save_lead_dynamo(email=email, name=name, school=school, city=city, phone=formatted_phone, mark_registered=True)
+                    success = await asave_lead_dynamo(email=email, name=name, school=school, city=city, phone=formatted_phone, mark_registered=True)
                     
                     if success:
                         bot_msg = "Thank you! Your details are updated. You can now continue chatting."
-                        append_chat_history(email, "bot", bot_msg)
+                        await arecord_turn(email, ("user", user_input), ("bot", bot_msg))
+                        profile = state.get("profile")
+                        if profile:
+                            # Mirrors save_lead_dynamo(mark_registered=True)
+                            profile = {**profile, "is_registered": True}
                         return {
                             "messages": [AIMessage(content=bot_msg)],
-                            "dialog_state": "chatting"
+                            "dialog_state": "chatting",
+                            "profile": profile
                         }
                     else:
                         bot_msg = "System error saving details. Please try again."
-                        append_chat_history(email, "bot", bot_msg)
+                        await arecord_turn(email, ("user", user_input), ("bot", bot_msg))
                         return {"messages": [AIMessage(content=bot_msg)]}
                         
                 else:
                     raise ValueError("Invalid Number")
-            except:
+            except (phonenumbers.NumberParseException, ValueError):
                 bot_msg = "Invalid phone number. Please enter a valid 10-digit number."
-                append_chat_history(email, "bot", bot_msg)
+                await arecord_turn(email, ("user", user_input), ("bot", bot_msg))
                 return {"messages": [AIMessage(content=bot_msg)], "dialog_state": "asking_details"}
         else:
             bot_msg = "Please use the exact format: **Name, School, City, Phone Number**"
-            append_chat_history(email, "bot", bot_msg)
+            await arecord_turn(email, ("user", user_input), ("bot", bot_msg))
             return {"messages": [AIMessage(content=bot_msg)], "dialog_state": "asking_details"}
             
     except Exception as e:
         print(f"❌ Process Details Error: {e}")
         return {"messages": [AIMessage(content="Error processing details. Please try again.")]}
 
-def rag_chat_node(state: AgentState):
+def degraded_reply(query_vector, generation, docs):
     """
-    RAG Chat with AUTO-RETRY and CLEAN TEXT EXTRACTION.
+    Fast answer without Gemini (breaker open or retries exhausted): a cached
+    answer to the same question (another session may have stored one since
+    this turn missed), else the top retrieved passages, else an apology.
+    """
+    if query_vector is not None:
+        cached = answer_cache.get(query_vector, generation)
+        if cached:
+            DEGRADED_STATS["cached_answer"] += 1
+            return cached
+    passages = [" ".join(d.page_content.split())[:300] for d in docs[:2] if d.page_content.strip()]
+    if passages:
+        DEGRADED_STATS["context"] += 1
+        return ("Our assistant is very busy right now, but here is what we found in our brochures:\n\n"
+                + "\n".join(f"- {p}" for p in passages))
+    DEGRADED_STATS["apology"] += 1
+    return BUSY_REPLY
+
+async def retrieve_docs(store, user_message, query_vector, generation, lexical=(), decisive=False):
+    """
+    Candidate chunks for the question as [(doc, score)], best first: vector
+    results fused with the BM25 ones in `lexical`. A decisive lexical hit
+    without an embedding is used on its own. Falls back to the lexical hits
+    (or []) if vector search fails; the LLM still answers general questions.
     """
-    email = state.get("email")
-    user_query = state["messages"][-1].content
-    
-    # 1. Save User Query
-    append_chat_history(email, "user", user_query)
-    
-    # 2. Update Stats (Fail-safe)
     try:
-        stats = get_user_stats(email)
-        increment_counter(email, is_registered=stats["is_registered"])
-    except: pass
+        if query_vector is not None:
+            scored = await retrieval.search(store, query_vector, retrieval.RETRIEVAL_CANDIDATES, generation)
+            return fuse(scored, lexical) if lexical else scored
+        if decisive:
+            return lexical_only(lexical)
+        if embedding_breaker.allow():
+            # Text search embeds the question itself (no scores: the packer keeps its ranking)
+            async def text_search():
+                with metrics.dependency("vector", "text_search"):
+                    return await store.asimilarity_search(user_message.content, k=4)
+            docs = await call_with_backoff(embedding_breaker, text_search, attempts=1)
+            return fuse([(d, None) for d in docs], lexical)
+    except Exception as e:
+        if not isinstance(e, BreakerOpen):
+            print(f"⚠️ RAG Search Warning: {e}")
+    return lexical_only(lexical)
 
-    # 3. RAG + CHAT (With Retry Loop)
-    max_retries = 3
-    context = ""
+async def generate_rag_reply(user_message, query_vector=None, generation=0, store=None, lexical=(), decisive=False):
+    """
+    Retrieval + Gemini generation with jittered exponential backoff (on the
+    event loop) and CLEAN TEXT EXTRACTION. While Gemini is throttled the
+    process-wide breaker is open and a degraded reply is returned at once.
+    Returns (reply, message_id, complete); `complete` is False for partial,
+    degraded or fallback replies.
+    """
+    store = store or get_vector_store()
+    deadline = time.monotonic() + LLM_DEADLINE
     bot_reply = ""
-
-    for attempt in range(max_retries):
+    reply_id = None
+    complete = False
+
+    # A. RAG Search (reuses the query embedding when we have one, fused with
+    # the BM25 hits), then keep only relevant, non-overlapping text within
+    # CONTEXT_TOKEN_BUDGET
+    scored_docs = await retrieve_docs(store, user_message, query_vector, generation, lexical, decisive)
+    context, docs = pack_context(scored_docs)
+
+    # B. LLM Generation
+    system_prompt = (
+         "ROLE: You are the Official AI Assistant for **MH Cockpit Aviation Academy**.\n"
+         "TONE: Professional, welcoming, and confident. Always use 'We' to refer to the academy.\n"
+         "GOAL: Convert inquiries into interest. Highlight our 'industry-leading' training, 'top-tier' partnerships (like VELS), and excellent placement records.\n\n"
+         
+         "INSTRUCTIONS:\n"
+         "1. **Use Context First:** Use the CONTEXT DATA below to answer. If the context has specific lists (fees, recruiters, aircraft), present them clearly with bullet points.\n"
+         "2. **Be Biased:** Always speak favorably about MH Cockpit. If asked about competitors, politely pivot back to our unique strengths (Safety, Infrastructure, Faculty).\n"
+         "3. **Format:** Use **Bold** for key terms. Use bullet points for lists. Keep paragraphs short and readable.\n"
+         "4. **Scope:** If the context is empty and the question is about general aviation (e.g., 'What is lift?'), answer it correctly. If it's unrelated (e.g., 'Who is Messi?'), politely refuse.\n"
+         "5. **Clean Output:** Do not output JSON or metadata. Just the plain text response.\n\n"
+         
+         f"CONTEXT DATA:\n{context}"
+    )
+
+    for attempt in range(LLM_MAX_ATTEMPTS):
+        if not llm_breaker.allow():
+            return degraded_reply(query_vector, generation, docs), None, False
+        response = None
         try:
-            # A. Try RAG Search
-            try:
-                docs = vector_store.similarity_search(user_query, k=4)
-                context = "\n".join([d.page_content for d in docs])
-            except Exception as e:
-                print(f"⚠️ RAG Search Warning: {e}")
-                context = "" # Continue even if RAG fails
-
-            # B. Try LLM Generation
-            system_prompt = (
-                 "ROLE: You are the Official AI Assistant for **MH Cockpit Aviation Academy**.\n"
-                 "TONE: Professional, welcoming, and confident. Always use 'We' to refer to the academy.\n"
-                 "GOAL: Convert inquiries into interest. Highlight our 'industry-leading' training, 'top-tier' partnerships (like VELS), and excellent placement records.\n\n"
-                 
-                 "INSTRUCTIONS:\n"
-                 "1. **Use Context First:** Use the CONTEXT DATA below to answer. If the context has specific lists (fees, recruiters, aircraft), present them clearly with bullet points.\n"
-                 "2. **Be Biased:** Always speak favorably about MH Cockpit. If asked about competitors, politely pivot back to our unique strengths (Safety, Infrastructure, Faculty).\n"
-                 "3. **Format:** Use **Bold** for key terms. Use bullet points for lists. Keep paragraphs short and readable.\n"
-                 "4. **Scope:** If the context is empty and the question is about general aviation (e.g., 'What is lift?'), answer it correctly. If it's unrelated (e.g., 'Who is Messi?'), politely refuse.\n"
-                 "5. **Clean Output:** Do not output JSON or metadata. Just the plain text response.\n\n"
-                 
-                 f"CONTEXT DATA:\n{context}"
-            )
-            
-            response = llm.invoke([SystemMessage(content=system_prompt), state["messages"][-1]])
-            
+            # Stream tokens: `app.astream(..., stream_mode="messages")` forwards
+            # each chunk to the client as it arrives (see /chat/stream).
+            with metrics.dependency("gemini", "rag_answer"):
+                async for chunk in llm.astream([SystemMessage(content=system_prompt), user_message]):
+                    response = chunk if response is None else response + chunk
+            llm_breaker.record_success()
+
             # --- 🛡️ CLEANER: EXTRACT TEXT FROM GEMINI RESPONSE ---
-            # Gemini sometimes returns a list [{'text': '...', 'extras': ...}]
-            raw_content = response.content
-            
-            if isinstance(raw_content, list):
-                # It's a list! Extract only the text parts.
-                bot_reply = " ".join([block.get("text", "") for block in raw_content if block.get("type") == "text"])
-            else:
-                # It's already a string.
-                bot_reply = str(raw_content)
-            # -----------------------------------------------------
-
-            # If successful, break the retry loop
-            break 
-            
+            bot_reply = get_text(response.content) if response is not None else ""
+            reply_id = response.id if response is not None else None
+            complete = bool(bot_reply)
+            break
+
         except Exception as e:
-            error_msg = str(e)
-            print(f"❌ Attempt {attempt+1} Failed: {error_msg}")
-            
-            # Check for Rate Limits (429 or Resource Exhausted)
-            if "429" in error_msg or "RESOURCE_EXHAUSTED" in error_msg:
-                if attempt < max_retries - 1:
-                    print("⏳ Rate Limit Hit. Sleeping 2 seconds...")
-                    time.sleep(2) 
-                    continue
-            
-            # If it's the last attempt, return error message
-            if attempt == max_retries - 1:
-                bot_reply = "I'm experiencing high traffic right now. Please try asking again in a moment."
+            print(f"❌ Attempt {attempt+1} Failed: {e}")
+            llm_breaker.record_failure(e)
+
+            # Tokens already reached the client: keep the partial answer, don't repeat it
+            if response is not None:
+                bot_reply = get_text(response.content)
+                reply_id = response.id
+                break
+
+            # Back off without blocking the event loop, unless that would blow the deadline
+            delay = backoff_delay(attempt)
+            if attempt < LLM_MAX_ATTEMPTS - 1 and time.monotonic() + delay < deadline:
+                if is_rate_limit_error(e):
+                    print(f"⏳ Rate Limit Hit. Retrying in {delay:.1f}s...")
+                await asyncio.sleep(delay)
+                continue
+            bot_reply = degraded_reply(query_vector, generation, docs) if is_rate_limit_error(e) else BUSY_REPLY
+            break
+        except BaseException:
+            llm_breaker.release_probe()  # cancelled (client gone): no verdict on Gemini
+            raise
+
+    return bot_reply, reply_id, complete
+
+async def answer_question(user_message, published):
+    """
+    Embedding, answer cache, retrieval and Gemini for one question: no
+    per-user side effects, so concurrent identical questions can share it.
+    Returns (reply, message_id).
+    """
+    generation = published["generation"]
+    user_query = user_message.content
 
-    # 4. Save Bot Reply & Return
-    append_chat_history(email, "bot", bot_reply)
-    return {"messages": [AIMessage(content=bot_reply)]}
+    # Exact terms (aircraft models, "DGCA", fee figures) first: BM25 is in-process and sub-millisecond
+    lexical, decisive = lexical_search(user_query)
 
-def limit_exhausted_node(state: AgentState):
+    # Embed once with the live index's model: the same vector keys the answer cache and drives the search.
+    # A decisive lexical hit skips the embedding API call (a vector already cached is still used).
+    query_embeddings, store = resolve_index(published)
+    query_vector = retrieval.cached_query_vector(query_embeddings, user_query) if decisive else None
+    try:
+        if not decisive:
+            query_vector = await call_with_backoff(
+                embedding_breaker, lambda: retrieval.embed_query(query_embeddings, user_query), attempts=2)
+    except BreakerOpen:
+        pass  # embeddings throttled: answer without the cache / vector search
+    except Exception as e:
+        print(f"⚠️ Embedding Warning: {e}")
+
+    # Cache hit -> no retrieval, no LLM. Decisive lexical hits without a vector are keyed on the hit itself.
+    lexical_key = f"{doc_key(lexical[0][0])}:{retrieval.normalize_query(user_query)}" if decisive else None
+    if lexical_key:
+        retrieval.lexical_answer_cache.check_version(generation)
+    bot_reply = answer_cache.get(query_vector, generation) if query_vector is not None else None
+    if bot_reply is None and lexical_key:
+        bot_reply = retrieval.lexical_answer_cache.get(lexical_key)
+    reply_id = None
+    if bot_reply is None:
+        bot_reply, reply_id, complete = await generate_rag_reply(
+            user_message, query_vector, generation, store, lexical, decisive)
+        if complete and query_vector is not None:
+            answer_cache.put(query_vector, bot_reply, generation)
+        if complete and lexical_key:
+            retrieval.lexical_answer_cache.put(lexical_key, bot_reply, len(bot_reply.encode()) + len(lexical_key))
+    return bot_reply, reply_id
+
+async def count_question(state: AgentState):
+    """
+    Adds the turn to the lead's question count. Returns the profile to store
+    (fail-safe, write-through): unchanged if the read or the write failed.
+    """
+    email = state.get("email")
+    profile = state.get("profile")
+    try:
+        stats = await load_profile(state)
+        await aincrement_counter(email, is_registered=stats["is_registered"])
+        field_name = "post_reg_count" if stats["is_registered"] else "guest_count"
+        profile = {**stats, field_name: stats[field_name] + 1}
+    except Exception as e:
+        print(f"⚠️ Question not counted for {email}: {e}")
+    return profile
+
+async def intent_reply_node(state: AgentState):
+    """Curated answer for a recognised intent: no embedding, retrieval or Gemini."""
+    started = time.perf_counter()
+    email = state.get("email")
+    user_query = state["messages"][-1].content
+    intent = intents.classify(get_text(user_query))
+    bot_msg = intents.canned_answer(intent)
+    update = {"messages": [AIMessage(content=bot_msg)]}
+    if intents.counts_as_question(intent):
+        update["profile"] = await count_question(state)
+    await arecord_turn(email, ("user", user_query), ("bot", bot_msg))
+    intents.record(intent, time.perf_counter() - started)
+    return update
+
+async def generate_small_talk(user_message):
+    """Short Gemini reply without retrieval; the canned greeting if Gemini is throttled or fails."""
+    system_prompt = (
+        "You are the Official AI Assistant for **MH Cockpit Aviation Academy**. The user is making small talk. "
+        "Reply warmly in one or two short sentences and invite them to ask about our pilot training, "
+        "fleet, fees or admissions. Do not state facts about courses, fees or dates."
+    )
+    if llm_breaker.allow():
+        try:
+            response = None
+            with metrics.dependency("gemini", "small_talk"):
+                async for chunk in llm.astream([SystemMessage(content=system_prompt), user_message]):
+                    response = chunk if response is None else response + chunk
+            llm_breaker.record_success()
+            if response is not None and get_text(response.content).strip():
+                return get_text(response.content), response.id
+        except Exception as e:
+            llm_breaker.record_failure(e)
+            print(f"⚠️ Small Talk Warning: {e}")
+        except BaseException:
+            llm_breaker.release_probe()  # cancelled (client gone): no verdict on Gemini
+            raise
+    return intents.canned_answer("greeting"), None
+
+async def small_talk_node(state: AgentState):
+    """Chit-chat: Gemini without embedding or retrieval; doesn't count as a question."""
+    started = time.perf_counter()
+    email = state.get("email")
+    user_message = state["messages"][-1]
+    bot_reply, reply_id = await generate_small_talk(user_message)
+    await arecord_turn(email, ("user", user_message.content), ("bot", bot_reply))
+    intents.record("small_talk", time.perf_counter() - started)
+    return {"messages": [AIMessage(content=bot_reply, id=reply_id)]}
+
+async def rag_chat_node(state: AgentState):
+    """
+    RAG Chat: semantic answer cache first, then retrieval + Gemini.
+    """
+    started = time.perf_counter()
+    email = state.get("email")
+    user_query = state["messages"][-1].content
+    
+    # 1. Update Stats (Fail-safe, write-through to the cached profile)
+    profile = await count_question(state)
+
+    # 2. Answer (shared with identical questions already in flight on this worker)
+    published = await current_index()
+    key = f"{published['generation']}:{published.get('embedding_model') or ''}:{retrieval.normalize_query(user_query)}"
+    (bot_reply, reply_id), shared = await retrieval.inflight.do(key, lambda: answer_question(state["messages"][-1], published))
+    if shared:
+        reply_id = None  # the streamed chunks went to the session that asked first
+
+    # 3. Queue the turn for history & Return
+    # Same id as the streamed chunks, so streaming clients don't get the reply twice
+    await arecord_turn(email, ("user", user_query), ("bot", bot_reply))
+    intents.record(None, time.perf_counter() - started)
+    return {"messages": [AIMessage(content=bot_reply, id=reply_id)], "profile": profile}
+
+async def limit_exhausted_node(state: AgentState):
     try:
         email = state.get("email")
         user_query = state["messages"][-1].content
-        append_chat_history(email, "user", user_query)
 
         msg = "🚫 **Query Limit Exceeded**\nPlease contact support at 9884927480 / 9884807480."
-        append_chat_history(email, "bot", msg)
+        await arecord_turn(email, ("user", user_query), ("bot", msg))
         return {"messages": [AIMessage(content=msg)], "dialog_state": "limit_reached"}
     except:
         return {"messages": [AIMessage(content="Limit Exceeded.")]}
 
 # --- GRAPH BUILD ---
+# All nodes are coroutines: drive the compiled graph with `ainvoke` / `astream`.
+# Each node and the router are timed into /metrics (mh_graph_node_seconds).
 workflow = StateGraph(AgentState)
-workflow.add_node("email_collection", email_collection_node)
-workflow.add_node("ask_details_consolidated", ask_details_consolidated_node)
-workflow.add_node("process_details_simple", process_details_simple_node)
-workflow.add_node("rag_chat", rag_chat_node)
-workflow.add_node("limit_exhausted", limit_exhausted_node)
-
-workflow.set_conditional_entry_point(router_node, {
+workflow.add_node("load_profile", metrics.timed_node("load_profile", load_profile_node))
+workflow.add_node("email_collection", metrics.timed_node("email_collection", email_collection_node))
+workflow.add_node("ask_details_consolidated", metrics.timed_node("ask_details_consolidated", ask_details_consolidated_node))
+workflow.add_node("process_details_simple", metrics.timed_node("process_details_simple", process_details_simple_node))
+workflow.add_node("rag_chat", metrics.timed_node("rag_chat", rag_chat_node))
+workflow.add_node("intent_reply", metrics.timed_node("intent_reply", intent_reply_node))
+workflow.add_node("small_talk", metrics.timed_node("small_talk", small_talk_node))
+workflow.add_node("limit_exhausted", metrics.timed_node("limit_exhausted", limit_exhausted_node))
+
+workflow.set_entry_point("load_profile")
+workflow.add_conditional_edges("load_profile", metrics.timed_router(router_node), {
     "email_collection": "email_collection",
     "ask_details_consolidated": "ask_details_consolidated",
     "process_details_simple": "process_details_simple",
     "rag_chat": "rag_chat",
+    "intent_reply": "intent_reply",
+    "small_talk": "small_talk",
     "limit_exhausted": "limit_exhausted"
 })
 
@@ -634,6 +993,11 @@ workflow.add_edge("email_collection", END)
 workflow.add_edge("ask_details_consolidated", END)
 workflow.add_edge("process_details_simple", END)
 workflow.add_edge("rag_chat", END)
+workflow.add_edge("intent_reply", END)
+workflow.add_edge("small_talk", END)
 workflow.add_edge("limit_exhausted", END)
 
-app = workflow.compile(checkpointer=MemorySaver())
\ No newline at end of file
+# Latest checkpoint per session only, in the store picked by CHECKPOINT_BACKEND
+# (SQLite shared by local workers, DynamoDB shared by Lambda instances)
+memory = build_checkpointer()
+app = workflow.compile(checkpointer=memory)
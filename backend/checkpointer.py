@@ -0,0 +1,463 @@
+import os
+import zlib
+import time
+import random
+import asyncio
+import sqlite3
+import threading
+from collections import OrderedDict
+
+import ormsgpack
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+
+from backend import metrics
+
+# --- CONFIGURATION ---
+CHECKPOINT_TTL = float(os.getenv("CHECKPOINT_TTL", str(2 * 3600)))  # idle seconds before a session is dropped
+CHECKPOINT_MAX_BYTES = int(os.getenv("CHECKPOINT_MAX_BYTES", str(64 * 1024 * 1024)))
+# memory: this process only | sqlite: every worker on the host | dynamodb: every Lambda instance.
+# On Lambda each instance has its own /tmp, so only dynamodb keeps a session across instances.
+CHECKPOINT_BACKEND = os.getenv("CHECKPOINT_BACKEND", "dynamodb" if os.getenv("AWS_LAMBDA_FUNCTION_NAME") else "sqlite")
+CHECKPOINT_DB_PATH = os.getenv("CHECKPOINT_DB_PATH", "/tmp/mh_chat_checkpoints.db")
+COMPRESS_MIN_BYTES = 512  # smaller records aren't worth a zlib header
+PURGE_EVERY = 500         # SQLite puts between sweeps of expired sessions
+MAX_PARKED = 1024         # parked writes (see put_writes) above which stale ones are swept
+
+
+class LatestCheckpointSaver(BaseCheckpointSaver):
+    """
+    Checkpointer that keeps ONE record per (thread, namespace): the latest
+    checkpoint with its channel values, metadata and pending writes. The chat
+    graph only ever resumes from the latest state, so the history
+    MemorySaver keeps (one checkpoint per graph step, forever) is dead weight.
+
+    Subclasses decide where records live by implementing `_load`, `_save`
+    and `_delete`. A record is a dict:
+        {"id", "parent", "checkpoint": (type, bytes), "metadata": (type, bytes),
+         "writes": {(task_id, idx): (task_id, channel, (type, bytes), task_path)}}
+    """
+
+    def __init__(self, *, serde=None):
+        super().__init__(serde=serde)
+        # Striped asyncio locks (FIFO): a blocking store sees one session's
+        # read-modify-writes one at a time, in submission order. Created for
+        # the running loop on first use (scripts call asyncio.run repeatedly)
+        self._locks = []
+        self._locks_loop = None
+        self._parked = OrderedDict()  # (thread_id, ns, checkpoint_id) -> {"writes": {...}, "at": monotonic}
+        self._parked_lock = threading.Lock()
+        self._parked_limit = MAX_PARKED  # next size at which to sweep
+
+    # --- storage hooks ---
+    def _load(self, thread_id, checkpoint_ns):
+        raise NotImplementedError
+
+    def _save(self, thread_id, checkpoint_ns, record):
+        raise NotImplementedError
+
+    def _delete(self, thread_id):
+        raise NotImplementedError
+
+    def _load_for_writes(self, thread_id, checkpoint_ns, checkpoint_id):
+        """The record put_writes updates, or None if `checkpoint_id` hasn't been put yet."""
+        return self._load(thread_id, checkpoint_ns)
+
+    def snapshot(self):
+        return dict(self.stats)
+
+    # --- BaseCheckpointSaver ---
+    def _tuple(self, thread_id, checkpoint_ns, record):
+        def ref(checkpoint_id):
+            return {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint_id}}
+
+        return CheckpointTuple(
+            config=ref(record["id"]),
+            checkpoint=self.serde.loads_typed(record["checkpoint"]),
+            metadata=self.serde.loads_typed(record["metadata"]),
+            parent_config=ref(record["parent"]) if record["parent"] else None,
+            pending_writes=[(task_id, channel, self.serde.loads_typed(value))
+                            for task_id, channel, value, _ in record["writes"].values()],
+        )
+
+    def get_tuple(self, config):
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        record = self._load(thread_id, checkpoint_ns)
+        if record is None: return None
+        checkpoint_id = get_checkpoint_id(config)
+        if checkpoint_id and checkpoint_id != record["id"]:
+            return None  # an older checkpoint: not kept
+        return self._tuple(thread_id, checkpoint_ns, record)
+
+    def list(self, config, *, filter=None, before=None, limit=None):
+        if not config: return
+        found = self.get_tuple(config)
+        if found is None or (limit is not None and limit <= 0): return
+        before_id = get_checkpoint_id(before) if before else None
+        if before_id and found.checkpoint["id"] >= before_id: return
+        if filter and any(found.metadata.get(k) != v for k, v in filter.items()): return
+        yield found
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        with self._parked_lock:
+            writes = self._parked.pop((thread_id, checkpoint_ns, checkpoint["id"]), {}).get("writes", {})
+            # Writes parked for an earlier checkpoint of this thread are superseded with it
+            for key in [k for k in self._parked if k[:2] == (thread_id, checkpoint_ns) and k[2] < checkpoint["id"]]:
+                del self._parked[key]
+        self._save(thread_id, checkpoint_ns, {
+            "id": checkpoint["id"],
+            "parent": config["configurable"].get("checkpoint_id"),
+            "checkpoint": self.serde.dumps_typed(checkpoint),
+            "metadata": self.serde.dumps_typed(get_checkpoint_metadata(config, metadata)),
+            "writes": writes,  # writes of the superseded checkpoint are dropped with it
+        })
+        return {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint["id"]}}
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        record = self._load_for_writes(thread_id, checkpoint_ns, checkpoint_id)
+        if record is None or record["id"] != checkpoint_id:
+            # With async durability LangGraph can submit a step's writes before
+            # the put of its checkpoint lands: hold them until that put arrives
+            with self._parked_lock:
+                parked = self._parked.setdefault((thread_id, checkpoint_ns, checkpoint_id),
+                                                 {"writes": {}, "at": time.monotonic()})
+                self._add_writes(parked["writes"], writes, task_id, task_path)
+                if len(self._parked) > self._parked_limit:
+                    self._sweep_parked()
+            return
+        self._add_writes(record["writes"], writes, task_id, task_path)
+        self._save(thread_id, checkpoint_ns, record)
+
+    def _sweep_parked(self):
+        """
+        Drops parked writes whose checkpoint put never came within the
+        session TTL (the run died). Writes still waiting for their put are
+        never dropped to make room: losing them would lose a step's output.
+        Call with _parked_lock held.
+        """
+        cutoff = time.monotonic() - getattr(self, "ttl", CHECKPOINT_TTL)
+        expired = [key for key, entry in self._parked.items() if entry["at"] < cutoff]
+        for key in expired:
+            del self._parked[key]
+        if expired:
+            print(f"⚠️ Dropped parked checkpoint writes of {len(expired)} runs whose checkpoint never arrived")
+        if len(self._parked) > MAX_PARKED:
+            print(f"⚠️ {len(self._parked)} checkpoints have writes waiting for their put (MAX_PARKED {MAX_PARKED})")
+        # Sweep again once the map doubles: a burst of pending writes doesn't rescan on every park
+        self._parked_limit = max(MAX_PARKED, 2 * len(self._parked))
+
+    def _add_writes(self, target, writes, task_id, task_path):
+        for idx, (channel, value) in enumerate(writes):
+            key = (task_id, WRITES_IDX_MAP.get(channel, idx))
+            if key[1] >= 0 and key in target:
+                continue
+            target[key] = (task_id, channel, self.serde.dumps_typed(value), task_path)
+
+    def delete_thread(self, thread_id):
+        self._delete(thread_id)
+        with self._parked_lock:
+            for key in [k for k in self._parked if k[0] == thread_id]:
+                del self._parked[key]
+
+    # --- async API ---
+    # Backends that do I/O (disk or network) keep this: their calls run on a
+    # worker thread, one session at a time, so the event loop never waits on them.
+    blocking_io = True
+
+    def _session_lock(self, thread_id):
+        loop = asyncio.get_running_loop()
+        if loop is not self._locks_loop:
+            self._locks = [asyncio.Lock() for _ in range(64)]
+            self._locks_loop = loop
+        return self._locks[hash(thread_id) % len(self._locks)]
+
+    async def _call(self, config, fn, *args):
+        with metrics.dependency("checkpointer", fn.__name__):
+            if not self.blocking_io:
+                return fn(*args)
+            async with self._session_lock(config["configurable"]["thread_id"]):
+                return await asyncio.to_thread(fn, *args)
+
+    async def aget_tuple(self, config):
+        return await self._call(config, self.get_tuple, config)
+
+    async def alist(self, config, *, filter=None, before=None, limit=None):
+        if not config: return
+        def list_all():
+            return list(self.list(config, filter=filter, before=before, limit=limit))
+        for item in await self._call(config, list_all):
+            yield item
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        return await self._call(config, self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config, writes, task_id, task_path=""):
+        return await self._call(config, self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id):
+        return await self._call({"configurable": {"thread_id": thread_id}}, self.delete_thread, thread_id)
+
+    def get_next_version(self, current, channel):
+        # Same scheme as MemorySaver: monotonically increasing, random tiebreak
+        current_v = 0 if current is None else current if isinstance(current, int) else int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
+
+
+def pack_record(record):
+    """
+    Compact binary form of a record for durable stores: one msgpack array,
+    zlib-compressed when large. Serialized messages repeat the same field
+    names and class paths turn after turn, so a 14-turn session shrinks ~4x.
+    """
+    writes = [[task_id, idx, channel, value[0], value[1], task_path]
+              for (task_id, idx), (_, channel, value, task_path) in record["writes"].items()]
+    data = ormsgpack.packb([record["id"], record["parent"], *record["checkpoint"], *record["metadata"], writes])
+    if len(data) >= COMPRESS_MIN_BYTES:
+        return b"z" + zlib.compress(data, 6)
+    return b"m" + data
+
+
+def unpack_record(blob):
+    blob = bytes(blob)
+    data = zlib.decompress(blob[1:]) if blob[:1] == b"z" else blob[1:]
+    checkpoint_id, parent, ctype, cdata, mtype, mdata, writes = ormsgpack.unpackb(data)
+    return {
+        "id": checkpoint_id,
+        "parent": parent,
+        "checkpoint": (ctype, cdata),
+        "metadata": (mtype, mdata),
+        "writes": {(task_id, idx): (task_id, channel, (vtype, vdata), task_path)
+                   for task_id, idx, channel, vtype, vdata, task_path in writes},
+    }
+
+
+def record_size(record):
+    return (len(record["checkpoint"][1]) + len(record["metadata"][1])
+            + sum(len(w[2][1]) for w in record["writes"].values()))
+
+
+class BoundedMemorySaver(LatestCheckpointSaver):
+    """
+    In-process LatestCheckpointSaver for a single worker. Sessions idle for
+    more than `ttl` seconds are dropped, and the least recently used ones
+    are evicted whenever the stored bytes exceed `max_bytes`, so memory stays
+    flat no matter how many session_ids the frontend mints.
+    """
+
+    blocking_io = False  # dict lookups: cheaper than a thread hop
+
+    def __init__(self, ttl=CHECKPOINT_TTL, max_bytes=CHECKPOINT_MAX_BYTES, serde=None):
+        super().__init__(serde=serde)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.stats = {"hits": 0, "misses": 0, "puts": 0, "ttl_evictions": 0, "lru_evictions": 0}
+        self._threads = OrderedDict()  # thread_id -> {"records": {ns: record}, "size": int, "touched": float}
+        self._lock = threading.Lock()
+
+    def _evict(self):
+        cutoff = time.monotonic() - self.ttl
+        # Ordered by last access, so expired sessions sit at the front
+        while self._threads:
+            thread_id, entry = next(iter(self._threads.items()))
+            if entry["touched"] >= cutoff and self.bytes <= self.max_bytes:
+                break
+            self._threads.popitem(last=False)
+            self.bytes -= entry["size"]
+            self.stats["ttl_evictions" if entry["touched"] < cutoff else "lru_evictions"] += 1
+
+    def _load(self, thread_id, checkpoint_ns):
+        with self._lock:
+            entry = self._threads.get(thread_id)
+            if entry is None or entry["touched"] < time.monotonic() - self.ttl or checkpoint_ns not in entry["records"]:
+                self.stats["misses"] += 1
+                return None
+            self.stats["hits"] += 1
+            entry["touched"] = time.monotonic()
+            self._threads.move_to_end(thread_id)
+            # put_writes mutates the record it loads, then saves it back
+            record = entry["records"][checkpoint_ns]
+            return {**record, "writes": dict(record["writes"])}
+
+    def _save(self, thread_id, checkpoint_ns, record):
+        with self._lock:
+            entry = self._threads.pop(thread_id, None) or {"records": {}, "size": 0}
+            old = entry["records"].get(checkpoint_ns)
+            size = record_size(record) - (record_size(old) if old else 0)
+            entry["records"][checkpoint_ns] = record
+            entry["size"] += size
+            entry["touched"] = time.monotonic()
+            self._threads[thread_id] = entry
+            self.bytes += size
+            self.stats["puts"] += 1
+            self._evict()
+
+    def _delete(self, thread_id):
+        with self._lock:
+            entry = self._threads.pop(thread_id, None)
+            if entry:
+                self.bytes -= entry["size"]
+
+    def snapshot(self):
+        with self._lock:
+            self._evict()
+            return {**self.stats, "backend": "memory", "threads": len(self._threads), "bytes": self.bytes,
+                    "max_bytes": self.max_bytes, "ttl": self.ttl}
+
+
+class SQLiteCheckpointSaver(LatestCheckpointSaver):
+    """
+    LatestCheckpointSaver in a local SQLite file (WAL), shared by every
+    worker process on the host: a session keeps its email and dialog_state
+    whichever uvicorn worker serves the next turn. Sessions idle for more
+    than `ttl` seconds are swept every PURGE_EVERY puts.
+    """
+
+    def __init__(self, path=CHECKPOINT_DB_PATH, ttl=CHECKPOINT_TTL, serde=None):
+        super().__init__(serde=serde)
+        self.path = path
+        self.ttl = ttl
+        self.stats = {"hits": 0, "misses": 0, "puts": 0, "bytes_written": 0, "expired": 0}
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS checkpoints (
+                thread_id TEXT NOT NULL,
+                checkpoint_ns TEXT NOT NULL,
+                record BLOB NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (thread_id, checkpoint_ns)
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS checkpoints_updated ON checkpoints (updated_at)")
+
+    def _load(self, thread_id, checkpoint_ns):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT record FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND updated_at >= ?",
+                (thread_id, checkpoint_ns, time.time() - self.ttl),
+            ).fetchone()
+        self.stats["hits" if row else "misses"] += 1
+        return unpack_record(row[0]) if row else None
+
+    def _save(self, thread_id, checkpoint_ns, record):
+        blob = pack_record(record)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO checkpoints (thread_id, checkpoint_ns, record, updated_at) VALUES (?, ?, ?, ?)",
+                (thread_id, checkpoint_ns, blob, time.time()),
+            )
+            self.stats["puts"] += 1
+            self.stats["bytes_written"] += len(blob)
+            if self.stats["puts"] % PURGE_EVERY == 0:
+                cursor = self._conn.execute("DELETE FROM checkpoints WHERE updated_at < ?", (time.time() - self.ttl,))
+                self.stats["expired"] += cursor.rowcount
+
+    def _delete(self, thread_id):
+        with self._lock:
+            self._conn.execute("DELETE FROM checkpoints WHERE thread_id = ?", (thread_id,))
+
+    def snapshot(self):
+        with self._lock:
+            threads, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(LENGTH(record)), 0) FROM checkpoints").fetchone()
+        return {**self.stats, "backend": "sqlite", "threads": threads, "bytes": size, "ttl": self.ttl}
+
+
+class DynamoCheckpointSaver(LatestCheckpointSaver):
+    """
+    LatestCheckpointSaver in DynamoDB (one item per session, keyed by
+    thread_id + checkpoint_ns), shared by every Lambda instance. Reads are
+    strongly consistent, so the next turn sees the previous one even when
+    it lands on another instance. Items carry an `expires_at` epoch for
+    DynamoDB's TTL; until the sweeper deletes them they are ignored on read.
+    """
+
+    def __init__(self, table, ttl=CHECKPOINT_TTL, serde=None):
+        super().__init__(serde=serde)
+        self.table = table
+        self.ttl = ttl
+        self.stats = {"hits": 0, "misses": 0, "puts": 0, "bytes_written": 0}
+        # Latest record this instance loaded or saved per session. put_writes
+        # only ever targets one of those, so it never reads DynamoDB
+        self._recent = OrderedDict()
+        self._recent_lock = threading.Lock()
+
+    def _remember(self, thread_id, checkpoint_ns, record):
+        with self._recent_lock:
+            self._recent[(thread_id, checkpoint_ns)] = record
+            self._recent.move_to_end((thread_id, checkpoint_ns))
+            while len(self._recent) > 1024:
+                self._recent.popitem(last=False)
+
+    def _load(self, thread_id, checkpoint_ns):
+        item = self.table.get_item(
+            Key={"thread_id": thread_id, "checkpoint_ns": checkpoint_ns},
+            ConsistentRead=True,
+        ).get("Item")
+        if not item or int(item.get("expires_at", 0)) < time.time():
+            self.stats["misses"] += 1
+            return None
+        self.stats["hits"] += 1
+        record = unpack_record(getattr(item["record"], "value", item["record"]))
+        self._remember(thread_id, checkpoint_ns, record)
+        return record
+
+    def _load_for_writes(self, thread_id, checkpoint_ns, checkpoint_id):
+        with self._recent_lock:
+            record = self._recent.get((thread_id, checkpoint_ns))
+        if record is None or record["id"] != checkpoint_id:
+            return None
+        return {**record, "writes": dict(record["writes"])}
+
+    def _save(self, thread_id, checkpoint_ns, record):
+        blob = pack_record(record)
+        self.table.put_item(Item={
+            "thread_id": thread_id,
+            "checkpoint_ns": checkpoint_ns,
+            "record": blob,
+            "expires_at": int(time.time() + self.ttl),
+        })
+        self._remember(thread_id, checkpoint_ns, record)
+        self.stats["puts"] += 1
+        self.stats["bytes_written"] += len(blob)
+
+    def _delete(self, thread_id):
+        from boto3.dynamodb.conditions import Key
+        items = self.table.query(
+            KeyConditionExpression=Key("thread_id").eq(thread_id),
+            ProjectionExpression="thread_id, checkpoint_ns",
+        ).get("Items", [])
+        with self.table.batch_writer() as batch:
+            for item in items:
+                batch.delete_item(Key={"thread_id": item["thread_id"], "checkpoint_ns": item["checkpoint_ns"]})
+        with self._recent_lock:
+            for item in items:
+                self._recent.pop((item["thread_id"], item["checkpoint_ns"]), None)
+
+    def snapshot(self):
+        return {**self.stats, "backend": "dynamodb", "ttl": self.ttl}
+
+
+def build_checkpointer(backend=CHECKPOINT_BACKEND):
+    """The checkpointer selected by CHECKPOINT_BACKEND. Opening it costs no network call."""
+    if backend == "memory":
+        return BoundedMemorySaver()
+    if backend == "sqlite":
+        return SQLiteCheckpointSaver()
+    if backend == "dynamodb":
+        from backend.dynamo_db import checkpoints_table
+        return DynamoCheckpointSaver(checkpoints_table)
+    raise ValueError(f"Unknown CHECKPOINT_BACKEND: {backend!r} (expected memory, sqlite or dynamodb)")
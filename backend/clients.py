@@ -0,0 +1,38 @@
+import threading
+
+
+class Lazy:
+    """
+    Builds a client on first use, exactly once, even when several threads
+    (the asyncio.to_thread pool, the outbox drainer) ask at the same time.
+    Heavy SDK imports belong inside `factory`, so importing a module that
+    declares a Lazy costs nothing.
+    """
+
+    def __init__(self, factory, name=None):
+        self._factory = factory
+        self._value = None
+        self._ready = False
+        self._lock = threading.Lock()
+        self.name = name or getattr(factory, "__name__", "client")
+
+    def get(self):
+        if not self._ready:
+            with self._lock:
+                if not self._ready:
+                    self._value = self._factory()
+                    self._ready = True
+        return self._value
+
+    @property
+    def ready(self):
+        return self._ready
+
+
+class LazyProxy(Lazy):
+    """A Lazy that stands in for the client itself: `table.get_item(...)` builds the table on first call."""
+
+    def __getattr__(self, attr):
+        if attr.startswith("_"):
+            raise AttributeError(attr)
+        return getattr(self.get(), attr)
@@ -0,0 +1,139 @@
+import os
+import re
+import threading
+
+# --- CONFIGURATION ---
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "600"))  # max tokens of CONTEXT DATA per prompt
+CONTEXT_MIN_SCORE = float(os.getenv("CONTEXT_MIN_SCORE", "0.3"))     # absolute floor (cosine)
+CONTEXT_RELATIVE_SCORE = float(os.getenv("CONTEXT_RELATIVE_SCORE", "0.8"))  # keep >= this x the best score
+CONTEXT_SCORE_GAP = float(os.getenv("CONTEXT_SCORE_GAP", "0.1"))     # a bigger drop between neighbours ends the list
+CONTEXT_MAX_CHUNKS = int(os.getenv("CONTEXT_MAX_CHUNKS", "6"))
+MIN_OVERLAP_CHARS = 30   # shorter shared spans are coincidence, not splitter overlap
+OVERLAP_SCAN_CHARS = 400 # longest boundary overlap looked for (ingest uses chunk_overlap=100-200)
+MIN_PIECE_TOKENS = 40    # don't bother squeezing in a truncated chunk smaller than this
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+stats = {"calls": 0, "candidates": 0, "chunks": 0, "tokens": 0, "dropped": 0, "deduped_chars": 0}
+_stats_lock = threading.Lock()
+
+
+def estimate_tokens(text):
+    """~4 characters per token for English prose (Gemini's own tokenizer isn't available offline)."""
+    return (len(text) + 3) // 4
+
+
+def select_chunks(scored_docs, min_score=CONTEXT_MIN_SCORE, relative=CONTEXT_RELATIVE_SCORE,
+                  gap=CONTEXT_SCORE_GAP, max_chunks=CONTEXT_MAX_CHUNKS):
+    """
+    Adaptive top-k over [(doc, score)], best first. The first chunk is
+    always kept (the prompt falls back to general knowledge anyway); each
+    next one must clear the absolute floor and be within `relative` of the
+    best score, and a drop of more than `gap` below the last kept chunk
+    (the elbow between relevant chunks and filler) ends the list. A fused
+    ranking isn't sorted by score, so a chunk under the floor or relative
+    cut is skipped rather than ending the list. A score of None (text
+    search without scores) is always kept, in order.
+    """
+    kept = []
+    best = max((s for _, s in scored_docs if s is not None), default=None)
+    previous = None
+    for doc, score in scored_docs:
+        if len(kept) == max_chunks: break
+        if score is not None and kept:
+            if score < min_score or score < best * relative:
+                continue
+            if previous is not None and previous - score > gap:
+                break
+        if score is not None:
+            previous = score
+        kept.append(doc)
+    return kept
+
+
+def _boundary_overlap(left, right):
+    """Length of the longest suffix of `left` that is also a prefix of `right`."""
+    for size in range(min(len(left), len(right), OVERLAP_SCAN_CHARS), MIN_OVERLAP_CHARS - 1, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+
+def _strip_overlap(text, packed):
+    """
+    Removes the text a chunk shares with already packed neighbours. The
+    splitter repeats the end of one chunk at the start of the next, and
+    retrieval can return the two in either order.
+    """
+    removed = 0
+    for other in packed:
+        head = _boundary_overlap(other, text)
+        text = text[head:]
+        tail = _boundary_overlap(text, other)
+        text = text[:len(text) - tail]
+        removed += head + tail
+    return text, removed
+
+
+def _dedupe_sentences(text, seen):
+    """Drops sentences already packed (brochures repeat the same lines across pages and files)."""
+    lines = []
+    for line in text.split("\n"):
+        kept = []
+        for sentence in _SENTENCE_END.split(line):
+            key = " ".join(sentence.lower().split())
+            if not key: continue
+            if len(key) > 20 and key in seen: continue
+            seen.add(key)
+            kept.append(sentence.strip())
+        if kept:
+            lines.append(" ".join(kept))
+    return "\n".join(lines).strip()
+
+
+def _truncate(text, max_tokens):
+    """Cuts `text` to `max_tokens`, at a sentence end when there is one."""
+    cut = text[:max_tokens * 4]
+    end = max(cut.rfind(". "), cut.rfind("! "), cut.rfind("? "))
+    return cut[:end + 1] if end > len(cut) // 2 else cut
+
+
+def pack_context(scored_docs, budget=CONTEXT_TOKEN_BUDGET, **selection):
+    """
+    Builds the CONTEXT DATA block from [(doc, score)] (best first): picks
+    chunks adaptively from the score distribution, removes text already
+    included by an earlier chunk, and fills at most `budget` tokens.
+    Returns (context, docs_used).
+    """
+    candidates = select_chunks(scored_docs, **selection)
+    packed, used, seen = [], [], set()
+    tokens = deduped = 0
+    for doc in candidates:
+        text, removed = _strip_overlap(doc.page_content, [d.page_content for d in used])
+        before = len(text)
+        text = _dedupe_sentences(text, seen)
+        deduped += removed + max(0, before - len(text))
+        if not text: continue
+        cost = estimate_tokens(text)
+        if tokens + cost > budget:
+            if budget - tokens < MIN_PIECE_TOKENS: break
+            text = _truncate(text, budget - tokens)
+            cost = estimate_tokens(text)
+        packed.append(text)
+        used.append(doc)
+        tokens += cost
+    with _stats_lock:
+        stats["calls"] += 1
+        stats["candidates"] += len(scored_docs)
+        stats["chunks"] += len(packed)
+        stats["tokens"] += tokens
+        stats["dropped"] += len(scored_docs) - len(candidates)
+        stats["deduped_chars"] += deduped
+    return "\n\n".join(packed), used
+
+
+def snapshot():
+    with _stats_lock:
+        calls = stats["calls"]
+        return {**stats, "avg_tokens": round(stats["tokens"] / calls, 1) if calls else 0.0,
+                "avg_chunks": round(stats["chunks"] / calls, 2) if calls else 0.0, "budget": CONTEXT_TOKEN_BUDGET}
@@ -113,26 +113,91 @@
 
 # ----------------------------------------------------------------------------------------------------
 import os
-import boto3
-from botocore.exceptions import ClientError
+import json
+import base64
+import asyncio
 from datetime import datetime
+from backend.outbox import ChatOutbox
+from contextlib import contextmanager
+from backend.clients import Lazy, LazyProxy
+from backend import metrics
 
 # --- CONFIGURATION ---
 TABLE_NAME = "MH_Aviation_Leads" 
+# One item per chat message. PK: email (S), SK: ts (S, ISO time + "#" + position in turn)
+MESSAGES_TABLE_NAME = os.getenv("MESSAGES_TABLE_NAME", "MH_Aviation_Messages")
 REGION = os.getenv("AWS_DEFAULT_REGION", "ap-south-1")
+# GSI on the leads table. PK: lead_bucket (S, always "LEAD"), SK: last_updated (S).
+# Lets the dashboard read leads newest-first one page at a time instead of scanning.
+LEADS_INDEX_NAME = os.getenv("LEADS_INDEX_NAME", "leads_by_last_updated")
+LEAD_BUCKET = "LEAD"
+# Small key/value table for runtime settings. PK: config_key (S).
+CONFIG_TABLE_NAME = os.getenv("CONFIG_TABLE_NAME", "MH_Aviation_Config")
+# Conversation state (LangGraph checkpoints) when CHECKPOINT_BACKEND=dynamodb
+CHECKPOINTS_TABLE_NAME = os.getenv("CHECKPOINTS_TABLE_NAME", "MH_Aviation_Sessions")
+INDEX_CONFIG_KEY = "vector_index"
+# On Lambda a background thread is frozen between invocations: the handler drains the outbox instead
+ON_LAMBDA = bool(os.getenv("AWS_LAMBDA_FUNCTION_NAME"))
+# Columns the dashboard table shows (chat history is fetched per lead on demand)
+LEAD_SUMMARY_FIELDS = ["email", "#nm", "phone", "school", "city", "last_updated", "created_at",
+                       "is_registered", "guest_count", "post_reg_count"]
 
-try:
-    dynamodb = boto3.resource("dynamodb", region_name=REGION)
-    table = dynamodb.Table(TABLE_NAME)
-except Exception as e:
-    print(f"❌ DynamoDB Init Error: {e}")
+# Built on first use: importing boto3 and loading its service model is most of
+# this module's cold-start cost, and the email step doesn't touch DynamoDB.
+def _connect():
+    import boto3
+    return boto3.resource("dynamodb", region_name=REGION)
+
+@contextmanager
+def _timed_batch(writer, operation):
+    with metrics.dependency("dynamodb", operation):
+        with writer as batch:
+            yield batch
+
+class TimedTable(LazyProxy):
+    """A lazy table whose every call is timed as mh_dependency_seconds{dependency="dynamodb", operation="<table>.<method>"}."""
+
+    def __getattr__(self, attr):
+        value = super().__getattr__(attr)
+        if not callable(value): return value
+        operation = f"{self.name}.{attr}"
+        if attr == "batch_writer":
+            # Puts are buffered and flushed in batches: time the whole `with` block
+            return lambda *args, **kwargs: _timed_batch(value(*args, **kwargs), operation)
+        def call(*args, **kwargs):
+            with metrics.dependency("dynamodb", operation):
+                return value(*args, **kwargs)
+        return call
+
+dynamodb = Lazy(_connect, "dynamodb")
+table = TimedTable(lambda: dynamodb.get().Table(TABLE_NAME), TABLE_NAME)
+messages_table = TimedTable(lambda: dynamodb.get().Table(MESSAGES_TABLE_NAME), MESSAGES_TABLE_NAME)
+config_table = TimedTable(lambda: dynamodb.get().Table(CONFIG_TABLE_NAME), CONFIG_TABLE_NAME)
+checkpoints_table = TimedTable(lambda: dynamodb.get().Table(CHECKPOINTS_TABLE_NAME), CHECKPOINTS_TABLE_NAME)
+
+# --- PAGINATION CURSORS ---
+def encode_cursor(last_key):
+    """Turns a DynamoDB LastEvaluatedKey into an opaque URL-safe string."""
+    if not last_key: return None
+    return base64.urlsafe_b64encode(json.dumps(last_key, default=str).encode()).decode()
+
+def decode_cursor(cursor):
+    if not cursor: return None
+    return json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
 
 # --- HELPER 1: GET USER STATS ---
 def get_user_stats(email):
-    """Fetches counts and handles Decimal -> Int conversion safely."""
+    """
+    Fetches counts and handles Decimal -> Int conversion safely. A failed
+    read raises: zero counts would turn a registered lead into a guest.
+    """
     if not email: return {"is_registered": False, "guest_count": 0, "post_reg_count": 0}
     try:
-        response = table.get_item(Key={'email': email})
+        # Only the counters: legacy items may still carry a large chat_history list
+        response = table.get_item(
+            Key={'email': email},
+            ProjectionExpression="is_registered, guest_count, post_reg_count"
+        )
         item = response.get('Item', {})
         return {
             "is_registered": item.get("is_registered", False),
@@ -141,11 +206,11 @@ def get_user_stats(email):
         }
     except Exception as e:
         print(f"⚠️ Stats Error: {e}")
-        return {"is_registered": False, "guest_count": 0, "post_reg_count": 0}
+        raise
 
 # --- HELPER 2: INCREMENT COUNTER ---
 def increment_counter(email, is_registered):
-    """Increments the appropriate counter."""
+    """Increments the appropriate counter. Raises if the write fails."""
     if not email: return
     field_name = "post_reg_count" if is_registered else "guest_count"
     try:
@@ -156,6 +221,7 @@ def increment_counter(email, is_registered):
         )
     except Exception as e:
         print(f"⚠️ Counter Error: {e}")
+        raise
 
 # --- HELPER 3: SAVE LEAD (ROBUST VERSION) ---
 def save_lead_dynamo(email, phone=None, name=None, school=None, city=None, mark_registered=False):
@@ -167,9 +233,9 @@ def save_lead_dynamo(email, phone=None, name=None, school=None, city=None, mark_
     now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     key = {'email': email}
 
-    # Base Update: Timestamp
-    update_expr = "SET last_updated = :t, created_at = if_not_exists(created_at, :t)"
-    expr_values = {':t': now}
+    # Base Update: Timestamp (+ the leads_by_last_updated index key)
+    update_expr = "SET last_updated = :t, created_at = if_not_exists(created_at, :t), lead_bucket = :lb"
+    expr_values = {':t': now, ':lb': LEAD_BUCKET}
     expr_names = {}
 
     # Conditionally add fields
@@ -209,36 +275,170 @@ def save_lead_dynamo(email, phone=None, name=None, school=None, city=None, mark_
         print(f"❌ DB Save Error: {e}")
         return False
 
-# --- HELPER 4: GET ALL LEADS (REQUIRED FOR ADMIN) ---
+# --- HELPER 4: GET LEADS (REQUIRED FOR ADMIN) ---
+def get_leads_page(limit=50, cursor=None):
+    """
+    Returns one page of lead summaries, newest first: {"leads": [...], "next_cursor": str|None}.
+    Uses the leads_by_last_updated index, so each page is a single Query.
+    """
+    from boto3.dynamodb.conditions import Key
+    args = {
+        'IndexName': LEADS_INDEX_NAME,
+        'KeyConditionExpression': Key('lead_bucket').eq(LEAD_BUCKET),
+        'ScanIndexForward': False,
+        'Limit': limit,
+        'ProjectionExpression': ", ".join(LEAD_SUMMARY_FIELDS),
+        'ExpressionAttributeNames': {'#nm': 'name'},
+    }
+    try:
+        if cursor:
+            args['ExclusiveStartKey'] = decode_cursor(cursor)
+        response = table.query(**args)
+        return {
+            "leads": response.get('Items', []),
+            "next_cursor": encode_cursor(response.get('LastEvaluatedKey'))
+        }
+    except Exception as e:
+        print(f"❌ Admin Leads Query Error: {e}")
+        return {"leads": [], "next_cursor": None}
+
 def get_all_leads():
-    """Scans table to return all leads for the dashboard."""
+    """Scans the whole table (every page) for exports. The dashboard uses get_leads_page."""
+    leads = []
+    args = {
+        'ProjectionExpression': ", ".join(LEAD_SUMMARY_FIELDS),
+        'ExpressionAttributeNames': {'#nm': 'name'},
+    }
     try:
-        response = table.scan()
-        return response.get('Items', [])
+        while True:
+            response = table.scan(**args)
+            leads.extend(response.get('Items', []))
+            if 'LastEvaluatedKey' not in response:
+                return leads
+            args['ExclusiveStartKey'] = response['LastEvaluatedKey']
     except Exception as e:
         print(f"❌ Admin Scan Error: {e}")
-        return []
+        return leads
 
 # --- HELPER 5: APPEND CHAT HISTORY ---
+def write_chat_history(email, entries):
+    """Stores each entry as its own item (batched). Raises on failure so the outbox retries."""
+    # Keys are fixed when the turn is queued, so a retried batch overwrites instead of duplicating
+    with messages_table.batch_writer() as batch:
+        for entry in entries:
+            batch.put_item(Item={"email": email, **entry})
+
+# Write-behind queue: nodes enqueue locally, a background thread (or, on Lambda,
+# the handler at the end of each invocation) writes to Dynamo
+history_outbox = ChatOutbox(writer=write_chat_history, background=not ON_LAMBDA)
+
+def _turn_entries(messages):
+    now = datetime.now()
+    timestamp = now.strftime("%Y-%m-%d %H:%M:%S")
+    return [
+        {"ts": f"{now.isoformat(timespec='microseconds')}#{i}", "role": role, "content": str(message), "timestamp": timestamp}
+        for i, (role, message) in enumerate(messages) if message
+    ]
+
+def record_turn(email, *messages):
+    """Queues a turn's (role, message) pairs; they reach DynamoDB in a single batch."""
+    if not email: return
+    try:
+        history_outbox.enqueue(email, _turn_entries(messages))
+    except Exception as e:
+        print(f"❌ History Queue Error: {e}")
+
 def append_chat_history(email, role, message):
-    """Appends a message to the chat history list."""
+    """Appends a message to the lead's chat history (via the outbox)."""
     if not email or not message: return
-    
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    new_entry = {
-        "role": role, 
-        "content": str(message), 
-        "timestamp": timestamp
+    record_turn(email, (role, message))
+
+# --- HELPER 6: READ CHAT HISTORY (PAGINATED) ---
+def get_chat_history(email, limit=50, cursor=None, newest_first=False):
+    """
+    Returns one page of a lead's messages: {"messages": [...], "next_cursor": str|None}.
+    Each page is a single Query, so cost doesn't depend on conversation length.
+    """
+    if not email: return {"messages": [], "next_cursor": None}
+    from boto3.dynamodb.conditions import Key
+    args = {
+        'KeyConditionExpression': Key('email').eq(email),
+        'Limit': limit,
+        'ScanIndexForward': not newest_first,
     }
-    
     try:
-        table.update_item(
-            Key={'email': email},
-            UpdateExpression="SET chat_history = list_append(if_not_exists(chat_history, :empty_list), :new_msg)",
-            ExpressionAttributeValues={
-                ':new_msg': [new_entry],
-                ':empty_list': []
-            }
-        )
+        if cursor:
+            args['ExclusiveStartKey'] = decode_cursor(cursor)
+        response = messages_table.query(**args)
+        return {
+            "messages": response.get('Items', []),
+            "next_cursor": encode_cursor(response.get('LastEvaluatedKey'))
+        }
     except Exception as e:
-        pass
\ No newline at end of file
+        print(f"❌ History Read Error: {e}")
+        return {"messages": [], "next_cursor": None}
+
+# --- HELPER 7: KNOWLEDGE BASE GENERATION ---
+def get_index_generation():
+    """
+    Returns the published knowledge-base version. `index_name` is the alias the
+    backend searches; `embedding_model` is the model its vectors were built with.
+    """
+    response = config_table.get_item(Key={'config_key': INDEX_CONFIG_KEY})
+    item = response.get('Item', {})
+    return {
+        "generation": int(item.get("generation", 0)),
+        "index_name": item.get("index_name"),
+        "embedding_model": item.get("embedding_model"),
+        "previous_index_name": item.get("previous_index_name"),
+    }
+
+def publish_index_generation(index_name, embedding_model=None, expected_index_name=None):
+    """
+    Called by the ingest pipeline after new content is live. Bumps the generation
+    (invalidates caches) and points the alias at `index_name`, in one write.
+    With `expected_index_name` (blue/green switch), the write only succeeds if the
+    alias still points there, so two reindex runs can't race each other.
+    """
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    updates = ["index_name = :n", "published_at = :t"]
+    values = {':n': index_name, ':t': now, ':one': 1}
+    if embedding_model:
+        updates.append("embedding_model = :m")
+        values[':m'] = embedding_model
+    kwargs = {}
+    if expected_index_name:
+        updates.append("previous_index_name = :prev")
+        values[':prev'] = expected_index_name
+        kwargs["ConditionExpression"] = "attribute_not_exists(index_name) OR index_name = :prev"
+    response = config_table.update_item(
+        Key={'config_key': INDEX_CONFIG_KEY},
+        UpdateExpression="SET " + ", ".join(updates) + " ADD generation :one",
+        ExpressionAttributeValues=values,
+        ReturnValues="UPDATED_NEW",
+        **kwargs
+    )
+    return int(response['Attributes']['generation'])
+
+# --- HELPER 8: ASYNC WRAPPERS ---
+# boto3 is blocking, so the graph nodes await these instead. Each call runs on
+# the default thread pool and the event loop stays free for other sessions.
+async def aget_user_stats(email):
+    return await asyncio.to_thread(get_user_stats, email)
+
+async def aget_index_generation():
+    return await asyncio.to_thread(get_index_generation)
+
+async def aincrement_counter(email, is_registered):
+    return await asyncio.to_thread(increment_counter, email, is_registered)
+
+async def arecord_turn(email, *messages):
+    """record_turn for the graph nodes: the SQLite insert runs off the event loop."""
+    if not email: return
+    try:
+        await history_outbox.aenqueue(email, _turn_entries(messages))
+    except Exception as e:
+        print(f"❌ History Queue Error: {e}")
+
+async def asave_lead_dynamo(email, phone=None, name=None, school=None, city=None, mark_registered=False):
+    return await asyncio.to_thread(save_lead_dynamo, email, phone, name, school, city, mark_registered)
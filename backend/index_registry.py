@@ -0,0 +1,37 @@
+import os
+import time
+from backend.dynamo_db import aget_index_generation
+
+# --- CONFIGURATION ---
+# How often (seconds) a worker re-reads the published generation from DynamoDB.
+INDEX_GENERATION_TTL = float(os.getenv("INDEX_GENERATION_TTL", "60"))
+
+_state = {"generation": 0, "index_name": None, "embedding_model": None, "checked_at": 0.0}
+
+
+async def current_index():
+    """
+    Returns the published {"generation", "index_name", "embedding_model"} from
+    scripts/ingest.py / scripts/reindex.py. All three come from one config
+    item, so a blue/green switch moves the index and its query model together.
+    """
+    if time.monotonic() - _state["checked_at"] >= INDEX_GENERATION_TTL:
+        _state["checked_at"] = time.monotonic()
+        try:
+            published = await aget_index_generation()
+            _state["generation"] = published["generation"]
+            _state["index_name"] = published["index_name"]
+            _state["embedding_model"] = published["embedding_model"]
+        except Exception as e:
+            # Keep serving with the last known generation
+            print(f"⚠️ Index Generation Check Error: {e}")
+    return {k: _state[k] for k in ("generation", "index_name", "embedding_model")}
+
+
+async def current_generation():
+    """
+    Returns the knowledge-base generation. Caches built from retrieved content
+    tag their entries with it, so a new ingest invalidates them within
+    INDEX_GENERATION_TTL seconds.
+    """
+    return (await current_index())["generation"]
@@ -0,0 +1,185 @@
+import os
+import re
+import zlib
+import threading
+from functools import lru_cache
+
+import numpy as np
+
+from backend.clients import Lazy
+from backend.retrieval import normalize_query
+
+# --- CONFIGURATION ---
+INTENT_THRESHOLD = float(os.getenv("INTENT_THRESHOLD", "0.72"))  # cosine to the nearest exemplar
+INTENT_MAX_WORDS = int(os.getenv("INTENT_MAX_WORDS", "8"))       # longer messages always go to RAG
+FEATURE_DIM = 4096
+
+SUPPORT_PHONES = "9884927480 / 9884807480"
+
+# Curated replies. They skip retrieval, so they must not state figures or
+# facts that ingest can change (fees, dates, seats): questions about those
+# go to RAG, which answers from the published content. `answer=None` sends the
+# turn to the retrieval-free small-talk path; `counts` says whether it uses
+# up one of the lead's questions (the same as a RAG answer would).
+# `patterns` match the whole normalized message; `exemplars` feed the
+# nearest-neighbour model for phrasings the patterns miss. `exact_only`
+# intents are only served on a pattern match: their exemplars send the
+# nearest-neighbour match to RAG instead (a fee question about a specific
+# course gets that course's figure from the knowledge base).
+INTENTS = {
+    "greeting": {
+        "answer": ("Hello! 👋 Welcome to **MH Cockpit Aviation Academy**. Ask me about our pilot training "
+                   "courses, fleet, fees or admissions."),
+        "counts": False,
+        "patterns": [r"(hi+|hello+|hey+|hai+|helo|namaste|vanakkam|good (morning|afternoon|evening))( there| team| sir| mam| madam)?"],
+        "exemplars": ["hi", "hello", "hey there", "good morning", "hello team", "hi sir", "greetings"],
+    },
+    "thanks": {
+        "answer": "You're welcome! Let me know if there's anything else you'd like to know about **MH Cockpit**.",
+        "counts": False,
+        "patterns": [r"(ok |okay )?(thanks?|thank (you|u)|thankyou|thx|tnx|ty)( so much| very much| a lot)?( sir| mam| madam)?"],
+        "exemplars": ["thanks", "thank you", "thank you so much", "thanks a lot", "ok thanks", "that was helpful thanks"],
+    },
+    "goodbye": {
+        "answer": "Thank you for chatting with **MH Cockpit**. Wishing you clear skies! ✈️",
+        "counts": False,
+        "patterns": [r"(ok )?(bye|goodbye|bye bye|see you|good night)"],
+        "exemplars": ["bye", "goodbye", "see you later", "ok bye", "talk to you later"],
+    },
+    "contact": {
+        "answer": (f"You can reach our admissions team at **{SUPPORT_PHONES}**, "
+                   "or through https://mhcockpit.com/contact-us/."),
+        "counts": True,
+        "patterns": [r"(what is |whats |what s )?(your |the )?(contact|phone|mobile|whatsapp) (number|no|details)"],
+        "exemplars": ["contact number", "what is your phone number", "how can i contact you", "contact details",
+                      "how do i reach admissions", "can i call you", "give me your mobile number"],
+    },
+    "location": {
+        "answer": (f"Directions to our campus are on https://mhcockpit.com/contact-us/, and our admissions team "
+                   f"(**{SUPPORT_PHONES}**) will be happy to help you plan a visit."),
+        "counts": True,
+        "patterns": [r"where (are you|is (the |your )?(campus|academy|institute|office|mh cockpit))( located)?"],
+        "exemplars": ["where are you located", "where is the campus", "what is your address", "location",
+                      "where is mh cockpit", "campus address"],
+    },
+    "fees": {
+        "answer": ("Our fees depend on the programme you choose. Tell me which course you're interested in, "
+                   f"or call our admissions team at **{SUPPORT_PHONES}** for the current fee structure."),
+        "counts": True,
+        "exact_only": True,
+        "patterns": [r"(what (is|are) )?(the |your )?(fees?|fee structure)"],
+        "exemplars": ["what are the fees", "fee structure", "how much are the fees", "how much does it cost",
+                      "what is the course fee", "total fees"],
+    },
+    "small_talk": {
+        "answer": None,
+        "counts": False,
+        "patterns": [r"(ok|okay|cool|nice|great|awesome|super|fine|hmm+)"],
+        "exemplars": ["how are you", "who are you", "are you a bot", "are you human", "what can you do",
+                      "ok cool", "nice", "what is your name"],
+    },
+}
+# Questions that look like an intent but need the knowledge base: the nearest
+# exemplar being one of these sends the message down the normal RAG path
+RAG_EXEMPLARS = [
+    "what are the fees for the b sc aviation degree", "fees for type rating", "is hostel fee included",
+    "where will i do my flight training", "how long is the cpl course", "which aircraft do you have",
+    "what is the eligibility for pilot training", "do you offer scholarships", "where have cadets been placed",
+    "contact details of the hostel warden", "how much does the a320 type rating cost",
+]
+# Courses, aircraft and facilities: a message naming one is a knowledge-base
+# question, whatever intent its wording matches or is closest to
+ENTITY_TERMS = {
+    "cpl", "ppl", "atpl", "bsc", "b sc", "mba", "diploma", "degree", "course", "courses", "program", "programme",
+    "cabin crew", "crew", "ground staff", "type rating", "a320", "b737", "737", "cessna", "piper", "seneca",
+    "simulator", "hostel", "accommodation", "transport", "loan", "scholarship", "medical", "dgca", "vels",
+}
+_ENTITY = re.compile(rf"\b(?:{'|'.join(sorted(map(re.escape, ENTITY_TERMS), key=len, reverse=True))})\b")
+
+_PATTERNS = [(name, re.compile(rf"(?:{'|'.join(spec['patterns'])})")) for name, spec in INTENTS.items()]
+
+stats = {"classified": 0, "rag": 0, "fast": 0, "by_intent": {}, "fast_seconds": 0.0, "rag_seconds": 0.0}
+_stats_lock = threading.Lock()
+
+
+def _features(text):
+    """Hashed word + character-trigram counts, L2-normalized: a bag of n-grams that tolerates typos."""
+    vector = np.zeros(FEATURE_DIM, dtype=np.float32)
+    words = text.split()
+    grams = words + [w[i:i + 3] for w in (f" {w} " for w in words) for i in range(len(w) - 2)]
+    for gram in grams:
+        vector[zlib.crc32(gram.encode()) % FEATURE_DIM] += 1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def _build_model():
+    """Exemplar matrix (one unit row per exemplar) and the intent of each row, computed once per process."""
+    labels, rows = [], []
+    for name, spec in INTENTS.items():
+        for exemplar in spec["exemplars"]:
+            labels.append(None if spec.get("exact_only") else name)
+            rows.append(_features(normalize_query(exemplar)))
+    for exemplar in RAG_EXEMPLARS:
+        labels.append(None)
+        rows.append(_features(normalize_query(exemplar)))
+    return np.stack(rows), labels
+
+model = Lazy(_build_model, "intent_model")
+
+
+@lru_cache(maxsize=4096)
+def classify(text):
+    """
+    Intent name for a chat message, or None (answer it with RAG). Whole-
+    message patterns first, then the nearest exemplar if it is close
+    enough. Long messages, and messages naming a course, aircraft or
+    facility, are real questions and always get None.
+    """
+    query = normalize_query(text)
+    if not query or len(query.split()) > INTENT_MAX_WORDS or _ENTITY.search(query):
+        return None
+    for name, pattern in _PATTERNS:
+        if pattern.fullmatch(query):
+            return name
+    matrix, labels = model.get()
+    scores = matrix @ _features(query)
+    best = int(np.argmax(scores))
+    return labels[best] if scores[best] >= INTENT_THRESHOLD else None
+
+
+def canned_answer(intent):
+    return INTENTS[intent]["answer"]
+
+
+def counts_as_question(intent):
+    return INTENTS[intent]["counts"]
+
+
+def record(intent, seconds):
+    """Counts one chat turn: `intent` None for a full RAG turn, else the fast path that served it."""
+    with _stats_lock:
+        stats["classified"] += 1
+        if intent is None:
+            stats["rag"] += 1
+            stats["rag_seconds"] += seconds
+        else:
+            stats["fast"] += 1
+            stats["fast_seconds"] += seconds
+            stats["by_intent"][intent] = stats["by_intent"].get(intent, 0) + 1
+
+
+def snapshot():
+    """Share of chat turns served by the fast path, and the time saved against the average RAG turn."""
+    with _stats_lock:
+        avg_rag = stats["rag_seconds"] / stats["rag"] if stats["rag"] else 0.0
+        avg_fast = stats["fast_seconds"] / stats["fast"] if stats["fast"] else 0.0
+        return {
+            "turns": stats["classified"],
+            "short_circuited": stats["fast"],
+            "short_circuit_ratio": round(stats["fast"] / stats["classified"], 4) if stats["classified"] else 0.0,
+            "by_intent": dict(stats["by_intent"]),
+            "avg_rag_ms": round(avg_rag * 1000, 1),
+            "avg_fast_ms": round(avg_fast * 1000, 1),
+            "saved_ms": round(max(0.0, avg_rag - avg_fast) * stats["fast"] * 1000, 1) if stats["rag"] else None,
+        }
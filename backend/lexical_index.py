@@ -0,0 +1,223 @@
+import os
+import re
+import json
+import time
+import threading
+
+import numpy as np
+from langchain_core.documents import Document
+
+# --- CONFIGURATION ---
+BM25_K1 = 1.2
+BM25_B = 0.75
+LEXICAL_CANDIDATES = int(os.getenv("LEXICAL_CANDIDATES", "4"))
+# The lexical hit is "decisive" (the embedding call is skipped) when the best
+# chunk contains every term of the question and outscores the runner-up by this much
+LEXICAL_DECISIVE_RATIO = float(os.getenv("LEXICAL_DECISIVE_RATIO", "1.5"))
+RRF_K = 60  # reciprocal rank fusion constant (Cormack et al.): 1 / (RRF_K + rank)
+# Without vector scores, BM25 hits scoring below this x the top hit are dropped
+LEXICAL_RELATIVE_FLOOR = float(os.getenv("LEXICAL_RELATIVE_FLOOR", "0.5"))
+
+# --- INDEX LAYOUT ---
+# <path>/meta.json      count, terms, avgdl, k1, b, created_at
+# <path>/terms.txt      vocabulary, one term per line, sorted (line number = term id)
+# <path>/postings.npz   CSR postings: offsets (terms + 1), doc ids, term frequencies,
+#                       plus the length of every chunk in tokens
+# <path>/chunks.jsonl   one {"text": ..., "metadata": {...}} per chunk, same order
+META_FILE = "meta.json"
+TERMS_FILE = "terms.txt"
+POSTINGS_FILE = "postings.npz"
+CHUNKS_FILE = "chunks.jsonl"
+
+STOPWORDS = {
+    "a", "an", "the", "and", "or", "of", "to", "in", "on", "for", "with", "by", "is", "are", "be", "it",
+    "do", "does", "did", "can", "i", "you", "your", "we", "our", "me", "my", "what", "which", "who",
+    "where", "when", "how", "there", "this", "that", "any", "about", "at", "as", "from", "tell", "please",
+}
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+stats = {"searches": 0, "decisive": 0, "fused": 0, "load_seconds": None}
+_stats_lock = threading.Lock()
+
+
+def tokenize(text):
+    """Lowercase alphanumeric terms without stopwords; a plural 's' is dropped so 'fees' matches 'fee'."""
+    terms = []
+    for word in _TOKEN.findall(str(text).lower()):
+        if word in STOPWORDS: continue
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        terms.append(word)
+    return terms
+
+
+def doc_key(doc):
+    """Identity of a chunk across the lexical and vector results (chunk ID, else its text)."""
+    return doc.metadata.get("chunk_id") or doc.page_content
+
+
+def write_lexical_index(path, docs):
+    """Writes a BM25 inverted index over `docs` (the chunks ingest uploads) that LexicalIndex can load."""
+    os.makedirs(path, exist_ok=True)
+    postings = {}  # term -> [(doc id, tf)]
+    lengths = []
+    for doc_id, doc in enumerate(docs):
+        terms = tokenize(doc.page_content)
+        lengths.append(len(terms))
+        counts = {}
+        for term in terms:
+            counts[term] = counts.get(term, 0) + 1
+        for term, tf in counts.items():
+            postings.setdefault(term, []).append((doc_id, tf))
+
+    vocabulary = sorted(postings)
+    offsets = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+    doc_ids, tfs = [], []
+    for i, term in enumerate(vocabulary):
+        for doc_id, tf in postings[term]:
+            doc_ids.append(doc_id)
+            tfs.append(tf)
+        offsets[i + 1] = len(doc_ids)
+    np.savez_compressed(
+        os.path.join(path, POSTINGS_FILE),
+        offsets=offsets,
+        doc_ids=np.asarray(doc_ids, dtype=np.uint16 if len(docs) <= 65535 else np.uint32),
+        tfs=np.minimum(np.asarray(tfs, dtype=np.int64), 65535).astype(np.uint16),
+        lengths=np.asarray(lengths, dtype=np.uint32),
+    )
+    with open(os.path.join(path, TERMS_FILE), "w", encoding="utf-8") as f:
+        f.write("\n".join(vocabulary))
+    with open(os.path.join(path, CHUNKS_FILE), "w", encoding="utf-8") as f:
+        for doc in docs:
+            f.write(json.dumps({"text": doc.page_content, "metadata": doc.metadata}, default=str) + "\n")
+
+    meta = {
+        "count": len(docs),
+        "terms": len(vocabulary),
+        "postings": len(doc_ids),
+        "avgdl": float(np.mean(lengths)) if lengths else 0.0,
+        "k1": BM25_K1,
+        "b": BM25_B,
+        "created_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+    # meta.json last: an index without it is incomplete and won't load
+    with open(os.path.join(path, META_FILE), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    return meta
+
+
+class LexicalIndex:
+    """
+    BM25 over the chunks written by `write_lexical_index`. A query only
+    touches the postings of its own terms, so exact terms (aircraft models,
+    "DGCA", "VELS", fee figures) are scored in microseconds, in-process.
+    """
+
+    def __init__(self, path):
+        started = time.perf_counter()
+        with open(os.path.join(path, META_FILE), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        with open(os.path.join(path, TERMS_FILE), encoding="utf-8") as f:
+            self.term_ids = {term: i for i, term in enumerate(f.read().split("\n")) if term}
+        with np.load(os.path.join(path, POSTINGS_FILE)) as postings:
+            self.offsets = postings["offsets"]
+            self.doc_ids = postings["doc_ids"].astype(np.int64)
+            self.tfs = postings["tfs"].astype(np.float32)
+            lengths = postings["lengths"].astype(np.float32)
+        with open(os.path.join(path, CHUNKS_FILE), encoding="utf-8") as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+        self.docs = [Document(page_content=r["text"], metadata=r.get("metadata", {})) for r in rows]
+
+        count = len(self.docs)
+        k1, b = self.meta["k1"], self.meta["b"]
+        doc_freq = np.diff(self.offsets).astype(np.float32)
+        self.idf = np.log(1 + (count - doc_freq + 0.5) / (doc_freq + 0.5))
+        # Per-chunk part of the BM25 denominator, computed once
+        self.norms = k1 * (1 - b + b * lengths / max(self.meta["avgdl"], 1e-9))
+        self.k1 = k1
+        self.load_seconds = time.perf_counter() - started
+        with _stats_lock:
+            stats["load_seconds"] = round(self.load_seconds, 4)
+        print(f"📚 Lexical index loaded: {count} chunks, {len(self.term_ids)} terms "
+              f"from {path} in {self.load_seconds * 1000:.1f}ms")
+
+    def search(self, query, k=LEXICAL_CANDIDATES):
+        """
+        Top-k [(doc, bm25 score)] for the query, best first, plus whether the
+        best hit is decisive: it contains every query term and beats the
+        runner-up by LEXICAL_DECISIVE_RATIO. Returns (results, decisive).
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        known = [self.term_ids[t] for t in terms if t in self.term_ids]
+        if not known or not self.docs:
+            self._count(False)
+            return [], False
+
+        scores = np.zeros(len(self.docs), dtype=np.float32)
+        matched = np.zeros(len(self.docs), dtype=np.int32)
+        for term_id in known:
+            start, end = self.offsets[term_id], self.offsets[term_id + 1]
+            ids, tf = self.doc_ids[start:end], self.tfs[start:end]
+            scores[ids] += self.idf[term_id] * tf * (self.k1 + 1) / (tf + self.norms[ids])
+            matched[ids] += 1
+
+        hits = np.flatnonzero(scores)
+        top = hits[np.argsort(-scores[hits])][:k]
+        results = [(self.docs[i], float(scores[i])) for i in top]
+        runner_up = results[1][1] if len(results) > 1 else 0.0
+        decisive = bool(matched[top[0]] == len(terms) and results[0][1] >= LEXICAL_DECISIVE_RATIO * runner_up)
+        self._count(decisive)
+        return results, decisive
+
+    def _count(self, decisive):
+        with _stats_lock:
+            stats["searches"] += 1
+            stats["decisive"] += decisive
+
+
+def fuse(vector_results, lexical_results, k=RRF_K, floor=LEXICAL_RELATIVE_FLOOR):
+    """
+    Reciprocal rank fusion of [(doc, cosine)] and [(doc, bm25)]: ranked by
+    the sum of 1 / (k + rank) over both lists. A chunk keeps its cosine so
+    the context packer can still judge it. Chunks only the lexical index
+    found get their BM25 score relative to the top lexical hit, scaled to
+    the best cosine, so the packer's floor and relative cut apply to them
+    too. Without any cosine (text search) they get None instead, and the
+    ones under `floor` x the top BM25 score are dropped here.
+    """
+    fused, docs, cosines, bm25 = {}, {}, {}, {}
+    for results, is_vector in ((vector_results, True), (lexical_results, False)):
+        for rank, (doc, score) in enumerate(results, start=1):
+            key = doc_key(doc)
+            fused[key] = fused.get(key, 0.0) + 1.0 / (k + rank)
+            docs.setdefault(key, doc)
+            (cosines if is_vector else bm25)[key] = score
+    best_cosine = max((s for s in cosines.values() if s is not None), default=None)
+    top_bm25 = max(bm25.values(), default=0.0)
+    ranked = sorted(fused, key=fused.get, reverse=True)
+    if best_cosine is None:
+        ranked = [key for key in ranked if key in cosines or bm25[key] >= top_bm25 * floor]
+
+    def score(key):
+        if key in cosines or best_cosine is None:
+            return cosines.get(key)
+        return best_cosine * bm25[key] / top_bm25 if top_bm25 > 0 else 0.0
+
+    with _stats_lock:
+        stats["fused"] += 1
+    return [(docs[key], score(key)) for key in ranked]
+
+
+def lexical_only(lexical_results, floor=LEXICAL_RELATIVE_FLOOR):
+    """
+    [(doc, None)] for the BM25 hits when there are no vector results: BM25
+    scores can't go through the packer's cosine thresholds, so the hits
+    under `floor` x the top score are dropped here instead.
+    """
+    top = max((score for _, score in lexical_results), default=0.0)
+    return [(doc, None) for doc, score in lexical_results if score >= top * floor]
+
+
+def snapshot():
+    with _stats_lock:
+        return dict(stats)
@@ -0,0 +1,142 @@
+import os
+import json
+import time
+
+import numpy as np
+from langchain_core.documents import Document
+
+# --- SNAPSHOT LAYOUT ---
+# <path>/meta.json        dim, count, dtype, embedding model, created_at
+# <path>/embeddings.npy   (count, dim) float16, or int8 with per-row scales
+# <path>/scales.npy       (count,) float32, only for int8
+# <path>/chunks.jsonl     one {"text": ..., "metadata": {...}} per row, same order
+META_FILE = "meta.json"
+VECTORS_FILE = "embeddings.npy"
+SCALES_FILE = "scales.npy"
+CHUNKS_FILE = "chunks.jsonl"
+# float16 rows are widened to float32 once at load (NumPy has no fast float16 matmul)
+# as long as the copy stays under this size; bigger snapshots are scored straight off the mmap.
+FLOAT32_COPY_MAX_BYTES = 256 * 1024 * 1024
+
+
+def _unit_rows(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def write_snapshot(path, vectors, docs, dtype="float16", model=None):
+    """Writes chunk embeddings + text as a compact snapshot that LocalVectorIndex can memory-map."""
+    if dtype not in ("float16", "int8"):
+        raise ValueError(f"Unsupported snapshot dtype: {dtype}")
+    os.makedirs(path, exist_ok=True)
+    unit = _unit_rows(vectors)
+
+    if dtype == "int8":
+        scales = np.abs(unit).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        np.save(os.path.join(path, VECTORS_FILE), np.round(unit / scales[:, None]).astype(np.int8))
+        np.save(os.path.join(path, SCALES_FILE), scales.astype(np.float32))
+    else:
+        np.save(os.path.join(path, VECTORS_FILE), unit.astype(np.float16))
+
+    with open(os.path.join(path, CHUNKS_FILE), "w", encoding="utf-8") as f:
+        for doc in docs:
+            f.write(json.dumps({"text": doc.page_content, "metadata": doc.metadata}, default=str) + "\n")
+
+    meta = {
+        "dim": int(unit.shape[1]) if len(unit) else 0,
+        "count": int(len(unit)),
+        "dtype": dtype,
+        "model": model,
+        "created_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+    # meta.json last: a snapshot without it is incomplete and won't load
+    with open(os.path.join(path, META_FILE), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    return meta
+
+
+def read_snapshot_vectors(path):
+    """{chunk_id: unit vector} from an existing snapshot, so re-ingest can skip re-embedding unchanged chunks."""
+    if not os.path.exists(os.path.join(path, META_FILE)):
+        return {}
+    with open(os.path.join(path, META_FILE), encoding="utf-8") as f:
+        meta = json.load(f)
+    vectors = np.load(os.path.join(path, VECTORS_FILE)).astype(np.float32)
+    if meta["dtype"] == "int8":
+        vectors *= np.load(os.path.join(path, SCALES_FILE))[:, None]
+    with open(os.path.join(path, CHUNKS_FILE), encoding="utf-8") as f:
+        ids = [json.loads(line).get("metadata", {}).get("chunk_id") for line in f if line.strip()]
+    return {i: v for i, v in zip(ids, vectors) if i}
+
+
+class LocalVectorIndex:
+    """
+    In-process replacement for PineconeVectorStore over a snapshot written by
+    `write_snapshot`. The embedding matrix is memory-mapped, and a search is a
+    single matrix-vector product plus argpartition, with no network hop (the
+    query itself is still embedded by the provider).
+
+    Query vectors must come from the model the snapshot was built with
+    (`self.model`); check `matches(model)` before searching.
+    """
+
+    def __init__(self, path, embedding=None):
+        with open(os.path.join(path, META_FILE), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.path = path
+        self.model = self.meta.get("model")
+        self.embeddings = embedding
+        self._mismatches = set()
+        self.vectors = np.load(os.path.join(path, VECTORS_FILE), mmap_mode="r")
+        if self.vectors.dtype == np.float16 and self.vectors.size * 4 <= FLOAT32_COPY_MAX_BYTES:
+            self.vectors = np.asarray(self.vectors, dtype=np.float32)
+        self.scales = np.load(os.path.join(path, SCALES_FILE)) if self.meta["dtype"] == "int8" else None
+        with open(os.path.join(path, CHUNKS_FILE), encoding="utf-8") as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+        self.docs = [Document(page_content=r["text"], metadata=r.get("metadata", {})) for r in rows]
+        print(f"📦 Local index loaded: {len(self.docs)} chunks ({self.meta['dtype']}) from {path}")
+
+    def matches(self, model):
+        """
+        True if query vectors from `model` can be searched here. A snapshot
+        from another (or an unrecorded) model would return unrelated chunks.
+        """
+        if self.model and self.model == model:
+            return True
+        if model not in self._mismatches:
+            self._mismatches.add(model)
+            print(f"⚠️ Local index at {self.path} was built with {self.model or 'an unrecorded model'}, "
+                  f"not {model}: not using it (re-run scripts/ingest.py --snapshot)")
+        return False
+
+    def similarity_search_by_vector_with_score(self, embedding, k=4):
+        if not self.docs: return []
+        query = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm: query = query / norm
+        scores = self.vectors @ query
+        if self.scales is not None:
+            scores = scores * self.scales
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.docs[i], float(scores[i])) for i in top]
+
+    def similarity_search_by_vector(self, embedding, k=4, **kwargs):
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k)]
+
+    def similarity_search(self, query, k=4, **kwargs):
+        return self.similarity_search_by_vector(self.embeddings.embed_query(query), k)
+
+    # Same async surface as PineconeVectorStore. The search itself is CPU-only and sub-millisecond.
+    async def asimilarity_search_by_vector(self, embedding, k=4, **kwargs):
+        return self.similarity_search_by_vector(embedding, k)
+
+    async def asimilarity_search_by_vector_with_score(self, embedding, k=4, **kwargs):
+        return self.similarity_search_by_vector_with_score(embedding, k)
+
+    async def asimilarity_search(self, query, k=4, **kwargs):
+        return self.similarity_search_by_vector(await self.embeddings.aembed_query(query), k)
@@ -1,6 +1,10 @@
 import os
-from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse, HTMLResponse
+import json
+import time
+from typing import Optional
+from fastapi import FastAPI, Request, Query
+from fastapi.responses import JSONResponse, HTMLResponse, StreamingResponse, PlainTextResponse
+from starlette.routing import Match
 from fastapi.templating import Jinja2Templates
 from pydantic import BaseModel
 from fastapi.middleware.cors import CORSMiddleware
@@ -17,9 +21,12 @@ except ImportError:
 
 # --- 2. IMPORTS ---
 # Import the AI Graph as 'bot_graph'
-from backend.chatbot_graph import app as bot_graph 
-# We only need get_all_leads for the admin panel now
-from backend.dynamo_db import get_all_leads
+from backend.chatbot_graph import app as bot_graph, get_text, answer_cache, PROFILE_STATS, DEGRADED_STATS, warm_up, memory
+from backend import retrieval, resilience, context_packer, lexical_index, intents, metrics
+from backend.validators import email_checker
+from langchain_core.messages import AIMessage
+# Paginated readers for the admin panel
+from backend.dynamo_db import get_leads_page, get_chat_history, history_outbox
 
 # --- 3. INITIALIZE SERVER ---
 api = FastAPI()
@@ -33,10 +40,60 @@ api.add_middleware(
     allow_headers=["*"], 
 )
 
+# --- 4b. REQUEST METRICS ---
+def route_label(request):
+    """Route template (e.g. "/api/leads/{email}/history"), so each lead doesn't get its own series."""
+    for route in api.routes:
+        if route.matches(request.scope)[0] == Match.FULL:
+            return route.path
+    return "unmatched"
+
+@api.middleware("http")
+async def track_requests(request: Request, call_next):
+    # Labels every node / dependency timing made while serving this request.
+    # For /chat/stream this times the request until the first byte.
+    route = route_label(request)
+    token = metrics.current_route.set(route)
+    metrics.requests_in_flight.inc(route=route)
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        response = await call_next(request)
+        outcome = "ok" if response.status_code < 400 else "client_error" if response.status_code < 500 else "error"
+        return response
+    finally:
+        metrics.requests_in_flight.dec(route=route)
+        metrics.request_seconds.observe(time.perf_counter() - started, route=route, outcome=outcome)
+        metrics.current_route.reset(token)
+
 # --- 5. SETUP HANDLERS ---
-handler = Mangum(api) 
+_mangum = Mangum(api)
+OUTBOX_FLUSH_TIMEOUT = float(os.getenv("OUTBOX_FLUSH_TIMEOUT", "3"))  # per Lambda invocation
 templates = Jinja2Templates(directory="templates")
 
+# Clients are built lazily. WARM_UP_ON_START=1 builds them during Lambda's init
+# phase instead (it runs before billing starts and with full CPU).
+if os.getenv("WARM_UP_ON_START") == "1":
+    warm_up()
+
+def handler(event, context):
+    # Scheduled warmer pings (EventBridge, or {"warmup": true}) just build the clients
+    if isinstance(event, dict) and (event.get("warmup") or event.get("source") == "aws.events"):
+        return {"warmed": warm_up()}
+    try:
+        return _mangum(event, context)
+    finally:
+        # The sandbox is frozen once we return (and /tmp goes with it when it's recycled):
+        # write this invocation's chat history now instead of in a background thread
+        if not history_outbox.flush(timeout=OUTBOX_FLUSH_TIMEOUT):
+            print(f"⚠️ {history_outbox.pending()} history entries still in the outbox after this invocation")
+
+@api.on_event("shutdown")
+def flush_chat_history():
+    # Chat history is written behind the response; push what's left before exiting
+    if not history_outbox.flush(timeout=5):
+        print(f"⚠️ {history_outbox.pending()} history entries left in the outbox (kept on disk for the next start)")
+
 # --- 6. CHATBOT ROUTE ---
 class UserInput(BaseModel):
     message: str
@@ -51,19 +108,96 @@ async def chat_endpoint(user_input: UserInput):
     config = {"configurable": {"thread_id": user_input.session_id}}
     
     # Invoke the smart graph (It handles the limits, DB checks, and logic internally)
-    result = bot_graph.invoke(state, config=config)
+    # ainvoke keeps the event loop free while Gemini / Pinecone / DynamoDB respond
+    result = await bot_graph.ainvoke(state, config=config)
     
     # Extract the last message (Bot's reply)
     bot_reply = result["messages"][-1].content
     
     return {"response": bot_reply}
 
+# --- 6b. STREAMING CHATBOT ROUTE (SSE) ---
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@api.post("/chat/stream")
+async def chat_stream_endpoint(user_input: UserInput):
+    """
+    Same graph as /chat, but sends the reply as Server-Sent Events:
+    `token` events while Gemini generates, then one `done` event with the full text.
+    (Needs a streaming-capable host; Mangum on Lambda buffers the whole body.)
+    """
+    state = {"messages": [("user", user_input.message)]}
+    config = {"configurable": {"thread_id": user_input.session_id}}
+
+    async def event_stream():
+        reply = ""
+        try:
+            async for message, metadata in bot_graph.astream(state, config=config, stream_mode="messages"):
+                if not isinstance(message, AIMessage):
+                    continue
+                token = get_text(message.content)
+                if token:
+                    reply += token
+                    yield sse_event("token", {"token": token})
+            yield sse_event("done", {"response": reply})
+        except Exception as e:
+            print(f"❌ Stream Error: {e}")
+            yield sse_event("error", {"response": "I'm sorry, something went wrong. Please try again."})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 # --- 7. ADMIN & DATA ROUTES ---
 @api.get("/admin", response_class=HTMLResponse)
 async def admin_panel(request: Request):
     return templates.TemplateResponse("admin.html", {"request": request})
 
+# Plain `def`: FastAPI runs these in its thread pool, so boto3 doesn't block the event loop
 @api.get("/api/leads")
-async def get_leads_api():
-    leads = get_all_leads()
-    return {"leads": leads}
\ No newline at end of file
+def get_leads_api(limit: int = Query(50, ge=1, le=200), cursor: Optional[str] = None):
+    # Newest first; pass `next_cursor` back as `cursor` for the next page
+    return get_leads_page(limit=limit, cursor=cursor)
+
+@api.get("/api/leads/{email}/history")
+def get_lead_history_api(email: str, limit: int = Query(100, ge=1, le=500), cursor: Optional[str] = None):
+    return get_chat_history(email, limit=limit, cursor=cursor)
+
+@api.get("/api/stats")
+async def get_stats_api():
+    # Cache effectiveness counters for this worker
+    return {"answer_cache": answer_cache.snapshot(), "profile_cache": PROFILE_STATS,
+            "checkpointer": memory.snapshot(), "breakers": resilience.snapshot(),
+            "degraded_replies": DEGRADED_STATS, "context_packer": context_packer.snapshot(),
+            "lexical_index": lexical_index.snapshot(), "intents": intents.snapshot(),
+            "email_checks": email_checker.snapshot(), **retrieval.snapshot()}
+
+def cache_gauges():
+    """(name, help, labels, value) samples for /metrics, read from the caches' own counters."""
+    caches = {"answer": answer_cache.snapshot(), **{name.replace("_cache", ""): stats for name, stats in retrieval.snapshot().items()
+                                                    if name.endswith("_cache")}}
+    emails = email_checker.snapshot()
+    known = emails["preloaded"] + emails["hits"]
+    gauges = [("mh_cache_hit_ratio", "Hits / lookups since start", {"cache": name}, stats["hit_ratio"])
+              for name, stats in caches.items()]
+    gauges.append(("mh_cache_hit_ratio", "Hits / lookups since start", {"cache": "email_domain"},
+                   round(known / (known + emails["lookups"]), 4) if known + emails["lookups"] else 0.0))
+    gauges += [("mh_cache_entries", "Entries held", {"cache": name}, stats["entries"]) for name, stats in caches.items()]
+    gauges.append(("mh_single_flight_in_flight", "Distinct questions being answered right now", {},
+                   retrieval.inflight.snapshot()["in_flight"]))
+    gauges += [("mh_breaker_open", "1 while the provider's circuit breaker is open or probing", {"breaker": name},
+                int(state["state"] != "closed")) for name, state in resilience.snapshot().items()]
+    gauges.append(("mh_history_outbox_pending", "Chat history entries not yet in DynamoDB", {}, history_outbox.pending()))
+    gauges.append(("mh_history_outbox_dead_letters", "Chat history entries that kept failing (requeue_dead() retries them)",
+                   {}, history_outbox.dead_letters()))
+    gauges.append(("mh_intent_short_circuit_ratio", "Chat turns answered by the intent fast path", {},
+                   intents.snapshot()["short_circuit_ratio"]))
+    return gauges
+
+@api.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    # Prometheus text format: latency histograms per node / dependency, in-flight counts, cache hit ratios
+    return metrics.render(cache_gauges())
@@ -0,0 +1,180 @@
+import time
+import bisect
+import functools
+import threading
+import contextvars
+from contextlib import contextmanager
+
+from backend.resilience import is_rate_limit_error
+
+# --- CONFIGURATION ---
+# Seconds; wide enough for a cached answer (~1 ms) and a throttled Gemini turn (~12 s)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# HTTP route template of the request being served ("/chat", "/chat/stream", ...).
+# asyncio tasks and asyncio.to_thread copy it, so nodes and dependency calls
+# are labelled with the route that caused them; the outbox thread is "background".
+current_route = contextvars.ContextVar("current_route", default="background")
+
+REGISTRY = []
+
+
+def _labels(names, values):
+    return ",".join(f'{name}="{str(value)}"' for name, value in zip(names, values))
+
+
+class Counter:
+    """Monotonic count per label set."""
+    kind = "counter"
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(n, "") for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, _labels(self.labelnames, key), value) for key, value in sorted(self._values.items())]
+
+
+class Gauge(Counter):
+    """Value that goes up and down (in-flight calls)."""
+    kind = "gauge"
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram:
+    """Cumulative latency buckets plus sum and count per label set, in the Prometheus layout."""
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}  # label values -> [per-bucket counts (+Inf last), sum]
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def observe(self, seconds, **labels):
+        key = tuple(labels.get(n, "") for n in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][bisect.bisect_left(self.buckets, seconds)] += 1
+            series[1] += seconds
+
+    def samples(self):
+        rows = []
+        with self._lock:
+            for key, (counts, total) in sorted(self._series.items()):
+                labels = _labels(self.labelnames, key)
+                prefix = f"{labels}," if labels else ""
+                cumulative = 0
+                for bound, count in zip(self.buckets + ("+Inf",), counts):
+                    cumulative += count
+                    rows.append((f"{self.name}_bucket", f'{prefix}le="{bound}"', cumulative))
+                rows.append((f"{self.name}_sum", labels, round(total, 6)))
+                rows.append((f"{self.name}_count", labels, cumulative))
+        return rows
+
+
+# --- METRICS ---
+request_seconds = Histogram("mh_http_request_seconds", "HTTP request latency", ("route", "outcome"))
+requests_in_flight = Gauge("mh_http_requests_in_flight", "HTTP requests being served", ("route",))
+node_seconds = Histogram("mh_graph_node_seconds", "LangGraph node latency", ("node", "route", "outcome"))
+router_decisions = Counter("mh_router_decisions_total", "Next node chosen by the router", ("next_node",))
+dependency_seconds = Histogram("mh_dependency_seconds", "Outbound call latency (Gemini, embeddings, vector search, "
+                               "DynamoDB, DNS, checkpointer)", ("dependency", "operation", "route", "outcome"))
+dependency_in_flight = Gauge("mh_dependency_in_flight", "Outbound calls in progress", ("dependency",))
+
+
+def outcome_of(error):
+    if error is None: return "ok"
+    return "throttled" if is_rate_limit_error(error) else "error"
+
+
+class Call:
+    """What a `with dependency(...)` block reports; set `outcome` to override the ok / error default."""
+
+    def __init__(self):
+        self.outcome = None
+
+
+@contextmanager
+def dependency(name, operation):
+    """Times one outbound call: mh_dependency_seconds{dependency, operation, route, outcome} + in-flight gauge."""
+    call = Call()
+    route = current_route.get()
+    dependency_in_flight.inc(dependency=name)
+    started = time.perf_counter()
+    error = None
+    try:
+        yield call
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        dependency_in_flight.dec(dependency=name)
+        dependency_seconds.observe(time.perf_counter() - started, dependency=name, operation=operation, route=route,
+                                   outcome=call.outcome or outcome_of(error))
+
+
+def timed_node(name, node):
+    """Wraps an async graph node to record mh_graph_node_seconds{node, route, outcome}."""
+    @functools.wraps(node)
+    async def run(state):
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            result = await node(state)
+            outcome = "ok"
+            return result
+        finally:
+            node_seconds.observe(time.perf_counter() - started, node=name, route=current_route.get(), outcome=outcome)
+    return run
+
+
+def timed_router(router):
+    """Wraps the (sync) router: its latency as node "router", plus a count per decision."""
+    @functools.wraps(router)
+    def route(state):
+        started = time.perf_counter()
+        decision = router(state)
+        node_seconds.observe(time.perf_counter() - started, node="router", route=current_route.get(), outcome="ok")
+        router_decisions.inc(next_node=decision)
+        return decision
+    return route
+
+
+def render(gauges=()):
+    """
+    Prometheus text exposition of every metric, plus `gauges`: extra
+    (name, help, {labels}, value) samples read from the caches at scrape time.
+    """
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for name, labels, value in metric.samples():
+            lines.append(f"{name}{{{labels}}} {value}" if labels else f"{name} {value}")
+    described = set()
+    for name, help_text, labels, value in gauges:
+        if name not in described:
+            described.add(name)
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+        label_text = _labels(labels.keys(), labels.values())
+        lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,232 @@
+import os
+import json
+import time
+import asyncio
+import sqlite3
+import threading
+
+# --- CONFIGURATION ---
+# /tmp is the only writable path on Lambda and survives warm invocations.
+OUTBOX_PATH = os.getenv("OUTBOX_PATH", "/tmp/mh_chat_outbox.db")
+DRAIN_INTERVAL = float(os.getenv("OUTBOX_DRAIN_INTERVAL", "0.5"))  # seconds between idle polls
+BATCH_SIZE = 200       # rows claimed per drain pass
+LEASE_SECONDS = 60     # a claimed row becomes visible again if its writer dies
+MAX_BACKOFF = 300      # cap for retry delay (seconds)
+# Failed writes of one lead's batch before its entries are retried one by one and,
+# if they still fail, moved to the dead-letter table (so later history flows again)
+MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))
+
+
+class ChatOutbox:
+    """
+    Write-behind queue for chat history.
+
+    `enqueue` stores entries in a local SQLite file and returns immediately.
+    A daemon thread claims pending rows, merges them per email (in order) and
+    hands each group to `writer(email, entries)` in ONE call. Rows are deleted
+    only after the writer succeeds; failures are retried with exponential
+    backoff, so nothing is dropped when DynamoDB hiccups. After
+    `max_attempts` failures each entry gets one last write of its own, and
+    the ones that still fail go to the `dead_letters` table instead of
+    blocking the lead's later history. `requeue_dead()` retries them.
+
+    `enqueue` is blocking (SQLite): async code awaits `aenqueue`. With
+    `background=False` (Lambda, where a thread is frozen between
+    invocations) nothing drains until `flush()` is called.
+    """
+
+    def __init__(self, writer, path=OUTBOX_PATH, max_attempts=MAX_ATTEMPTS, background=True):
+        self.writer = writer
+        self.path = path
+        self.max_attempts = max_attempts
+        self.background = background
+        self.stats = {"enqueued": 0, "written": 0, "writes": 0, "failures": 0, "dead_lettered": 0}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                email TEXT NOT NULL,
+                entry TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt REAL NOT NULL DEFAULT 0,
+                lease_until REAL NOT NULL DEFAULT 0
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS outbox_email ON outbox (email, id)")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS dead_letters (
+                id INTEGER PRIMARY KEY,
+                email TEXT NOT NULL,
+                entry TEXT NOT NULL,
+                attempts INTEGER NOT NULL,
+                error TEXT,
+                failed_at REAL NOT NULL
+            )"""
+        )
+
+    # --- PRODUCER SIDE ---
+    def enqueue(self, email, entries):
+        """Durably queues a list of history entries (dicts) for one lead."""
+        if not email or not entries: return
+        rows = [(email, json.dumps(e)) for e in entries]
+        with self._lock:
+            self._conn.executemany("INSERT INTO outbox (email, entry) VALUES (?, ?)", rows)
+        self.stats["enqueued"] += len(rows)
+        self.start()
+        self._wake.set()
+
+    async def aenqueue(self, email, entries):
+        """`enqueue` on the default thread pool: the insert (and the drainer's lock) never block the event loop."""
+        await asyncio.to_thread(self.enqueue, email, entries)
+
+    def pending(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+
+    def dead_letters(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM dead_letters").fetchone()[0]
+
+    def requeue_dead(self, email=None):
+        """Moves dead letters (all, or one lead's) back into the outbox with a fresh attempt count."""
+        where, args = ("WHERE email = ?", (email,)) if email else ("", ())
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(f"INSERT INTO outbox (email, entry) SELECT email, entry FROM dead_letters {where} ORDER BY id", args)
+                count = self._conn.execute(f"DELETE FROM dead_letters {where}", args).rowcount
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        self._wake.set()
+        return count
+
+    # --- DRAINER ---
+    def start(self):
+        if not self.background: return
+        if self._thread and self._thread.is_alive(): return
+        self._thread = threading.Thread(target=self._run, name="chat-outbox", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                if self.drain_once() == 0:
+                    self._wake.wait(DRAIN_INTERVAL)
+                    self._wake.clear()
+            except Exception as e:
+                print(f"❌ Outbox Drainer Error: {e}")
+                time.sleep(DRAIN_INTERVAL)
+
+    def _claim(self):
+        """Atomically leases a batch of due rows, skipping leads with earlier rows still pending a retry."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    """SELECT id, email, entry, attempts FROM outbox
+                       WHERE email NOT IN (
+                           SELECT email FROM outbox WHERE next_attempt > ? OR lease_until > ?
+                       )
+                       ORDER BY id LIMIT ?""",
+                    (now, now, BATCH_SIZE),
+                ).fetchall()
+                if rows:
+                    self._conn.executemany(
+                        "UPDATE outbox SET lease_until = ? WHERE id = ?",
+                        [(now + LEASE_SECONDS, r[0]) for r in rows],
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return rows
+
+    def drain_once(self):
+        """Writes one claimed batch. Returns the number of rows processed."""
+        rows = self._claim()
+        groups = {}
+        for row_id, email, entry, attempts in rows:
+            group = groups.setdefault(email, {"ids": [], "entries": [], "attempts": 0})
+            group["ids"].append(row_id)
+            group["entries"].append(json.loads(entry))
+            group["attempts"] = max(group["attempts"], attempts)
+
+        for email, group in groups.items():
+            marks = ",".join("?" * len(group["ids"]))
+            try:
+                self.writer(email, group["entries"])
+                with self._lock:
+                    self._conn.execute(f"DELETE FROM outbox WHERE id IN ({marks})", group["ids"])
+                self.stats["writes"] += 1
+                self.stats["written"] += len(group["ids"])
+            except Exception as e:
+                self.stats["failures"] += 1
+                attempts = group["attempts"] + 1
+                if attempts >= self.max_attempts:
+                    self._write_one_by_one(email, group, attempts)
+                    continue
+                delay = min(2 ** attempts, MAX_BACKOFF)
+                print(f"⚠️ History write failed for {email} (attempt {attempts}, retry in {delay}s): {e}")
+                with self._lock:
+                    self._conn.execute(
+                        f"UPDATE outbox SET attempts = ?, next_attempt = ?, lease_until = 0 WHERE id IN ({marks})",
+                        [attempts, time.time() + delay, *group["ids"]],
+                    )
+        return len(rows)
+
+    def _write_one_by_one(self, email, group, attempts):
+        """Last try for a batch that keeps failing: entry by entry, so one poison entry only sinks itself."""
+        for row_id, entry in zip(group["ids"], group["entries"]):
+            try:
+                self.writer(email, [entry])
+                with self._lock:
+                    self._conn.execute("DELETE FROM outbox WHERE id = ?", (row_id,))
+                self.stats["writes"] += 1
+                self.stats["written"] += 1
+            except Exception as e:
+                print(f"❌ History entry for {email} dead-lettered after {attempts} attempts: {e}")
+                with self._lock:
+                    self._conn.execute("BEGIN IMMEDIATE")
+                    try:
+                        self._conn.execute(
+                            "INSERT INTO dead_letters (id, email, entry, attempts, error, failed_at) VALUES (?, ?, ?, ?, ?, ?)",
+                            (row_id, email, json.dumps(entry), attempts, str(e), time.time()),
+                        )
+                        self._conn.execute("DELETE FROM outbox WHERE id = ?", (row_id,))
+                        self._conn.execute("COMMIT")
+                    except Exception:
+                        self._conn.execute("ROLLBACK")
+                        raise
+                self.stats["dead_lettered"] += 1
+
+    def flush(self, timeout=5.0):
+        """
+        Drains synchronously until nothing is due (or timeout): on shutdown,
+        and at the end of every Lambda invocation. Rows waiting out a retry
+        backoff stay queued; returns True when the outbox is empty.
+        """
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if self.drain_once() == 0:
+                if self.pending() == 0:
+                    return True
+                if not self._due():
+                    return False
+            time.sleep(0.05)
+        return False
+
+    def _due(self):
+        """Whether some lead's rows aren't waiting out a backoff (leased rows count: their write is under way)."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT 1 FROM outbox WHERE email NOT IN (SELECT email FROM outbox WHERE next_attempt > ?) LIMIT 1",
+                (time.time(),),
+            ).fetchone() is not None
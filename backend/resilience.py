@@ -0,0 +1,133 @@
+import os
+import time
+import random
+import asyncio
+import threading
+
+# --- CONFIGURATION ---
+BACKOFF_BASE = float(os.getenv("BACKOFF_BASE", "0.5"))  # seconds before the first retry (before jitter)
+BACKOFF_MAX = float(os.getenv("BACKOFF_MAX", "4"))      # cap for one retry delay
+BREAKER_THRESHOLD = int(os.getenv("BREAKER_THRESHOLD", "5"))  # throttles within BREAKER_WINDOW that open it
+BREAKER_WINDOW = float(os.getenv("BREAKER_WINDOW", "30"))
+BREAKER_COOLDOWN = float(os.getenv("BREAKER_COOLDOWN", "30"))  # seconds open before a probe is let through
+
+
+def is_rate_limit_error(error):
+    """True for provider quota errors (HTTP 429 / RESOURCE_EXHAUSTED), as opposed to real failures."""
+    text = str(error)
+    return "429" in text or "RESOURCE_EXHAUSTED" in text or "rate limit" in text.lower()
+
+
+def backoff_delay(attempt, base=BACKOFF_BASE, cap=BACKOFF_MAX):
+    """Exponential backoff with full jitter: uniform in [0, min(cap, base * 2**attempt)]."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class BreakerOpen(Exception):
+    """Raised instead of calling a provider whose circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Process-wide breaker for one provider. `threshold` rate-limit errors
+    within `window` seconds open it: calls are refused (`allow()` is False)
+    for `cooldown` seconds, then a single probe call is let through. Its
+    success closes the breaker; another throttle opens it again. Other
+    errors are not the provider saying "slow down", so they don't count.
+    A probe that ends without either (cancelled: the client disconnected)
+    must call `release_probe()`; one that never reports back stops blocking
+    the next probe after another `cooldown`.
+    """
+
+    def __init__(self, name, threshold=BREAKER_THRESHOLD, window=BREAKER_WINDOW, cooldown=BREAKER_COOLDOWN):
+        self.name = name
+        self.threshold = threshold
+        self.window = window
+        self.cooldown = cooldown
+        self.state = "closed"
+        self.stats = {"throttles": 0, "opened": 0, "rejected": 0}
+        self._throttled_at = []
+        self._opened_at = 0.0
+        self._probing = False
+        self._probe_started = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == "closed":
+                return True
+            now = time.monotonic()
+            if self.state == "open" and now - self._opened_at >= self.cooldown:
+                self.state = "half_open"
+            if self.state == "half_open" and (not self._probing or now - self._probe_started >= self.cooldown):
+                self._probing = True
+                self._probe_started = now
+                return True
+            self.stats["rejected"] += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self._probing = False
+            self._throttled_at.clear()
+
+    def release_probe(self):
+        """Frees the probe slot of a call that was cancelled before the provider answered."""
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self, error):
+        with self._lock:
+            self._probing = False
+            if not is_rate_limit_error(error):
+                return
+            now = time.monotonic()
+            self.stats["throttles"] += 1
+            self._throttled_at = [t for t in self._throttled_at if now - t < self.window] + [now]
+            if self.state == "half_open" or (self.state == "closed" and len(self._throttled_at) >= self.threshold):
+                if self.state == "closed":
+                    print(f"🔌 Circuit breaker '{self.name}' opened after {len(self._throttled_at)} throttles")
+                self.state = "open"
+                self._opened_at = now
+                self.stats["opened"] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {**self.stats, "state": self.state}
+
+
+async def call_with_backoff(breaker, call, attempts=3, deadline=None):
+    """
+    Awaits `call()` through `breaker`, retrying failures with jittered
+    exponential backoff on the event loop (other sessions keep running).
+    Gives up early rather than sleep past `deadline` (a time.monotonic()
+    value), so a throttled provider can't stretch a request unboundedly.
+    Raises BreakerOpen if the breaker refuses the call.
+    """
+    for attempt in range(attempts):
+        if not breaker.allow():
+            raise BreakerOpen(breaker.name)
+        try:
+            result = await call()
+        except Exception as e:
+            breaker.record_failure(e)
+            delay = backoff_delay(attempt)
+            if attempt == attempts - 1 or (deadline and time.monotonic() + delay > deadline):
+                raise
+            await asyncio.sleep(delay)
+            continue
+        except BaseException:
+            breaker.release_probe()  # cancelled: no verdict on the provider
+            raise
+        breaker.record_success()
+        return result
+
+
+# One per provider, shared by every session in the process
+llm_breaker = CircuitBreaker("gemini")
+embedding_breaker = CircuitBreaker("embeddings")
+
+
+def snapshot():
+    return {b.name: b.snapshot() for b in (llm_breaker, embedding_breaker)}
@@ -0,0 +1,165 @@
+import os
+import re
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from backend import metrics
+
+# --- CONFIGURATION ---
+EMBEDDING_CACHE_MAX_BYTES = int(os.getenv("EMBEDDING_CACHE_MAX_BYTES", str(8 * 1024 * 1024)))
+DOCS_CACHE_MAX_BYTES = int(os.getenv("DOCS_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+LEXICAL_ANSWER_CACHE_MAX_BYTES = int(os.getenv("LEXICAL_ANSWER_CACHE_MAX_BYTES", str(4 * 1024 * 1024)))
+# Chunks fetched per question; the context packer keeps the ones worth their tokens
+RETRIEVAL_CANDIDATES = int(os.getenv("RETRIEVAL_CANDIDATES", "8"))
+
+
+def normalize_query(text):
+    """'  What are the FEES?? ' -> 'what are the fees' (case, punctuation and spacing don't matter)."""
+    text = re.sub(r"[^\w\s]", " ", str(text).lower())
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def vector_key(vector):
+    """Stable short hash of an embedding, used as a cache key."""
+    return hashlib.blake2b(np.asarray(vector, dtype=np.float32).tobytes(), digest_size=16).hexdigest()
+
+
+class BoundedCache:
+    """LRU cache bounded by the approximate bytes of what it holds, not by entry count."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.version = None
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+        self._entries = OrderedDict()  # key -> (value, size)
+        self._lock = threading.Lock()
+
+    def check_version(self, version):
+        """Drops every entry when the version (index generation) moves on."""
+        with self._lock:
+            if version != self.version:
+                if self._entries:
+                    self.stats["invalidations"] += 1
+                self._entries.clear()
+                self.bytes = 0
+                self.version = version
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return entry[0]
+
+    def put(self, key, value, size):
+        if size > self.max_bytes: return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old:
+                self.bytes -= old[1]
+            self._entries[key] = (value, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.bytes -= evicted_size
+                self.stats["evictions"] += 1
+
+    def snapshot(self):
+        total = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hit_ratio": round(self.stats["hits"] / total, 4) if total else 0.0,
+        }
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical work: while a call for `key` is in flight,
+    later callers with the same key await that call's result instead of
+    starting their own. Nothing is kept once it finishes (that's the caches'
+    job); this only covers the burst before the first answer is cached.
+    """
+
+    def __init__(self):
+        self.stats = {"leaders": 0, "followers": 0}
+        self._inflight = {}  # key -> asyncio.Task
+
+    async def do(self, key, call):
+        """Returns (result, shared): `shared` is True when another caller's call produced it."""
+        task = self._inflight.get(key)
+        shared = task is not None
+        if shared:
+            self.stats["followers"] += 1
+        else:
+            self.stats["leaders"] += 1
+            # A task of its own (inheriting the leader's context, so its tokens
+            # still stream to the leader), shielded so one caller disconnecting
+            # doesn't cancel it for the others
+            task = asyncio.ensure_future(call())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._inflight.pop(key, None) if self._inflight.get(key) is t else None)
+        return await asyncio.shield(task), shared
+
+    def snapshot(self):
+        return {**self.stats, "in_flight": len(self._inflight)}
+
+
+# Tier 1: normalized query text -> embedding (saves the Google embedding call)
+embedding_cache = BoundedCache(EMBEDDING_CACHE_MAX_BYTES)
+# Tier 2: embedding -> top-k (document, score) pairs for one index generation (saves the Pinecone query)
+docs_cache = BoundedCache(DOCS_CACHE_MAX_BYTES)
+# Tier 3: decisive BM25 hit + normalized question -> answer, for one index generation. Those
+# questions skip the embedding, so the semantic answer cache (keyed by vector) can't serve them
+lexical_answer_cache = BoundedCache(LEXICAL_ANSWER_CACHE_MAX_BYTES)
+# Identical questions asked at the same time share one embedding, search and generation
+inflight = SingleFlight()
+
+
+def _embedding_key(embeddings, text):
+    return f"{getattr(embeddings, 'model', '')}:{normalize_query(text)}"
+
+
+def cached_query_vector(embeddings, text):
+    """The vector already cached for this query and model, or None. Never calls the embedding API."""
+    vector = embedding_cache.get(_embedding_key(embeddings, text))
+    return vector.tolist() if vector is not None else None
+
+
+async def embed_query(embeddings, text):
+    """Embeds a query, reusing the vector of any earlier query with the same normalized text and model."""
+    key = _embedding_key(embeddings, text)
+    vector = embedding_cache.get(key)
+    if vector is None:
+        with metrics.dependency("embeddings", "embed_query"):
+            vector = np.asarray(await embeddings.aembed_query(text), dtype=np.float32)
+        embedding_cache.put(key, vector, vector.nbytes + len(key))
+    return vector.tolist()
+
+
+async def search(vector_store, query_vector, k, generation):
+    """Top-k [(document, score)] for an embedding, best first, cached per knowledge-base generation."""
+    docs_cache.check_version(generation)
+    key = f"{vector_key(query_vector)}:{k}"
+    scored = docs_cache.get(key)
+    if scored is None:
+        with metrics.dependency("vector", "search"):
+            scored = await vector_store.asimilarity_search_by_vector_with_score(query_vector, k=k)
+        size = sum(len(d.page_content) + len(str(d.metadata)) for d, _ in scored) + len(key)
+        docs_cache.put(key, scored, size)
+    return scored
+
+
+def snapshot():
+    return {"embedding_cache": embedding_cache.snapshot(), "docs_cache": docs_cache.snapshot(),
+            "lexical_answer_cache": lexical_answer_cache.snapshot(), "single_flight": inflight.snapshot()}
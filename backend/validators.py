@@ -1,11 +1,198 @@
-import phonenumbers
+import os
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+
+# Imported up front: FastAPI's OpenAPI models load it at start-up anyway
 from email_validator import validate_email, EmailNotValidError
 
+from backend.retrieval import SingleFlight
+from backend import metrics
+
+# --- CONFIGURATION ---
+EMAIL_DOMAIN_TTL = float(os.getenv("EMAIL_DOMAIN_TTL", str(24 * 3600)))        # seconds a deliverable domain is trusted
+EMAIL_DOMAIN_NEGATIVE_TTL = float(os.getenv("EMAIL_DOMAIN_NEGATIVE_TTL", "3600"))  # ... and a dead one remembered
+EMAIL_DOMAIN_CACHE_SIZE = int(os.getenv("EMAIL_DOMAIN_CACHE_SIZE", "10000"))
+EMAIL_DNS_TIMEOUT = float(os.getenv("EMAIL_DNS_TIMEOUT", "2"))    # one MX/A lookup, in the background
+# How long the email step waits for an uncached domain before accepting the
+# address anyway (the lookup still finishes and fills the cache)
+EMAIL_CHECK_BUDGET = float(os.getenv("EMAIL_CHECK_BUDGET", "0.3"))
+
+# Known to accept mail: never looked up
+COMMON_PROVIDERS = {
+    "gmail.com", "googlemail.com", "yahoo.com", "yahoo.co.in", "yahoo.in", "ymail.com", "rocketmail.com",
+    "outlook.com", "outlook.in", "hotmail.com", "live.com", "msn.com", "icloud.com", "me.com", "aol.com",
+    "rediffmail.com", "protonmail.com", "proton.me", "zoho.com", "zohomail.in", "gmx.com", "mail.com",
+}
+
+
+class DNSResolver:
+    """MX / A lookups with dnspython's async resolver (imported on first use)."""
+
+    def __init__(self, timeout=EMAIL_DNS_TIMEOUT):
+        self.timeout = timeout
+        self._resolver = None
+
+    async def lookup(self, domain, rdtype):
+        """
+        Record strings for `domain`: [] if it has none of that type, None if
+        the domain doesn't exist. Timeouts and server failures raise.
+        """
+        import dns.asyncresolver
+        import dns.resolver
+        if self._resolver is None:
+            self._resolver = dns.asyncresolver.Resolver()
+            self._resolver.lifetime = self.timeout
+        try:
+            answer = await self._resolver.resolve(domain, rdtype)
+        except dns.resolver.NXDOMAIN:
+            return None
+        except dns.resolver.NoAnswer:
+            return []
+        return [record.to_text() for record in answer]
+
+
+class StubResolver:
+    """
+    Offline resolver for tests and the stand-ins: `records` maps a domain to
+    {"MX": [...], "A": [...]}; any other domain doesn't exist. Domains in
+    `failing` raise like a DNS timeout.
+    """
+
+    def __init__(self, records=None, failing=(), delay=0.0):
+        self.records = records or {}
+        self.failing = set(failing)
+        self.delay = delay
+        self.calls = 0
+
+    async def lookup(self, domain, rdtype):
+        self.calls += 1
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if domain in self.failing:
+            raise TimeoutError(f"DNS lookup for {domain} timed out")
+        if domain not in self.records:
+            return None
+        return list(self.records[domain].get(rdtype, []))
+
+
+class DeliverabilityChecker:
+    """
+    Async "does this email domain accept mail?" with a per-domain cache.
+    A domain is deliverable when it has an MX record (other than a null MX,
+    RFC 7505) or, with no MX at all, an A/AAAA record (RFC 5321 implicit MX).
+
+    Results are cached for `ttl` (deliverable) or `negative_ttl` (missing
+    domain / null MX). Lookup failures are not cached and count as unknown.
+    COMMON_PROVIDERS are preloaded and never looked up. Concurrent checks of
+    one domain share a single lookup.
+    """
+
+    def __init__(self, resolver=None, ttl=EMAIL_DOMAIN_TTL, negative_ttl=EMAIL_DOMAIN_NEGATIVE_TTL,
+                 max_entries=EMAIL_DOMAIN_CACHE_SIZE, preload=COMMON_PROVIDERS):
+        self.resolver = resolver or DNSResolver()
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.preloaded = {d.lower() for d in preload}
+        self.stats = {"preloaded": 0, "hits": 0, "lookups": 0, "undeliverable": 0, "errors": 0, "timeouts": 0}
+        self._entries = OrderedDict()  # domain -> (deliverable, expires_at)
+        self._inflight = SingleFlight()
+        self._lock = threading.Lock()
+
+    def cached(self, domain):
+        """True / False from the preload list or cache, None if the domain has to be looked up."""
+        domain = domain.lower()
+        with self._lock:
+            if domain in self.preloaded:
+                self.stats["preloaded"] += 1
+                return True
+            entry = self._entries.get(domain)
+            if entry is None: return None
+            if entry[1] <= time.monotonic():
+                del self._entries[domain]
+                return None
+            self._entries.move_to_end(domain)
+            self.stats["hits"] += 1
+            return entry[0]
+
+    def _store(self, domain, deliverable):
+        ttl = self.ttl if deliverable else self.negative_ttl
+        with self._lock:
+            self._entries[domain] = (deliverable, time.monotonic() + ttl)
+            self._entries.move_to_end(domain)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    async def _lookup(self, domain):
+        self._count("lookups")
+        try:
+            with metrics.dependency("dns", "deliverability"):
+                mx = await self.resolver.lookup(domain, "MX")
+                if mx is None:
+                    deliverable = False
+                elif mx:
+                    # Null MX ("0 .") explicitly says the domain takes no mail
+                    deliverable = any(record.split()[-1] != "." for record in mx)
+                else:
+                    deliverable = bool(await self.resolver.lookup(domain, "A") or await self.resolver.lookup(domain, "AAAA"))
+        except Exception as e:
+            self._count("errors")
+            print(f"⚠️ DNS lookup for {domain} failed: {e}")
+            return None
+        if not deliverable:
+            self._count("undeliverable")
+        self._store(domain, deliverable)
+        return deliverable
+
+    async def check(self, domain, budget=None):
+        """
+        True / False, or None when unknown (DNS failure, or no answer within
+        `budget` seconds: the lookup carries on and fills the cache).
+        """
+        domain = domain.lower().rstrip(".")
+        known = self.cached(domain)
+        if known is not None:
+            return known
+        try:
+            # SingleFlight shields the lookup, so running out of budget doesn't cancel it
+            result, _ = await asyncio.wait_for(self._inflight.do(domain, lambda: self._lookup(domain)), budget)
+            return result
+        except asyncio.TimeoutError:
+            self._count("timeouts")
+            return None
+
+    def snapshot(self):
+        with self._lock:
+            return {**self.stats, "entries": len(self._entries)}
+
+
+# Shared by every session in the process
+email_checker = DeliverabilityChecker()
+
+
+async def acheck_email(email, checker=None, budget=EMAIL_CHECK_BUDGET):
+    """
+    Validates the syntax (no DNS) and then the domain through the cached
+    deliverability checker. Returns the normalized address. Raises
+    EmailNotValidError for bad syntax or a domain that takes no mail; an
+    unknown result (slow or failing DNS) is accepted.
+    """
+    valid = validate_email(email, check_deliverability=False)
+    if await (checker or email_checker).check(valid.ascii_domain, budget=budget) is False:
+        raise EmailNotValidError(f"The domain {valid.domain} does not accept email.")
+    return valid.normalized
+
+
 def check_email(email):
-    """Returns True if email is valid, False otherwise."""
+    """Returns True if email is valid, False otherwise. For scripts: it runs its own event loop."""
     try:
-        # check_deliverability=True checks if the domain (e.g. gmail.com) actually exists
-        validate_email(email, check_deliverability=True)
+        asyncio.run(acheck_email(email, budget=None))
         return True
     except EmailNotValidError as e:
         print(f"❌ Invalid Email: {str(e)}")
@@ -13,18 +200,19 @@ def check_email(email):
 
 def check_phone(phone):
     """Returns True if phone number is valid, False otherwise."""
+    import phonenumbers
     try:
         # 1. Parse the number (assuming generic international or default region)
         # If your users are mostly Indian, use default_region="IN"
-        parsed_number = phonenumbers.parse(phone, "IN") 
-        
+        parsed_number = phonenumbers.parse(phone, "IN")
+
         # 2. Check validity
         if phonenumbers.is_valid_number(parsed_number):
             return True
         else:
             print("❌ Valid format but invalid number (e.g. too short)")
             return False
-            
+
     except phonenumbers.NumberParseException:
         print("❌ Could not parse phone number")
-        return False
\ No newline at end of file
+        return False
@@ -0,0 +1,51 @@
+"""
+One-time backfill for the `leads_by_last_updated` GSI on MH_Aviation_Leads.
+
+Leads saved before the index existed have no `lead_bucket` attribute (and a few
+have no `last_updated`), so the sparse index skips them and /api/leads can't
+page through them. This stamps both attributes on every such item.
+
+Create the index first (Console -> Table -> Indexes -> Create index):
+    Partition key: lead_bucket (String)    Sort key: last_updated (String)
+    Projection: ALL (or INCLUDE the LEAD_SUMMARY_FIELDS in backend/dynamo_db.py)
+
+Usage (from the repo root):
+    python scripts/backfill_lead_index.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    from dotenv import load_dotenv
+    load_dotenv()
+except ImportError:
+    pass
+
+from backend.dynamo_db import table, LEAD_BUCKET
+
+
+def main():
+    updated = 0
+    scan_args = {"ProjectionExpression": "email, lead_bucket, last_updated, created_at"}
+    while True:
+        page = table.scan(**scan_args)
+        for item in page.get("Items", []):
+            if item.get("lead_bucket") == LEAD_BUCKET and item.get("last_updated"):
+                continue
+            last_updated = item.get("last_updated") or item.get("created_at") or "1970-01-01 00:00:00"
+            table.update_item(
+                Key={"email": item["email"]},
+                UpdateExpression="SET lead_bucket = :lb, last_updated = :t",
+                ExpressionAttributeValues={":lb": LEAD_BUCKET, ":t": last_updated},
+            )
+            updated += 1
+        if "LastEvaluatedKey" not in page:
+            break
+        scan_args["ExclusiveStartKey"] = page["LastEvaluatedKey"]
+    print(f"✅ Backfilled {updated} leads into the '{LEAD_BUCKET}' bucket.")
+
+
+if __name__ == "__main__":
+    main()
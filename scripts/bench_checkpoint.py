@@ -0,0 +1,113 @@
+"""
+Checkpoint cost per turn over one long conversation, against local stand-ins.
+
+Every turn LangGraph writes the session state through the checkpointer, so
+an ever-growing `messages` list makes each turn more expensive than the last.
+This runs the same conversation twice on a throwaway SQLite checkpointer:
+  * unbounded - MESSAGE_WINDOW=0, every message kept (the old behaviour)
+  * window    - MESSAGE_WINDOW messages kept (default from the env, 6)
+
+and prints the stored state size, bytes written and time spent in the
+checkpointer per turn. Exits 1 if, with the window, the last turn costs more
+than MAX_GROWTH x turn 10, so it can gate a release.
+
+Usage (from the repo root):
+    python scripts/bench_checkpoint.py                 # 50 turns
+    python scripts/bench_checkpoint.py --turns 100 --window 10
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.stand_ins import install_stand_ins
+
+install_stand_ins(llm=0, embedding=0, vector=0, dynamo=0)
+os.environ.setdefault("CHECKPOINT_BACKEND", "memory")
+
+import backend.chatbot_graph as graph  # noqa: E402
+from backend.checkpointer import SQLiteCheckpointSaver, pack_record  # noqa: E402
+
+MAX_GROWTH = 1.2
+REPORT_TURNS = (1, 10, 25, 50, 100)
+
+
+class MeasuredSaver(SQLiteCheckpointSaver):
+    """Adds up what the checkpointer costs during one turn."""
+
+    def reset_turn(self):
+        self.turn = {"bytes": 0, "seconds": 0.0, "state": 0}
+
+    def _save(self, thread_id, checkpoint_ns, record):
+        started = time.perf_counter()
+        blob = pack_record(record)
+        super()._save(thread_id, checkpoint_ns, record)
+        self.turn["seconds"] += time.perf_counter() - started
+        self.turn["bytes"] += len(blob)
+        self.turn["state"] = len(blob)
+
+
+def conversation(turns, session):
+    messages = ["Hi", f"{session}@example.com", "What courses do you offer?",
+                "What are the fees?", "Where is the campus?", "Which aircraft do you fly?",
+                "Rahul, DPS, Chennai, 9876543210"]
+    questions = ["Tell me about placements.", "How long is the CPL course?", "Is there a hostel?"]
+    while len(messages) < turns:
+        messages.append(questions[len(messages) % len(questions)])
+    return messages[:turns]
+
+
+async def run(window, turns, path):
+    graph.MESSAGE_WINDOW = window
+    saver = MeasuredSaver(path)
+    app = graph.workflow.compile(checkpointer=saver)
+    session = f"bench-{window}-{time.time_ns()}"
+    config = {"configurable": {"thread_id": session}}
+    costs = []
+    for message in conversation(turns, session):
+        saver.reset_turn()
+        await app.ainvoke({"messages": [("user", message)]}, config=config)
+        costs.append(dict(saver.turn))
+    return costs
+
+
+def report(label, costs):
+    print(f"\n{label}")
+    print(f"  {'turn':>5} {'state':>9} {'written':>10} {'time':>9}")
+    for turn in REPORT_TURNS:
+        if turn <= len(costs):
+            c = costs[turn - 1]
+            print(f"  {turn:>5} {c['state']:>8}B {c['bytes']:>9}B {c['seconds'] * 1000:>7.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=50)
+    parser.add_argument("--window", type=int, default=graph.MESSAGE_WINDOW)
+    args = parser.parse_args()
+    if args.turns < 10 or args.window <= 0:
+        parser.error("needs --turns >= 10 and --window > 0")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "checkpoints.db")
+        unbounded = asyncio.run(run(0, args.turns, path))
+        windowed = asyncio.run(run(args.window, args.turns, path))
+
+    report("📈 Unbounded (MESSAGE_WINDOW=0)", unbounded)
+    report(f"📉 Window (MESSAGE_WINDOW={args.window})", windowed)
+
+    growth = windowed[-1]["bytes"] / windowed[9]["bytes"]
+    print(f"\nTurn {args.turns} vs turn 10 bytes written: unbounded "
+          f"{unbounded[-1]['bytes'] / unbounded[9]['bytes']:.2f}x, window {growth:.2f}x")
+    if growth > MAX_GROWTH:
+        print(f"❌ Checkpoint cost still grows with the conversation ({growth:.2f}x > {MAX_GROWTH}x)")
+        sys.exit(1)
+    print(f"✅ Checkpoint cost is flat (within {MAX_GROWTH}x of turn 10)")
+
+
+if __name__ == "__main__":
+    main()
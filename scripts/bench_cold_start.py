@@ -0,0 +1,79 @@
+"""
+Cold-start benchmark: how long a fresh Python process takes to import the
+Lambda entry point (`backend.main`), and which heavy SDKs that drags in.
+
+Each run is a new interpreter (like a new Lambda sandbox), so nothing is
+shared between samples. The median is compared to scripts/cold_start_budget.json
+and the script exits 1 when the budget is exceeded or a module that should
+load lazily shows up at import time, so it can gate a release.
+
+Usage (from the repo root):
+    python scripts/bench_cold_start.py                 # 7 runs against the budget
+    python scripts/bench_cold_start.py --runs 15 --module backend.chatbot_graph
+    python scripts/bench_cold_start.py --warm-up       # also time warm_up() (needs real credentials)
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUDGET_PATH = os.path.join(ROOT, "scripts", "cold_start_budget.json")
+
+# Runs inside the fresh interpreter and prints one JSON line
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import {module}
+imported = time.perf_counter() - started
+result = {{"import_s": imported, "modules": sorted(m for m in {watched!r} if m in sys.modules)}}
+if {warm_up!r}:
+    from backend.chatbot_graph import warm_up
+    started = time.perf_counter()
+    result["warm_up"] = warm_up()
+    result["warm_up_s"] = time.perf_counter() - started
+print(json.dumps(result))
+"""
+
+
+def run_once(module, watched, warm_up):
+    code = PROBE.format(module=module, watched=watched, warm_up=warm_up)
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    with open(BUDGET_PATH, encoding="utf-8") as f:
+        budget = json.load(f)
+    parser = argparse.ArgumentParser(description="Measure import time of the Lambda entry point.")
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--module", default=budget["module"])
+    parser.add_argument("--warm-up", action="store_true", help="Also time warm_up() in each run")
+    args = parser.parse_args()
+
+    lazy = budget["lazy_modules"]
+    samples = [run_once(args.module, lazy, args.warm_up) for _ in range(args.runs)]
+    times = sorted(s["import_s"] * 1000 for s in samples)
+    median = statistics.median(times)
+    loaded = sorted({m for s in samples for m in s["modules"]})
+
+    print(f"📦 import {args.module}: median {median:.0f} ms | min {times[0]:.0f} | max {times[-1]:.0f} ({args.runs} runs)")
+    if args.warm_up:
+        print(f"🔥 warm_up(): median {statistics.median(s['warm_up_s'] for s in samples) * 1000:.0f} ms, last {samples[-1]['warm_up']}")
+
+    failed = False
+    if median > budget["import_ms"]:
+        print(f"❌ Over budget: {median:.0f} ms > {budget['import_ms']} ms")
+        failed = True
+    if loaded:
+        print(f"❌ Loaded at import time but should be lazy: {', '.join(loaded)}")
+        failed = True
+    if not failed:
+        print(f"✅ Within budget ({budget['import_ms']} ms), no lazy module loaded early")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Concurrency benchmark for the /chat graph against local stand-ins.
+
+Runs the same workload twice:
+  * serial     - one turn at a time. This is what a worker degrades to when a
+                 node blocks the event loop (the old sync `bot_graph.invoke`).
+  * concurrent - every session in flight at once through `ainvoke`.
+
+Usage (from the repo root):
+    python scripts/bench_concurrency.py --sessions 50
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.stand_ins import install_stand_ins
+
+install_stand_ins()
+# Fresh in-process sessions each run (session ids repeat between runs)
+os.environ.setdefault("CHECKPOINT_BACKEND", "memory")
+
+from backend.chatbot_graph import app as bot_graph  # noqa: E402
+
+TURNS = ["Hi", "{email}", "What courses do you offer?"]
+
+
+async def run_turn(session_id, message, latencies):
+    config = {"configurable": {"thread_id": session_id}}
+    start = time.perf_counter()
+    await bot_graph.ainvoke({"messages": [("user", message)]}, config=config)
+    latencies.append(time.perf_counter() - start)
+
+
+async def run_session(session_id, latencies):
+    for message in TURNS:
+        await run_turn(session_id, message.format(email=f"{session_id}@example.com"), latencies)
+
+
+async def bench(mode, sessions):
+    latencies = []
+    start = time.perf_counter()
+    if mode == "serial":
+        for i in range(sessions):
+            await run_session(f"{mode}-{i}", latencies)
+    else:
+        await asyncio.gather(*(run_session(f"{mode}-{i}", latencies) for i in range(sessions)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    print(
+        f"{mode:<11} turns={len(latencies):<5} wall={elapsed:7.2f}s "
+        f"throughput={len(latencies) / elapsed:7.1f} turns/s "
+        f"p50={statistics.median(latencies) * 1000:6.0f}ms "
+        f"p95={latencies[int(len(latencies) * 0.95) - 1] * 1000:6.0f}ms"
+    )
+    return len(latencies) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"🚀 {args.sessions} sessions x {len(TURNS)} turns")
+    serial = asyncio.run(bench("serial", args.sessions))
+    concurrent = asyncio.run(bench("concurrent", args.sessions))
+    print(f"📈 Speed-up: {concurrent / serial:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Context packing on a fixed query set: prompt tokens before and after.
+
+For each question in QUERIES the script embeds it, fetches
+RETRIEVAL_CANDIDATES scored chunks and compares two CONTEXT DATA blocks:
+  * baseline - the top 4 chunks joined as-is (the old prompt)
+  * packed   - backend.context_packer.pack_context: adaptive top-k from the
+               scores, overlap / repeated-sentence removal, token budget
+
+It prints tokens per question, the average saving, and how many of the
+question's keywords each block contains (a rough check that packing didn't
+throw away the answer). It exits 1 when the packed blocks' average keyword
+coverage falls more than --tolerance below the baseline's.
+
+By default it runs against the live knowledge base (published alias and its
+embedding model), so it needs GOOGLE_API_KEY plus Pinecone or a local
+snapshot. --stand-ins runs offline on the small corpus in scripts/stand_ins.py.
+Its bag-of-words cosines don't look like Gemini's, so the floor is off there
+and the defaults are only worth changing on the numbers of a live run; pass
+--relative / --gap to experiment with the stand-ins.
+
+Usage (from the repo root):
+    python scripts/bench_context.py
+    python scripts/bench_context.py --budget 400
+    python scripts/bench_context.py --relative 0.7 --gap 0.15
+    python scripts/bench_context.py --stand-ins --relative 0.6
+"""
+import argparse
+import asyncio
+import os
+import re
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+QUERIES = [
+    "What are the fees for the commercial pilot license course?",
+    "How long does the CPL course take?",
+    "Which aircraft are in the training fleet?",
+    "Where is MH Cockpit located?",
+    "What are the eligibility criteria for pilot training?",
+    "Do you offer a B.Sc Aviation degree?",
+    "Is hostel accommodation available?",
+    "Which airlines have your cadets been placed with?",
+    "Are scholarships or education loans available?",
+    "What medical certificate do I need?",
+    "Can I do a type rating after the CPL?",
+    "How do I contact admissions?",
+]
+BASELINE_K = 4
+STOPWORDS = {"what", "which", "where", "does", "have", "your", "with", "been", "that", "this", "there",
+             "from", "about", "after", "available", "offer", "take", "need", "long"}
+
+
+def keywords(question):
+    return {w for w in re.findall(r"\w+", question.lower()) if len(w) > 3 and w not in STOPWORDS}
+
+
+def coverage(words, context):
+    text = context.lower()
+    return sum(w in text for w in words) / len(words) if words else 1.0
+
+
+async def measure(budget, selection):
+    from backend import retrieval
+    from backend.chatbot_graph import current_index, resolve_index
+    from backend.context_packer import pack_context, estimate_tokens
+
+    published = await current_index()
+    embeddings, store = resolve_index(published)
+    rows = []
+    for question in QUERIES:
+        vector = await retrieval.embed_query(embeddings, question)
+        scored = await retrieval.search(store, vector, retrieval.RETRIEVAL_CANDIDATES, published["generation"])
+        baseline = "\n".join(d.page_content for d, _ in scored[:BASELINE_K])
+        packed, used = pack_context(scored, budget=budget, **selection)
+        words = keywords(question)
+        rows.append({
+            "question": question,
+            "baseline": estimate_tokens(baseline), "packed": estimate_tokens(packed), "chunks": len(used),
+            "cov_baseline": coverage(words, baseline), "cov_packed": coverage(words, packed),
+            "best": scored[0][1] if scored else 0.0,
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget", type=int, default=None, help="Token budget (default: CONTEXT_TOKEN_BUDGET)")
+    parser.add_argument("--min-score", type=float, default=None, help="Score floor (default: CONTEXT_MIN_SCORE)")
+    parser.add_argument("--relative", type=float, default=None, help="Relative cut (default: CONTEXT_RELATIVE_SCORE)")
+    parser.add_argument("--gap", type=float, default=None, help="Score gap cut (default: CONTEXT_SCORE_GAP)")
+    parser.add_argument("--tolerance", type=float, default=0.02,
+                        help="Allowed drop in average keyword coverage (0.02 = 2 points)")
+    parser.add_argument("--stand-ins", action="store_true", help="Offline: fake embeddings and vector store")
+    args = parser.parse_args()
+
+    if args.stand_ins:
+        from scripts.stand_ins import install_stand_ins
+        install_stand_ins(llm=0, embedding=0, vector=0, dynamo=0)
+        os.environ.setdefault("CHECKPOINT_BACKEND", "memory")
+    from backend.context_packer import CONTEXT_TOKEN_BUDGET, CONTEXT_MIN_SCORE, CONTEXT_RELATIVE_SCORE, CONTEXT_SCORE_GAP
+    budget = args.budget or CONTEXT_TOKEN_BUDGET
+    # The stand-in embeddings are bag-of-words: their cosines sit far below Gemini's, so the floor doesn't transfer
+    min_score = args.min_score if args.min_score is not None else (0.0 if args.stand_ins else CONTEXT_MIN_SCORE)
+    if args.stand_ins and args.relative is None:
+        print(f"ℹ️ Stand-in scores use the production relative cut ({CONTEXT_RELATIVE_SCORE}), tuned for Gemini's cosines; "
+              "pass --relative to experiment")
+
+    selection = {"min_score": min_score,
+                 "relative": args.relative if args.relative is not None else CONTEXT_RELATIVE_SCORE,
+                 "gap": args.gap if args.gap is not None else CONTEXT_SCORE_GAP}
+
+    rows = asyncio.run(measure(budget, selection))
+    print(f"\n📏 Context tokens per question (baseline = top {BASELINE_K} joined, packed = budget {budget}, "
+          f"floor {selection['min_score']}, relative {selection['relative']}, gap {selection['gap']})")
+    print(f"  {'baseline':>8} {'packed':>7} {'chunks':>6} {'best':>5} {'keywords':>11}  question")
+    for r in rows:
+        print(f"  {r['baseline']:>8} {r['packed']:>7} {r['chunks']:>6} {r['best']:>5.2f} "
+              f"{r['cov_baseline']:>5.0%}->{r['cov_packed']:<4.0%}  {r['question']}"
+              + ("  ⚠️ lost keywords" if r["cov_packed"] < r["cov_baseline"] else ""))
+
+    baseline = sum(r["baseline"] for r in rows)
+    packed = sum(r["packed"] for r in rows)
+    cov_b = sum(r["cov_baseline"] for r in rows) / len(rows)
+    cov_p = sum(r["cov_packed"] for r in rows) / len(rows)
+    summary = (f"{len(rows)} questions: {baseline / len(rows):.0f} -> {packed / len(rows):.0f} context tokens on average "
+               f"({1 - packed / baseline:.0%} fewer), keyword coverage {cov_b:.0%} -> {cov_p:.0%}")
+    if cov_b - cov_p > args.tolerance:
+        print(f"\n❌ {summary}: coverage fell more than {args.tolerance:.0%}")
+        sys.exit(1)
+    print(f"\n✅ {summary}")
+
+
+if __name__ == "__main__":
+    main()
@@ -112,23 +112,43 @@
 #     ingest_to_pinecone(raw_docs)
 
 import os
+import sys
 import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
-# Loaders
-from langchain_community.document_loaders import DirectoryLoader, TextLoader
-from langchain_community.document_loaders import AsyncChromiumLoader
-from langchain_community.document_transformers import Html2TextTransformer
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_pinecone import PineconeVectorStore
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
 from pinecone import Pinecone, ServerlessSpec
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from backend.dynamo_db import publish_index_generation, get_index_generation
+from backend.local_index import write_snapshot, read_snapshot_vectors
+from backend.lexical_index import write_lexical_index
+from scripts.rate_limiter import AdaptiveRateLimiter, is_rate_limit_error
+from scripts.manifest import IngestManifest, assign_chunk_ids, manifest_path
+from scripts.loaders import iter_documents
+
 # 1. SETUP
 load_dotenv()
 PINECONE_KEY = os.getenv("PINECONE_API_KEY")
 INDEX_NAME = os.getenv("PINECONE_INDEX_NAME")
 DATA_PATH = "backend/data"
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "models/text-embedding-004")
+LOCAL_INDEX_PATH = os.getenv("LOCAL_INDEX_PATH", "backend/index")
+# BM25 index over the same chunks, fused with vector results by the backend
+LEXICAL_INDEX_PATH = os.getenv("LEXICAL_INDEX_PATH", "backend/lexical")
+# Embedding/upsert pacing. The rate is only a starting point: the limiter
+# halves it on a 429 and creeps back up towards the quota it has observed.
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "50"))
+EMBED_WORKERS = int(os.getenv("EMBED_WORKERS", "4"))
+EMBED_RATE_PER_MIN = float(os.getenv("EMBED_RATE_PER_MIN", "600"))
+MAX_ATTEMPTS = 5
+# 429s in a row on one call before giving up (the quota is gone, not just tight)
+MAX_THROTTLES = int(os.getenv("EMBED_MAX_THROTTLES", "20"))
+DELETE_BATCH_SIZE = 1000
 
 IMPORTANT_URLS = [
     "https://mhcockpit.com/",
@@ -138,69 +158,212 @@ IMPORTANT_URLS = [
     "https://mhcockpit.com/contact-us/",
 ]
 
-def setup_pinecone():
+def setup_pinecone(index_name=INDEX_NAME, dimension=768):
     pc = Pinecone(api_key=PINECONE_KEY)
-    if INDEX_NAME not in [i.name for i in pc.list_indexes()]:
-        print(f"🔨 Creating index '{INDEX_NAME}' (Dim: 768)...")
+    if index_name not in [i.name for i in pc.list_indexes()]:
+        print(f"🔨 Creating index '{index_name}' (Dim: {dimension})...")
         pc.create_index(
-            name=INDEX_NAME,
-            dimension=768, 
+            name=index_name,
+            dimension=dimension,
             metric="cosine",
             spec=ServerlessSpec(cloud="aws", region="us-east-1")
         )
         time.sleep(10)
 
-def load_all_docs():
-    docs = []
-    # Text Files
-    if os.path.exists(DATA_PATH):
+def split_docs(documents):
+    """Splits documents one at a time as the loader stage streams them in."""
+    text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
+    chunks = []
+    for doc in documents:
+        chunks.extend(text_splitter.split_documents([doc]))
+    return chunks
+
+class Progress:
+    """Thread-safe progress/throughput line for the embed + upsert workers."""
+
+    def __init__(self, total, limiter):
+        self.total = total
+        self.limiter = limiter
+        self.done = 0
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+
+    def advance(self, count):
+        with self._lock:
+            self.done += count
+            elapsed = time.monotonic() - self.started
+            print(f"📤 {self.done}/{self.total} chunks | {self.done / elapsed:.1f} chunks/s | "
+                  f"limit {self.limiter.rate_per_min()}/min | {self.limiter.stats['throttles']} throttles")
+
+    def report(self):
+        elapsed = time.monotonic() - self.started
+        print(f"📊 {self.done} chunks in {elapsed:.1f}s ({self.done / max(elapsed, 1e-9):.1f} chunks/s), "
+              f"{self.limiter.stats['throttles']} throttles, {self.limiter.stats['waited_s']:.1f}s waiting on quota, "
+              f"final rate {self.limiter.rate_per_min()}/min")
+
+
+def with_retries(call, limiter=None, cost=1, attempts=MAX_ATTEMPTS, max_throttles=MAX_THROTTLES):
+    """
+    Runs `call` under the limiter. 429s feed the limiter and retry, up to
+    `max_throttles` of them; other errors back off and give up after `attempts`.
+    """
+    failures = throttles = 0
+    while True:
+        if limiter:
+            limiter.acquire(cost)
         try:
-            loader = DirectoryLoader(DATA_PATH, glob="*.txt", loader_cls=TextLoader, loader_kwargs={'encoding': 'utf-8'})
-            docs.extend(loader.load())
-        except: pass
-    
-    # Websites
-    try:
-        loader = AsyncChromiumLoader(IMPORTANT_URLS)
-        html_docs = loader.load()
-        html2text = Html2TextTransformer()
-        docs.extend(html2text.transform_documents(html_docs))
-    except: pass
-    
-    return docs
+            result = call()
+            if limiter:
+                limiter.on_success()
+            return result
+        except Exception as e:
+            if limiter and is_rate_limit_error(e):
+                limiter.on_rate_limited()
+                throttles += 1
+                if throttles >= max_throttles:
+                    print(f"❌ Still rate limited after {throttles} tries at {limiter.rate_per_min()}/min, giving up")
+                    raise
+                continue
+            failures += 1
+            if failures >= attempts:
+                raise
+            print(f"❌ Error: {e} (retry {failures}/{attempts - 1})")
+            time.sleep(2 ** failures)
 
-def turtle_upload(documents):
-    if not documents: return
 
-    # Split Data
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
-    chunks = text_splitter.split_documents(documents)
-    total = len(chunks)
-    print(f"🐢 TURTLE MODE: Processing {total} chunks...")
-    print("✨ Using Model: text-embedding-004 (New Quota Bucket)")
-
-    # --- CRITICAL CHANGE: USE NEW MODEL ---
-    embeddings = GoogleGenerativeAIEmbeddings(model="models/text-embedding-004")
-    # --------------------------------------
-    
-    vector_store = PineconeVectorStore(index_name=INDEX_NAME, embedding=embeddings)
-
-    # LOOP 1-BY-1
-    for i, chunk in enumerate(chunks):
-        success = False
-        while not success:
-            try:
-                print(f"📤 Uploading {i+1}/{total}...", end=" ")
-                vector_store.add_documents([chunk])
-                print("✅ Done. Waiting 5s...")
-                success = True
-                time.sleep(5) # Faster wait time for new model
-            except Exception as e:
-                print(f"\n❌ Error: {e}")
-                print("⚠️ HIT RATE LIMIT. Waiting 60s...")
-                time.sleep(60)
+def embed_and_upload(chunks, index=None, on_commit=None, batch_size=EMBED_BATCH_SIZE, workers=EMBED_WORKERS,
+                     rate_per_min=EMBED_RATE_PER_MIN, model=EMBEDDING_MODEL):
+    """
+    Embeds chunks in batches with `embed_documents` and, if `index` is given,
+    upserts each batch under its deterministic chunk IDs, then calls
+    `on_commit(batch)`. Batches run on a bounded worker pool paced by an
+    AdaptiveRateLimiter that learns the real embedding quota from 429s.
+    Returns {chunk_id: vector}.
+    """
+    if not chunks: return {}
+    embeddings = GoogleGenerativeAIEmbeddings(model=model)
+    limiter = AdaptiveRateLimiter(rate_per_min)
+    progress = Progress(len(chunks), limiter)
+    vectors = {}
+    print(f"🚀 Embedding {len(chunks)} chunks with {model}: batches of {batch_size}, {workers} workers, starting at {rate_per_min}/min")
+
+    def run_batch(start):
+        batch = chunks[start:start + batch_size]
+        texts = [c.page_content for c in batch]
+        batch_vectors = with_retries(lambda: embeddings.embed_documents(texts), limiter, cost=len(texts))
+        if index is not None:
+            records = [
+                {"id": c.metadata["chunk_id"], "values": v, "metadata": {**c.metadata, "text": c.page_content}}
+                for c, v in zip(batch, batch_vectors)
+            ]
+            with_retries(lambda: index.upsert(vectors=records))
+        if on_commit:
+            on_commit(batch)
+        vectors.update((c.metadata["chunk_id"], v) for c, v in zip(batch, batch_vectors))
+        progress.advance(len(batch))
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        # list() re-raises the first batch that ran out of retries
+        list(pool.map(run_batch, range(0, len(chunks), batch_size)))
+    progress.report()
+    return vectors
+
+def delete_removed(index, manifest, ids):
+    """Deletes vectors whose chunks no longer exist in the source documents."""
+    ids = list(ids)
+    for start in range(0, len(ids), DELETE_BATCH_SIZE):
+        batch = ids[start:start + DELETE_BATCH_SIZE]
+        with_retries(lambda: index.delete(ids=batch))
+        manifest.remove(batch)
+    if ids:
+        print(f"🗑️ Deleted {len(ids)} stale vectors")
+
+def sync_pinecone(chunks, args, index_name=INDEX_NAME, model=EMBEDDING_MODEL, dimension=768, failed=()):
+    """
+    Brings the Pinecone index in line with `chunks`: embeds only the chunk IDs
+    the manifest hasn't seen, deletes the ones that disappeared. Chunks of
+    `failed` sources (they didn't load this run) are kept. Returns
+    ({chunk_id: vector} for what was embedded, whether anything changed).
+    """
+    setup_pinecone(index_name, dimension)
+    index = Pinecone(api_key=PINECONE_KEY).Index(index_name)
+    manifest = IngestManifest(manifest_path(index_name), model)
+    if args.rebuild:
+        print(f"🧹 Rebuild: clearing every vector in '{index_name}'")
+        index.delete(delete_all=True)
+        manifest.reset()
+
+    current = {c.metadata["chunk_id"] for c in chunks}
+    pending = [c for c in chunks if c.metadata["chunk_id"] not in manifest.ids]
+    removed = manifest.stale(current, keep_sources=failed)
+    if failed:
+        print(f"⚠️ {len(failed)} sources failed to load, keeping their indexed chunks: {', '.join(sorted(failed))}")
+    print(f"🧾 {len(chunks)} chunks: {len(chunks) - len(pending)} already indexed, {len(pending)} to embed, {len(removed)} to delete")
+
+    vectors = embed_and_upload(pending, index=index, on_commit=manifest.commit, batch_size=args.batch_size,
+                               workers=args.workers, rate_per_min=args.rate, model=model)
+    delete_removed(index, manifest, removed)
+    manifest.compact()
+    return vectors, bool(pending or removed)
+
+def write_local_snapshot(chunks, vectors, args, model=EMBEDDING_MODEL):
+    """
+    Writes the snapshot the backend can load with VECTOR_BACKEND=local.
+    Vectors come from this run, then the previous snapshot; only chunks
+    found in neither are embedded.
+    """
+    if not chunks: return
+    known = {**read_snapshot_vectors(args.snapshot), **vectors}
+    missing = [c for c in chunks if c.metadata["chunk_id"] not in known]
+    known.update(embed_and_upload(missing, batch_size=args.batch_size, workers=args.workers, rate_per_min=args.rate, model=model))
+    rows = [known[c.metadata["chunk_id"]] for c in chunks]
+    meta = write_snapshot(args.snapshot, rows, chunks, dtype=args.snapshot_dtype, model=model)
+    print(f"📦 Snapshot written to {args.snapshot}: {meta['count']} x {meta['dim']} ({args.snapshot_dtype})")
+
+def write_lexical(chunks, path):
+    """Rebuilds the BM25 index from every chunk (no embeddings involved, so it takes a second at most)."""
+    if not chunks: return
+    meta = write_lexical_index(path, chunks)
+    size = sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+    print(f"🔤 Lexical index written to {path}: {meta['count']} chunks, {meta['terms']} terms, {size / 1024:.0f} KB")
 
 if __name__ == "__main__":
-    setup_pinecone()
-    raw_docs = load_all_docs()
-    turtle_upload(raw_docs)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Load, chunk and index the MH Cockpit knowledge base.")
+    parser.add_argument("--snapshot", nargs="?", const=LOCAL_INDEX_PATH, default=None,
+                        help=f"Also write a local index snapshot (default path: {LOCAL_INDEX_PATH})")
+    parser.add_argument("--snapshot-dtype", choices=["float16", "int8"], default="float16")
+    parser.add_argument("--skip-pinecone", action="store_true", help="Only build the local snapshot")
+    parser.add_argument("--lexical", default=LEXICAL_INDEX_PATH,
+                        help=f"Where to write the BM25 lexical index (default: {LEXICAL_INDEX_PATH})")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="Delete every vector and re-embed from scratch (e.g. to drop vectors from pre-manifest runs)")
+    parser.add_argument("--batch-size", type=int, default=EMBED_BATCH_SIZE, help="Chunks per embed/upsert call")
+    parser.add_argument("--workers", type=int, default=EMBED_WORKERS, help="Parallel embed/upsert batches")
+    parser.add_argument("--rate", type=float, default=EMBED_RATE_PER_MIN,
+                        help="Starting embedding rate (texts/min); adapts to the real quota on 429s")
+    args = parser.parse_args()
+
+    # Update whichever index the backend is live on (scripts/reindex.py may have switched it)
+    live = get_index_generation()
+    index_name = live["index_name"] or INDEX_NAME
+    model = live["embedding_model"] or EMBEDDING_MODEL
+
+    failed = set()
+    chunks = assign_chunk_ids(split_docs(iter_documents(DATA_PATH, IMPORTANT_URLS, failed=failed)))
+    vectors, changed = {}, False
+    if not args.skip_pinecone:
+        vectors, changed = sync_pinecone(chunks, args, index_name, model, failed=failed)
+    if failed:
+        # Both are rebuilt from this run's chunks only: keep the previous ones rather than drop a source
+        print("⚠️ Not rewriting the local snapshot and lexical index (a source failed to load); re-run to refresh them.")
+    else:
+        if args.snapshot:
+            # Reuses the vectors embedded for Pinecone above
+            write_local_snapshot(chunks, vectors, args, model)
+        write_lexical(chunks, args.lexical)
+    if changed:
+        # Tell the backend new content is live (drops cached answers)
+        generation = publish_index_generation(index_name, model)
+        print(f"🎉 Ingestion Complete! Published knowledge-base generation {generation}.")
+    elif not args.skip_pinecone:
+        print("✅ Knowledge base unchanged, nothing to publish.")
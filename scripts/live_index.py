@@ -0,0 +1,57 @@
+import os
+import sys
+import shutil
+
+from backend.dynamo_db import get_index_generation
+from scripts.manifest import manifest_path
+
+# Built by ingest.py alongside the live index (same defaults as the backend)
+LOCAL_INDEX_PATH = os.getenv("LOCAL_INDEX_PATH", "backend/index")
+LEXICAL_INDEX_PATH = os.getenv("LEXICAL_INDEX_PATH", "backend/lexical")
+
+
+def live_index_name():
+    """The index the backend searches: the published alias, else PINECONE_INDEX_NAME (its fallback). Raises if unreadable."""
+    return get_index_generation()["index_name"] or os.getenv("PINECONE_INDEX_NAME")
+
+
+def refuse_if_live(index_name, force=None):
+    """
+    Exits unless deleting `index_name` is safe. Deleting the index the
+    backend is serving from is an outage; scripts/reindex.py swaps it safely
+    instead. If the alias can't be read, the index may be live: refuse too.
+    `--force` on the command line (or force=True) deletes it anyway.
+    Returns whether the index is (or, alias unreadable, may be) the live one.
+    """
+    if force is None:
+        force = "--force" in sys.argv
+    try:
+        live = live_index_name() == index_name
+    except Exception as e:
+        if force: return True
+        print(f"🛑 Could not read the live index alias ({e}), so '{index_name}' may be the live index.")
+        print("   Fix the DynamoDB access, or pass --force to delete it anyway.")
+        sys.exit(1)
+    if live and not force:
+        print(f"🛑 '{index_name}' is the live index. Use `python scripts/reindex.py` to rebuild it without downtime,")
+        print("   or pass --force to delete it anyway.")
+        sys.exit(1)
+    return live
+
+
+def forget_index(index_name, live):
+    """
+    Clears the local ingest state of a deleted index: its manifest (otherwise
+    the next ingest.py run finds every chunk "already indexed" and leaves the
+    new index empty) and, if it was the live index, the local snapshot and
+    BM25 index built with it. The next ingest.py run writes them again.
+    """
+    path = manifest_path(index_name)
+    if os.path.exists(path):
+        os.remove(path)
+        print(f"🧹 Removed the ingest manifest {path}")
+    if live:
+        for folder in (LOCAL_INDEX_PATH, LEXICAL_INDEX_PATH):
+            if os.path.isdir(folder):
+                shutil.rmtree(folder)
+                print(f"🧹 Removed {folder} (ingest.py rebuilds it)")
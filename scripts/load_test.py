@@ -0,0 +1,246 @@
+"""
+Load test: thousands of concurrent sessions through the whole chat flow.
+
+Every session walks the flow from api_contract.json as the graph implements
+it today:
+    onboarding  "Hi", an invalid email, then a valid one
+    question    3 guest questions (RAG, or an FAQ intent)
+    details     4th question -> details prompt, a badly formatted reply,
+                then "Name, School, City, Phone"
+    question    6 questions as a registered lead
+    limit       one more -> "Query Limit Exceeded"
+
+By default the FastAPI app runs in-process (httpx ASGI transport) on the
+offline stand-ins from scripts/stand_ins.py. Each fake's latency is a
+number or a distribution ("lognormal:0.8:0.5", "bimodal:0.02:0.3:0.05"),
+and --real keeps some clients real. --url points the same flow at a
+running server instead.
+
+It reports throughput and p50/p95/p99 per route (endpoint + flow stage),
+plus replies that didn't match the stage (the flow broke under load). It
+then compares them to a stored baseline: it exits 1 when throughput drops,
+or a route's p95 grows, by more than --tolerance.
+
+Usage (from the repo root):
+    python scripts/load_test.py                                  # 1000 sessions vs scripts/load_baseline.json
+    python scripts/load_test.py --sessions 5000 --ramp 10 --llm lognormal:0.8:0.6
+    python scripts/load_test.py --endpoint /chat/stream --real dynamo
+    python scripts/load_test.py --save-baseline                  # after an intended change
+    python scripts/load_test.py --url http://127.0.0.1:8000 --sessions 50
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.stand_ins import ALL_FAKES, LATENCY, install_stand_ins
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "load_baseline.json")
+QUESTIONS = [
+    "What courses do you offer?", "How long is the CPL course?", "Which aircraft are in your fleet?",
+    "Is hostel accommodation available?", "Which airlines have your cadets joined?", "Do you offer a B.Sc Aviation degree?",
+    "What are the eligibility criteria?", "Are education loans available?", "What medical certificate do I need?",
+    "Can I do a type rating after the CPL?", "What is the fee structure?", "Where are you located?",
+]
+GUEST_QUESTIONS = 3
+REGISTERED_QUESTIONS = 6
+
+
+# (stage, message, text the reply must contain); None = any non-empty reply
+def session_script(email, rng):
+    steps = [("onboarding", "Hi", "Email ID"),
+             ("onboarding", "no i wont", "valid email"),
+             ("onboarding", email, "How can I help")]
+    steps += [("question", rng.choice(QUESTIONS), None) for _ in range(GUEST_QUESTIONS)]
+    steps += [("details", rng.choice(QUESTIONS), "EXACT format"),
+              ("details", "My name is Rahul and I am from DPS", "exact format"),
+              ("details", "Rahul, DPS, Chennai, 9876543210", "details are updated")]
+    steps += [("question", rng.choice(QUESTIONS), None) for _ in range(REGISTERED_QUESTIONS)]
+    steps.append(("limit", rng.choice(QUESTIONS), "Query Limit Exceeded"))
+    return steps
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values: return 0.0
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[int(rank) - 1]
+
+
+async def send(client, endpoint, session_id, message):
+    """One turn; returns the reply text (the `done` event for /chat/stream)."""
+    response = await client.post(endpoint, json={"message": message, "session_id": session_id})
+    response.raise_for_status()
+    if endpoint == "/chat":
+        return response.json()["response"]
+    reply = ""
+    for block in response.text.split("\n\n"):
+        if block.startswith("event: done"):
+            reply = json.loads(block.split("data: ", 1)[1])["response"]
+        elif block.startswith("event: error"):
+            raise RuntimeError(json.loads(block.split("data: ", 1)[1])["response"])
+    return reply
+
+
+async def run_session(client, args, index, run_id, results, start_at):
+    rng = random.Random(index)
+    await asyncio.sleep(max(0.0, start_at - time.perf_counter()))
+    session_id = f"load-{run_id}-{index}"
+    for stage, message, expected in session_script(f"{session_id}@example.com", rng):
+        route = f"{args.endpoint} {stage}"
+        started = time.perf_counter()
+        try:
+            reply = await send(client, args.endpoint, session_id, message)
+        except Exception as e:
+            results[route]["errors"] += 1
+            results[route]["error_types"][type(e).__name__] += 1
+            return  # the rest of this session's flow depends on the turn that failed
+        results[route]["latencies"].append(time.perf_counter() - started)
+        if not reply or (expected and expected not in reply):
+            results[route]["unexpected"] += 1
+        if args.think:
+            await asyncio.sleep(rng.uniform(0, 2 * args.think))
+
+
+async def run_load(args):
+    import httpx
+    if args.url:
+        transport, base_url = None, args.url
+    else:
+        from backend.main import api
+        transport, base_url = httpx.ASGITransport(app=api), "http://load-test"
+
+    results = defaultdict(lambda: {"latencies": [], "errors": 0, "unexpected": 0, "error_types": defaultdict(int)})
+    run_id = time.strftime("%H%M%S")
+    limits = httpx.Limits(max_connections=args.sessions, max_keepalive_connections=args.sessions)
+    async with httpx.AsyncClient(transport=transport, base_url=base_url, timeout=args.timeout, limits=limits) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            run_session(client, args, i, run_id, results, started + args.ramp * i / args.sessions)
+            for i in range(args.sessions)
+        ))
+        elapsed = time.perf_counter() - started
+    return results, elapsed
+
+
+def summarize(results, elapsed, args):
+    routes = {}
+    for route, r in sorted(results.items()):
+        latencies = sorted(r["latencies"])
+        routes[route] = {
+            "turns": len(latencies), "errors": r["errors"], "unexpected": r["unexpected"],
+            "p50": round(percentile(latencies, 50), 4), "p95": round(percentile(latencies, 95), 4),
+            "p99": round(percentile(latencies, 99), 4), "error_types": dict(r["error_types"]),
+        }
+    turns = sum(r["turns"] for r in routes.values())
+    return {
+        "settings": settings(args),
+        "elapsed_s": round(elapsed, 2),
+        "turns": turns,
+        "throughput": round(turns / elapsed, 1) if elapsed else 0.0,
+        "routes": routes,
+    }
+
+
+def settings(args):
+    """What a baseline is only comparable with."""
+    return {"sessions": args.sessions, "endpoint": args.endpoint, "ramp": args.ramp, "think": args.think,
+            "target": args.url or "in-process", "fakes": sorted(set(ALL_FAKES) - set(args.real)),
+            "latency": {k: LATENCY[k] for k in sorted(LATENCY)}}
+
+
+def report(summary):
+    print(f"\n  {'route':<22} {'turns':>7} {'errors':>7} {'wrong':>6} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for route, r in summary["routes"].items():
+        print(f"  {route:<22} {r['turns']:>7} {r['errors']:>7} {r['unexpected']:>6} "
+              f"{r['p50'] * 1000:>6.0f}ms {r['p95'] * 1000:>6.0f}ms {r['p99'] * 1000:>6.0f}ms")
+        if r["error_types"]:
+            print(f"  {'':<22} errors: {r['error_types']}")
+    print(f"\n📈 {summary['turns']} turns in {summary['elapsed_s']}s: {summary['throughput']} turns/s")
+
+
+def compare(summary, baseline, tolerance):
+    """Regression messages against `baseline` (empty list = within tolerance)."""
+    problems = []
+    if baseline["throughput"] and summary["throughput"] < baseline["throughput"] * (1 - tolerance):
+        problems.append(f"throughput {baseline['throughput']} -> {summary['throughput']} turns/s")
+    for route, old in baseline["routes"].items():
+        new = summary["routes"].get(route)
+        if new is None:
+            problems.append(f"{route}: no turns (was {old['turns']})")
+            continue
+        if old["p95"] and new["p95"] > old["p95"] * (1 + tolerance):
+            problems.append(f"{route}: p95 {old['p95'] * 1000:.0f}ms -> {new['p95'] * 1000:.0f}ms")
+        if new["errors"] + new["unexpected"] > old["errors"] + old["unexpected"]:
+            problems.append(f"{route}: {new['errors']} errors / {new['unexpected']} wrong replies "
+                            f"(was {old['errors']} / {old['unexpected']})")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=1000, help="Concurrent sessions")
+    parser.add_argument("--ramp", type=float, default=2.0, help="Seconds over which sessions start")
+    parser.add_argument("--think", type=float, default=0.0, help="Mean pause between a session's turns (seconds)")
+    parser.add_argument("--endpoint", choices=["/chat", "/chat/stream"], default="/chat")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Per-request timeout (seconds)")
+    parser.add_argument("--url", default=None, help="Drive a running server instead of the in-process app")
+    parser.add_argument("--real", nargs="*", default=[], choices=ALL_FAKES, help="Clients to keep real")
+    for kind in ALL_FAKES:
+        parser.add_argument(f"--{kind}", default=None, help=f"Stand-in latency (default {LATENCY[kind]})")
+    parser.add_argument("--verbose", action="store_true", help="Keep the backend's per-turn logging")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed regression vs the baseline (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    if not args.url:
+        latency = {kind: getattr(args, kind) for kind in ALL_FAKES if getattr(args, kind) is not None}
+        latency = {k: float(v) if v.replace(".", "", 1).isdigit() else v for k, v in latency.items()}
+        # Fresh in-process state: nothing left over from earlier runs
+        os.environ.setdefault("CHECKPOINT_BACKEND", "memory")
+        install_stand_ins(fakes=[f for f in ALL_FAKES if f not in args.real], **latency)
+
+    target = args.url or "in-process app"
+    print(f"🚀 {args.sessions} sessions x {len(session_script('x', random.Random(0)))} turns on {args.endpoint} "
+          f"({target}, ramp {args.ramp}s)")
+    if not args.url:
+        print(f"   stand-ins: {', '.join(f'{k}={LATENCY[k]}' for k in ALL_FAKES if k not in args.real)}"
+              + (f" | real: {', '.join(args.real)}" if args.real else ""))
+    # The backend logs every turn; at thousands of sessions that drowns the report
+    with contextlib.redirect_stdout(sys.stdout if args.verbose else open(os.devnull, "w")):
+        results, elapsed = asyncio.run(run_load(args))
+    summary = summarize(results, elapsed, args)
+    report(summary)
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+        print(f"💾 Baseline saved to {args.baseline}")
+        return
+    if not os.path.exists(args.baseline):
+        print(f"ℹ️ No baseline at {args.baseline} (run with --save-baseline to create one)")
+        return
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline["settings"] != summary["settings"]:
+        print(f"ℹ️ Baseline was recorded with other settings, not comparing: {baseline['settings']}")
+        return
+    problems = compare(summary, baseline, args.tolerance)
+    if problems:
+        print(f"❌ Regressions vs baseline (> {args.tolerance:.0%}):")
+        for problem in problems:
+            print(f"   - {problem}")
+        sys.exit(1)
+    print(f"✅ Within {args.tolerance:.0%} of the baseline ({baseline['throughput']} turns/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+import os
+import glob
+import asyncio
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+from langchain_core.documents import Document
+
+# --- CONFIGURATION ---
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "8"))
+LOADER_PROCESSES = int(os.getenv("LOADER_PROCESSES", str(os.cpu_count() or 2)))
+LOADER_THREADS = int(os.getenv("LOADER_THREADS", "8"))
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "4"))
+
+
+# --- WORKERS (module-level so the process pool can pickle them) ---
+def _pdf_page_count(path):
+    from pypdf import PdfReader
+    return len(PdfReader(path).pages)
+
+
+def _load_pdf_pages(path, start, stop):
+    """Extracts pages [start, stop) of one PDF. Runs in a worker process and returns plain dicts."""
+    from pypdf import PdfReader
+    reader = PdfReader(path)
+    source = os.path.basename(path)
+    return [
+        {"text": reader.pages[i].extract_text() or "", "metadata": {"source": source, "page": i, "source_type": "brochure"}}
+        for i in range(start, min(stop, len(reader.pages)))
+    ]
+
+
+def _load_text_file(path):
+    with open(path, encoding="utf-8") as f:
+        return [{"text": f.read(), "metadata": {"source": path}}]
+
+
+def _fetch_pages(urls, concurrency, loader=None):
+    """
+    Renders URLs in a headless browser, `concurrency` at a time, and converts
+    the HTML to text. Returns (pages, failed URLs): the loader doesn't raise
+    for a page that times out or errors, it returns "Error: ..." as the page
+    content, so each page is checked here.
+    """
+    if loader is None:
+        from langchain_community.document_loaders import AsyncChromiumLoader
+        loader = AsyncChromiumLoader(urls)
+    limit = asyncio.Semaphore(concurrency)
+
+    async def fetch(url):
+        async with limit:
+            html = await loader.ascrape_playwright(url)
+        if not html or not html.strip() or html.startswith("Error:"):
+            print(f"⚠️ Error loading {url}: {(html or '').strip()[:200] or 'empty page'}")
+            return url, None
+        return url, Document(page_content=html, metadata={"source": url})
+
+    async def fetch_all():
+        return await asyncio.gather(*(fetch(url) for url in urls))
+
+    results = asyncio.run(fetch_all())
+    docs = [doc for _, doc in results if doc is not None]
+    if docs:
+        from langchain_community.document_transformers import Html2TextTransformer
+        docs = Html2TextTransformer().transform_documents(docs)
+    pages = [{"text": d.page_content, "metadata": {**d.metadata, "source_type": "website_content"}} for d in docs]
+    return pages, [url for url, doc in results if doc is None]
+
+
+def _page_ranges(count, processes, pages_per_task):
+    """Page ranges for one PDF. Each task re-opens the file, so ranges are never smaller than count/processes."""
+    step = max(pages_per_task, -(-count // processes))
+    return [(start, start + step) for start in range(0, count, step)]
+
+
+def iter_pdf_documents(pdf_paths, processes=LOADER_PROCESSES, pages_per_task=PDF_PAGES_PER_TASK):
+    """Yields one Document per PDF page as worker processes finish them."""
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        counts = dict(zip(pdf_paths, pool.map(_pdf_page_count, pdf_paths)))
+        futures = [
+            pool.submit(_load_pdf_pages, path, start, stop)
+            for path, count in counts.items()
+            for start, stop in _page_ranges(count, processes, pages_per_task)
+        ]
+        for future in as_completed(futures):
+            for page in future.result():
+                yield Document(page_content=page["text"], metadata=page["metadata"])
+
+
+def iter_documents(data_path, urls=(), processes=LOADER_PROCESSES, threads=LOADER_THREADS, web_concurrency=WEB_CONCURRENCY,
+                   failed=None):
+    """
+    Streams every knowledge-base document: PDF pages from a process pool,
+    text files from a thread pool and web pages rendered concurrently, all
+    at once. Documents are yielded as soon as their task finishes, so the
+    caller can split them without holding the whole library in memory.
+    A source that fails is reported and skipped; pass a set as `failed` to
+    collect the `source` metadata of everything that didn't load, so the
+    caller can tell "removed from the library" from "failed this time".
+    """
+    pdfs = sorted(glob.glob(os.path.join(data_path, "*.pdf"))) if os.path.isdir(data_path) else []
+    texts = sorted(glob.glob(os.path.join(data_path, "*.txt"))) if os.path.isdir(data_path) else []
+    print(f"📂 Loading {len(pdfs)} PDFs, {len(texts)} text files and {len(urls)} web pages in parallel...")
+
+    with ProcessPoolExecutor(max_workers=processes) as procs, ThreadPoolExecutor(max_workers=threads) as pool:
+        futures = {}
+        # future -> (kind, what to log, the `source` of the documents it would have produced)
+        for path in pdfs:
+            futures[pool.submit(_pdf_page_count, path)] = ("count", path, [os.path.basename(path)])
+        for path in texts:
+            futures[pool.submit(_load_text_file, path)] = ("docs", path, [path])
+        if urls:
+            futures[pool.submit(_fetch_pages, list(urls), web_concurrency)] = ("web", "web pages", list(urls))
+
+        while futures:
+            for future in as_completed(list(futures)):
+                kind, source, sources = futures.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"⚠️ Error loading {source}: {e}")
+                    if failed is not None:
+                        failed.update(sources)
+                    continue
+                if kind == "count":
+                    # Page count known: fan the PDF out to the process pool in page ranges
+                    for start, stop in _page_ranges(result, processes, PDF_PAGES_PER_TASK):
+                        futures[procs.submit(_load_pdf_pages, source, start, stop)] = ("docs", source, sources)
+                    break
+                if kind == "web":
+                    # Only the pages that failed: the others loaded fine
+                    result, failed_urls = result
+                    if failed is not None:
+                        failed.update(failed_urls)
+                for doc in result:
+                    yield Document(page_content=doc["text"], metadata=doc["metadata"])
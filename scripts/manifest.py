@@ -0,0 +1,108 @@
+import os
+import json
+import hashlib
+import threading
+
+# One manifest per Pinecone index, listing the chunk IDs it already holds
+MANIFEST_DIR = os.getenv("INGEST_MANIFEST_DIR", ".ingest")
+
+
+def manifest_path(index_name):
+    return os.path.join(MANIFEST_DIR, f"{index_name}.jsonl")
+
+
+def chunk_id(chunk):
+    """Deterministic vector ID: the same text from the same source always maps to the same ID."""
+    source = str(chunk.metadata.get("source", ""))
+    return hashlib.sha256(f"{source}\n{chunk.page_content}".encode("utf-8")).hexdigest()[:32]
+
+
+def assign_chunk_ids(chunks):
+    """Stamps `chunk_id` into each chunk's metadata and drops exact duplicates (same source + text)."""
+    unique = {}
+    for chunk in chunks:
+        chunk.metadata["chunk_id"] = chunk_id(chunk)
+        unique.setdefault(chunk.metadata["chunk_id"], chunk)
+    return list(unique.values())
+
+
+class IngestManifest:
+    """
+    Append-only record of the chunk IDs already embedded into one Pinecone index.
+
+    Every committed batch is appended and fsynced before the next one
+    starts, so an interrupted ingest resumes from the last committed batch.
+    `compact()` rewrites the file with only the live IDs at the end of a
+    run. If the embedding model changes, the old entries are ignored and
+    everything is re-embedded.
+    """
+
+    def __init__(self, path, model):
+        self.path = path
+        self.model = model
+        self.ids = {}  # chunk_id -> source
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            self._load()
+
+    def _load(self):
+        with open(self.path, encoding="utf-8") as f:
+            lines = [json.loads(line) for line in f if line.strip()]
+        if not lines or lines[0].get("model") != self.model:
+            print(f"⚠️ Manifest {self.path} was built with another model, re-embedding everything.")
+            return
+        for entry in lines[1:]:
+            if entry.get("deleted"):
+                self.ids.pop(entry["id"], None)
+            else:
+                self.ids[entry["id"]] = entry.get("source")
+
+    def _append(self, entries):
+        new_file = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            if new_file:
+                f.write(json.dumps({"model": self.model}) + "\n")
+            for entry in entries:
+                f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def commit(self, chunks):
+        """Records a batch as indexed. Call only after its upsert succeeded."""
+        entries = [{"id": c.metadata["chunk_id"], "source": c.metadata.get("source")} for c in chunks]
+        with self._lock:
+            self._append(entries)
+            for entry in entries:
+                self.ids[entry["id"]] = entry["source"]
+
+    def stale(self, current_ids, keep_sources=()):
+        """
+        IDs this index holds that aren't in `current_ids`, except those whose
+        source is in `keep_sources` (sources that failed to load this run:
+        their chunks are missing, not deleted).
+        """
+        keep = set(keep_sources)
+        return {i for i, source in self.ids.items() if i not in current_ids and source not in keep}
+
+    def remove(self, ids):
+        with self._lock:
+            self._append([{"id": i, "deleted": True} for i in ids])
+            for i in ids:
+                self.ids.pop(i, None)
+
+    def reset(self):
+        with self._lock:
+            self.ids = {}
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+    def compact(self):
+        with self._lock:
+            tmp = self.path + ".tmp"
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(json.dumps({"model": self.model}) + "\n")
+                for i, source in self.ids.items():
+                    f.write(json.dumps({"id": i, "source": source}) + "\n")
+            os.replace(tmp, self.path)
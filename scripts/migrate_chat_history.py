@@ -0,0 +1,74 @@
+"""
+One-time migration: moves the legacy `chat_history` list off each lead item in
+MH_Aviation_Leads into MH_Aviation_Messages (one item per message), then
+removes the attribute so GetItem on the lead stays small.
+
+Safe to re-run: message keys are derived from the legacy timestamp and list
+position, so a second pass overwrites instead of duplicating.
+
+Usage (from the repo root):
+    python scripts/migrate_chat_history.py [--dry-run]
+"""
+import os
+import sys
+import argparse
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    from dotenv import load_dotenv
+    load_dotenv()
+except ImportError:
+    pass
+
+from backend.dynamo_db import table, write_chat_history
+
+
+def legacy_entries(history):
+    """Converts the old list entries into message items with sortable keys."""
+    entries = []
+    for i, entry in enumerate(history):
+        try:
+            when = datetime.strptime(entry.get("timestamp", ""), "%Y-%m-%d %H:%M:%S")
+        except ValueError:
+            when = datetime(1970, 1, 1)
+        entries.append({
+            "ts": f"{when.isoformat(timespec='microseconds')}#{i:05d}",
+            "role": entry.get("role", "user"),
+            "content": str(entry.get("content", "")),
+            "timestamp": entry.get("timestamp", ""),
+        })
+    return entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would move")
+    args = parser.parse_args()
+
+    leads = moved = 0
+    scan_args = {"ProjectionExpression": "email, chat_history"}
+    while True:
+        page = table.scan(**scan_args)
+        for item in page.get("Items", []):
+            history = item.get("chat_history")
+            if not history:
+                continue
+            leads += 1
+            moved += len(history)
+            print(f"📦 {item['email']}: {len(history)} messages")
+            if args.dry_run:
+                continue
+            write_chat_history(item["email"], legacy_entries(history))
+            table.update_item(Key={"email": item["email"]}, UpdateExpression="REMOVE chat_history")
+        if "LastEvaluatedKey" not in page:
+            break
+        scan_args["ExclusiveStartKey"] = page["LastEvaluatedKey"]
+
+    verb = "Would move" if args.dry_run else "Moved"
+    print(f"✅ {verb} {moved} messages from {leads} leads.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+import time
+import threading
+
+from backend.resilience import is_rate_limit_error  # noqa: F401 (re-exported for the ingest scripts)
+
+
+class AdaptiveRateLimiter:
+    """
+    Token bucket whose refill rate tracks the provider's real quota.
+
+    `acquire(cost)` blocks until `cost` tokens (e.g. texts in an embedding
+    batch) are available and charges all of them. A batch larger than the
+    bucket waits for a full bucket and leaves the balance negative, so the
+    next call waits off the debt: over time exactly `rate` tokens go
+    through, whatever the batch size. A 429 halves the rate and records the rate that
+    was throttled as the learned quota. Every `increase_after` clean calls
+    the rate grows by 20% while it is under that quota, and by 2% (a slow
+    probe, in case the quota was raised) once it is over it.
+    """
+
+    def __init__(self, rate_per_min, burst_seconds=2.0, min_rate_per_min=10, max_rate_per_min=None, increase_after=5, pause_seconds=1.0,
+                 clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate_per_min / 60.0
+        self.min_rate = min_rate_per_min / 60.0
+        self.max_rate = (max_rate_per_min or rate_per_min * 4) / 60.0
+        self.burst_seconds = burst_seconds
+        self.tokens = self.rate * burst_seconds
+        self.ceiling = None
+        self.increase_after = increase_after
+        self.pause_seconds = pause_seconds
+        self.stats = {"throttles": 0, "waited_s": 0.0}
+        self._streak = 0
+        self._paused_until = 0.0
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        # The bucket holds at most `burst_seconds` of the current rate, so a slowed-down limiter can't burst
+        capacity = self.rate * self.burst_seconds
+        self.tokens = min(capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        return capacity
+
+    def acquire(self, cost=1):
+        started = self._clock()
+        while True:
+            with self._lock:
+                now = self._clock()
+                # A batch bigger than the bucket only waits for a full one, but pays its whole cost
+                needed = min(cost, self._refill(now))
+                if now >= self._paused_until and self.tokens >= needed:
+                    self.tokens -= cost
+                    self.stats["waited_s"] += now - started
+                    return
+                wait = max(self._paused_until - now, (needed - self.tokens) / self.rate)
+            self._sleep(min(wait, 1.0))
+
+    def on_success(self):
+        with self._lock:
+            self._streak += 1
+            if self._streak < self.increase_after: return
+            self._streak = 0
+            step = 1.2 if self.ceiling is None or self.rate < self.ceiling * 0.9 else 1.02
+            self.rate = min(self.max_rate, self.rate * step)
+
+    def on_rate_limited(self, retry_after=None):
+        with self._lock:
+            self.stats["throttles"] += 1
+            self._streak = 0
+            if self._clock() < self._paused_until:
+                return  # parallel workers hitting the same 429 window count as one throttle
+            self.ceiling = self.rate
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.tokens = min(self.tokens, 0.0)  # keeps any debt
+            pause = retry_after if retry_after is not None else self.pause_seconds
+            self._paused_until = max(self._paused_until, self._clock() + pause)
+
+    def rate_per_min(self):
+        return round(self.rate * 60, 1)
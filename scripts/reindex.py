@@ -0,0 +1,152 @@
+"""
+Blue/green rebuild of the Pinecone knowledge base, with no downtime.
+
+Unlike reset_pinecone.py / reset_db.py (delete the live index, wait, recreate),
+this builds the next generation in a NEW index next to the live one:
+
+    1. create `<base>-v<N>` with the dimension of the (possibly new) embedding model
+    2. embed + upsert every chunk into it (resumable, same manifest as ingest.py)
+    3. validate: vector count, self-retrieval of sampled chunks, sample questions
+    4. switch the alias in MH_Aviation_Config (index name + model + generation) in
+       one conditional write; workers pick it up within INDEX_GENERATION_TTL
+    5. wait for the workers to move over, then delete the old index
+
+The live index keeps serving until step 4, and a failed validation never
+switches, so a model change (e.g. 384 -> 768 dims) is not an outage.
+
+Usage (from the repo root):
+    python scripts/reindex.py                                   # same model, fresh index
+    python scripts/reindex.py --model models/text-embedding-005
+    python scripts/reindex.py --keep-old                        # skip garbage collection
+"""
+import os
+import re
+import sys
+import time
+import random
+import argparse
+
+from pinecone import Pinecone
+from langchain_google_genai import GoogleGenerativeAIEmbeddings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from scripts.ingest import (
+    PINECONE_KEY, INDEX_NAME, DATA_PATH, IMPORTANT_URLS,
+    EMBEDDING_MODEL, EMBED_BATCH_SIZE, EMBED_WORKERS, EMBED_RATE_PER_MIN,
+    iter_documents, split_docs, assign_chunk_ids, sync_pinecone, manifest_path,
+)
+from backend.dynamo_db import get_index_generation, publish_index_generation
+from backend.index_registry import INDEX_GENERATION_TTL
+
+# --- VALIDATION ---
+SAMPLE_QUERIES = [
+    "What are the fees for the commercial pilot license course?",
+    "Which aircraft are in the training fleet?",
+    "Where is MH Cockpit located?",
+    "What are the eligibility criteria for pilot training?",
+]
+SELF_RETRIEVAL_SAMPLES = 20
+MIN_SELF_RECALL = 0.9
+MIN_SAMPLE_SCORE = 0.3
+COUNT_TIMEOUT = 180  # seconds for Pinecone's stats to catch up with the upserts
+
+
+def next_index_name(live_name, generation):
+    """'mh-aviation-index' / 'mh-aviation-index-v3' -> 'mh-aviation-index-v<generation+1>'."""
+    base = re.sub(r"-v\d+$", "", live_name)
+    return f"{base[:40]}-v{generation + 1}"
+
+
+def wait_until_ready(pc, name):
+    while not pc.describe_index(name).status["ready"]:
+        print(f"⏳ Waiting for index '{name}' to be ready...")
+        time.sleep(5)
+
+
+def validate(index, chunks, embeddings):
+    """Raises if the new index is incomplete or can't answer. Returns a summary line."""
+    # 1. Count (stats are eventually consistent, so poll)
+    deadline = time.monotonic() + COUNT_TIMEOUT
+    while True:
+        count = index.describe_index_stats()["total_vector_count"]
+        if count == len(chunks): break
+        if time.monotonic() > deadline:
+            raise RuntimeError(f"Index holds {count} vectors, expected {len(chunks)}")
+        print(f"⏳ {count}/{len(chunks)} vectors visible, waiting...")
+        time.sleep(5)
+
+    # 2. Self-retrieval: a stored chunk's own vector must come back as the top match
+    sample = random.sample([c.metadata["chunk_id"] for c in chunks], min(SELF_RETRIEVAL_SAMPLES, len(chunks)))
+    fetched = index.fetch(ids=sample).vectors
+    hits = 0
+    for chunk_id in sample:
+        matches = index.query(vector=fetched[chunk_id].values, top_k=1).matches
+        hits += bool(matches) and matches[0].id == chunk_id
+    recall = hits / len(sample) if sample else 1.0
+    if recall < MIN_SELF_RECALL:
+        raise RuntimeError(f"Self-retrieval recall {recall:.2f} < {MIN_SELF_RECALL}")
+
+    # 3. Real questions must find something relevant
+    for question in SAMPLE_QUERIES:
+        matches = index.query(vector=embeddings.embed_query(question), top_k=1, include_metadata=True).matches
+        if not matches or matches[0].score < MIN_SAMPLE_SCORE:
+            raise RuntimeError(f"No relevant match for sample query: {question!r}")
+        print(f"   🔎 {question!r} -> {matches[0].metadata.get('source')} ({matches[0].score:.2f})")
+    return f"{count} vectors, self-retrieval recall {recall:.2f}, {len(SAMPLE_QUERIES)} sample queries answered"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the vector index next to the live one and switch atomically.")
+    parser.add_argument("--model", default=None, help="Embedding model for the new index (default: the live one)")
+    parser.add_argument("--keep-old", action="store_true", help="Don't delete the previous index after switching")
+    parser.add_argument("--gc-delay", type=float, default=INDEX_GENERATION_TTL * 2,
+                        help="Seconds to wait after the switch before deleting the old index")
+    parser.add_argument("--batch-size", type=int, default=EMBED_BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=EMBED_WORKERS)
+    parser.add_argument("--rate", type=float, default=EMBED_RATE_PER_MIN)
+    parser.set_defaults(rebuild=False)  # sync_pinecone option; the new index starts empty anyway
+    args = parser.parse_args()
+
+    live = get_index_generation()
+    live_name = live["index_name"] or INDEX_NAME
+    model = args.model or live["embedding_model"] or EMBEDDING_MODEL
+    new_name = next_index_name(live_name, live["generation"])
+    embeddings = GoogleGenerativeAIEmbeddings(model=model)
+    dimension = len(embeddings.embed_query("dimension probe"))
+    print(f"🟦 Live: '{live_name}' (generation {live['generation']})  🟩 Building: '{new_name}' ({model}, dim {dimension})")
+
+    # Build (re-running after a crash resumes into the same new index)
+    failed = set()
+    chunks = assign_chunk_ids(split_docs(iter_documents(DATA_PATH, IMPORTANT_URLS, failed=failed)))
+    if failed:
+        # The new index would go live without these sources
+        print(f"❌ {len(failed)} sources failed to load ({', '.join(sorted(failed))}), '{live_name}' stays live. Re-run.")
+        sys.exit(1)
+    sync_pinecone(chunks, args, new_name, model, dimension)
+    pc = Pinecone(api_key=PINECONE_KEY)
+    wait_until_ready(pc, new_name)
+
+    try:
+        summary = validate(pc.Index(new_name), chunks, embeddings)
+    except Exception as e:
+        print(f"❌ Validation failed, '{live_name}' stays live: {e}")
+        print(f"   '{new_name}' was kept for inspection; re-run to resume or delete it by hand.")
+        sys.exit(1)
+    print(f"✅ Validated '{new_name}': {summary}")
+
+    # Atomic switch: fails if someone else moved the alias in the meantime
+    generation = publish_index_generation(new_name, model, expected_index_name=live_name)
+    print(f"🔀 Alias switched to '{new_name}', generation {generation}. Workers follow within {INDEX_GENERATION_TTL:.0f}s.")
+
+    if args.keep_old or live_name == new_name: return
+    print(f"⏳ Waiting {args.gc_delay:.0f}s for workers to drain off '{live_name}'...")
+    time.sleep(args.gc_delay)
+    if live_name in [i.name for i in pc.list_indexes()]:
+        pc.delete_index(live_name)
+    if os.path.exists(manifest_path(live_name)):
+        os.remove(manifest_path(live_name))
+    print(f"🗑️ Deleted old index '{live_name}'. 🎉 Reindex complete!")
+
+
+if __name__ == "__main__":
+    main()
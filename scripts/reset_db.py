@@ -1,4 +1,5 @@
 import os
+import sys
 import time
 from pinecone import Pinecone
 from dotenv import load_dotenv
@@ -8,6 +9,12 @@ load_dotenv()
 PINECONE_KEY = os.getenv("PINECONE_API_KEY")
 INDEX_NAME = os.getenv("PINECONE_INDEX_NAME")
 
+# Blue/green alternative with no downtime: scripts/reindex.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from scripts.live_index import refuse_if_live, forget_index
+
+live = refuse_if_live(INDEX_NAME)
+
 pc = Pinecone(api_key=PINECONE_KEY)
 
 # Check if index exists and DELETE it
@@ -18,5 +25,6 @@ if INDEX_NAME in [i.name for i in pc.list_indexes()]:
     time.sleep(20) # Essential wait time
 else:
     print(f"Index '{INDEX_NAME}' does not exist. You are good to go.")
+forget_index(INDEX_NAME, live)
 
-print("Ready for ingestion.")
\ No newline at end of file
+print("Ready for ingestion: run `python scripts/ingest.py` (add --snapshot if you use VECTOR_BACKEND=local).")
@@ -1,10 +1,15 @@
 import os
+import sys
 import time
+import argparse
 from pinecone import Pinecone, ServerlessSpec
-from langchain_community.document_loaders import PyPDFLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
-from langchain_pinecone import PineconeVectorStore
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from scripts.ingest import (
+    DATA_PATH, IMPORTANT_URLS, EMBEDDING_MODEL, EMBED_BATCH_SIZE, EMBED_WORKERS, EMBED_RATE_PER_MIN,
+    iter_documents, split_docs, assign_chunk_ids, sync_pinecone, write_lexical,
+)
+from scripts.live_index import refuse_if_live, forget_index, LEXICAL_INDEX_PATH
 
 # --- CONFIGURATION ---
 # Make sure your .env file has your keys!
@@ -18,52 +23,56 @@ PINECONE_KEY = os.getenv("PINECONE_API_KEY")
 INDEX_NAME = os.getenv("PINECONE_INDEX_NAME", "mh-aviation-index") # Default name
 GOOGLE_KEY = os.getenv("GOOGLE_API_KEY")
 
-# --- 1. SETUP CONNECTION ---
-print(f"🔌 Connecting to Pinecone...")
-pc = Pinecone(api_key=PINECONE_KEY)
+def main():
+    live = refuse_if_live(INDEX_NAME)
 
-# --- 2. DELETE OLD INDEX (THE FIX) ---
-if INDEX_NAME in [i.name for i in pc.list_indexes()]:
-    print(f"🗑️  Found old index '{INDEX_NAME}'. Deleting...")
-    pc.delete_index(INDEX_NAME)
-    print("⏳ Waiting 10 seconds for deletion to finish...")
-    time.sleep(10)
-else:
-    print(f"✨ Index '{INDEX_NAME}' does not exist yet.")
+    # --- 1. SETUP CONNECTION ---
+    print(f"🔌 Connecting to Pinecone...")
+    pc = Pinecone(api_key=PINECONE_KEY)
 
-# --- 3. CREATE NEW INDEX (DIMENSION 768) ---
-print(f"🔨 Creating new index '{INDEX_NAME}' with Dimension 768 (Google)...")
-pc.create_index(
-    name=INDEX_NAME,
-    dimension=768, # <--- CRITICAL: 768 is for Google Gemini. (384 is for HuggingFace)
-    metric="cosine",
-    spec=ServerlessSpec(cloud="aws", region="us-east-1") # Change region if needed
-)
-print("✅ Index created successfully!")
+    # --- 2. DELETE OLD INDEX (THE FIX) ---
+    if INDEX_NAME in [i.name for i in pc.list_indexes()]:
+        print(f"🗑️  Found old index '{INDEX_NAME}'. Deleting...")
+        pc.delete_index(INDEX_NAME)
+        print("⏳ Waiting 10 seconds for deletion to finish...")
+        time.sleep(10)
+    else:
+        print(f"✨ Index '{INDEX_NAME}' does not exist yet.")
 
-# --- 4. RE-UPLOAD DATA (So bot isn't empty) ---
-print("📂 Loading PDF data...")
-# REPLACE 'data/brochure.pdf' WITH YOUR ACTUAL FILE PATH
-pdf_path = "data/brochure.pdf" 
+    # --- 3. CREATE NEW INDEX (DIMENSION 768) ---
+    print(f"🔨 Creating new index '{INDEX_NAME}' with Dimension 768 (Google)...")
+    pc.create_index(
+        name=INDEX_NAME,
+        dimension=768, # <--- CRITICAL: 768 is for Google Gemini. (384 is for HuggingFace)
+        metric="cosine",
+        spec=ServerlessSpec(cloud="aws", region="us-east-1") # Change region if needed
+    )
+    print("✅ Index created successfully!")
 
-if os.path.exists(pdf_path):
-    loader = PyPDFLoader(pdf_path)
-    docs = loader.load()
-    
-    splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
-    splits = splitter.split_documents(docs)
-    print(f"📄 Split PDF into {len(splits)} chunks.")
+    # The manifest listed what the deleted index held: without it the re-upload starts from scratch
+    forget_index(INDEX_NAME, live)
 
-    print("🚀 Generating Embeddings & Uploading (This may take a moment)...")
-    embeddings = GoogleGenerativeAIEmbeddings(model="models/embedding-001")
-    
-    # Batch upload to avoid timeouts
-    PineconeVectorStore.from_documents(
-        documents=splits,
-        embedding=embeddings,
-        index_name=INDEX_NAME
-    )
+    # --- 4. RE-UPLOAD DATA (So bot isn't empty) ---
+    # Same pipeline, chunk IDs and embedding model as scripts/ingest.py, so the backend can query these vectors
+    print(f"📂 Loading {DATA_PATH} and the website...")
+    failed = set()
+    chunks = assign_chunk_ids(split_docs(iter_documents(DATA_PATH, IMPORTANT_URLS, failed=failed)))
+    if not chunks:
+        print(f"⚠️ WARNING: Nothing loaded from '{DATA_PATH}'. Index is created but EMPTY.")
+        print("   Put the brochures in the folder and run `python scripts/ingest.py`.")
+        return
+    print(f"🚀 Embedding {len(chunks)} chunks with {EMBEDDING_MODEL} & Uploading (This may take a moment)...")
+    args = argparse.Namespace(rebuild=False, batch_size=EMBED_BATCH_SIZE, workers=EMBED_WORKERS, rate=EMBED_RATE_PER_MIN)
+    sync_pinecone(chunks, args, INDEX_NAME, EMBEDDING_MODEL, failed=failed)
+    if live and not failed:
+        write_lexical(chunks, LEXICAL_INDEX_PATH)
+    if failed:
+        print(f"⚠️ {len(failed)} sources failed to load; run `python scripts/ingest.py` once they are back.")
     print("🎉 SUCCESS: Database reset and repopulated!")
-else:
-    print(f"⚠️ WARNING: Could not find '{pdf_path}'. Index is created but EMPTY.")
-    print("   Please put your PDF in the folder and run the upload separately.")
\ No newline at end of file
+    if live:
+        print("   Using VECTOR_BACKEND=local? Run `python scripts/ingest.py --snapshot --skip-pinecone` to rebuild the snapshot.")
+
+
+# Guarded: the PDF loader starts worker processes, which re-import this module on spawn platforms
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,455 @@
+"""
+Offline stand-ins for Gemini, Google embeddings, Pinecone, DynamoDB and DNS.
+
+Call `install_stand_ins()` BEFORE importing anything from `backend`, so the
+graph picks up the fakes instead of the real clients. Every fake sleeps for a
+configurable latency to imitate the network round trip: a number (uniform
+within +-20%) or a distribution spec, e.g.
+    install_stand_ins(llm="lognormal:0.8:0.5", dynamo="bimodal:0.01:0.2:0.05")
+`fakes=` picks which clients are replaced; the others stay real.
+"""
+import asyncio
+import hashlib
+import math
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+from typing import Any, List, Optional
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+# --- LATENCY SETTINGS (seconds) ---
+LATENCY = {
+    "llm": 0.8,
+    "embedding": 0.15,
+    "vector": 0.1,
+    "dynamo": 0.02,
+    "dns": 0.02,
+}
+# Latency distributions, "name:param:param..." (seconds)
+#   fixed:S               always S
+#   uniform:A:B           anywhere in [A, B]
+#   lognormal:MEDIAN:SIGMA  long right tail, like most network calls
+#   bimodal:FAST:SLOW:P   FAST, or SLOW with probability P (throttling, cold connections)
+DISTRIBUTIONS = {
+    "fixed": lambda s: s,
+    "uniform": lambda a, b: random.uniform(a, b),
+    "lognormal": lambda median, sigma: random.lognormvariate(math.log(median), sigma),
+    "bimodal": lambda fast, slow, p: slow if random.random() < p else fast,
+}
+ALL_FAKES = ("llm", "embedding", "vector", "dynamo", "dns")
+
+FAKE_ANSWER = (
+    "We offer **DGCA-approved CPL training** with a modern fleet, "
+    "experienced faculty and strong placement support."
+)
+
+# Brochure-like text: ingest-style overlapping chunks are cut from it, and like
+# the real PDFs it repeats a few lines (contact details) on several pages
+FAKE_CORPUS = [
+    "MH Cockpit offers Commercial Pilot Licence (CPL) training approved by DGCA.",
+    "The CPL course takes 18 to 24 months, including 200 hours of flying.",
+    "Our fleet includes Cessna 172 and Diamond DA40 aircraft for flight training.",
+    "Every aircraft is maintained in-house by DGCA-licensed engineers.",
+    "For admissions call 9884927480 or write to admissions@mhcockpit.com.",
+    "The CPL program fee is approximately 45 Lakhs including ground classes.",
+    "Fees can be paid in four instalments, and education loans are available.",
+    "Scholarships of up to 2 Lakhs are offered to merit students.",
+    "We partner with VELS University for the B.Sc Aviation degree program.",
+    "The B.Sc Aviation degree runs for three years alongside ground school.",
+    "Candidates must have passed 12th with Physics and Mathematics.",
+    "A Class 2 medical is needed before joining and a Class 1 medical before the CPL.",
+    "For admissions call 9884927480 or write to admissions@mhcockpit.com.",
+    "Our campus is located in Chennai, Tamil Nadu.",
+    "Hostel accommodation with meals is available on campus for outstation students.",
+    "Our placement cell has placed cadets with IndiGo, Air India and Akasa Air.",
+    "Type rating on the A320 and B737 can be arranged after the CPL.",
+    "For admissions call 9884927480 or write to admissions@mhcockpit.com.",
+]
+
+
+def sample_latency(spec):
+    """One delay (seconds) from a LATENCY value: a number or a distribution spec."""
+    if isinstance(spec, (int, float)):
+        return random.uniform(spec * 0.8, spec * 1.2)
+    name, *params = str(spec).split(":")
+    if name not in DISTRIBUTIONS:
+        raise ValueError(f"Unknown latency distribution '{name}' (use one of {', '.join(DISTRIBUTIONS)})")
+    return max(0.0, DISTRIBUTIONS[name](*map(float, params)))
+
+
+def _delay(kind):
+    return sample_latency(LATENCY[kind])
+
+
+# --- GEMINI STAND-IN ---
+class FakeChatModel(BaseChatModel):
+    """Chat model that answers with a fixed reply after a simulated delay."""
+
+    reply: str = FAKE_ANSWER
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-gemini"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        time.sleep(_delay("llm"))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.reply))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        await asyncio.sleep(_delay("llm"))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.reply))])
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        words = self.reply.split(" ")
+        per_token = _delay("llm") / len(words)
+        for i, word in enumerate(words):
+            await asyncio.sleep(per_token)
+            token = word if i == 0 else " " + word
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+
+# --- EMBEDDING STAND-IN ---
+STOPWORDS = {"a", "an", "the", "and", "or", "of", "to", "in", "on", "for", "with", "by", "is", "are", "be",
+             "do", "does", "i", "we", "you", "our", "your", "what", "which", "where", "how", "can", "after"}
+
+
+class FakeEmbeddings(Embeddings):
+    """
+    Deterministic hashed bag-of-words embeddings: same text -> same vector,
+    and texts sharing words get a proportionally higher cosine similarity.
+    """
+
+    def __init__(self, dim: int = 768, **kwargs: Any):
+        self.dim = dim
+        self.calls = 0
+
+    def _word(self, word: str):
+        seed = int(hashlib.sha256(word.encode("utf-8")).hexdigest()[:16], 16)
+        return np.random.default_rng(seed).standard_normal(self.dim)
+
+    def _vector(self, text: str) -> List[float]:
+        words = [w for w in re.findall(r"\w+", text.lower()) if w not in STOPWORDS] or [""]
+        vector = sum(self._word(w) for w in words)
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        self.calls += 1
+        time.sleep(_delay("embedding"))
+        return self._vector(text)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.calls += 1
+        time.sleep(_delay("embedding"))
+        return [self._vector(t) for t in texts]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        self.calls += 1
+        await asyncio.sleep(_delay("embedding"))
+        return self._vector(text)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.calls += 1
+        await asyncio.sleep(_delay("embedding"))
+        return [self._vector(t) for t in texts]
+
+
+# --- PINECONE STAND-IN ---
+def overlapping_chunks(texts, size=200, overlap=60):
+    """Splits the corpus the way ingest does (word-aligned windows that overlap), at a smaller scale."""
+    text = " ".join(texts)
+    chunks, start = [], 0
+    while start < len(text):
+        end = min(len(text), start + size)
+        if end < len(text):
+            end = text.rfind(" ", start, end) if text.rfind(" ", start, end) > start else end
+        chunks.append(text[start:end].strip())
+        if end == len(text): break
+        next_start = text.find(" ", end - overlap) + 1
+        start = next_start if next_start > start else end
+    return chunks
+
+
+def fake_chunks():
+    return [Document(page_content=t, metadata={"source": "fake", "chunk": i, "chunk_id": f"fake-{i}"})
+            for i, t in enumerate(overlapping_chunks(FAKE_CORPUS))]
+
+
+class FakeVectorStore:
+    """Cosine search over overlapping chunks of a small fixed corpus, after a delay."""
+
+    def __init__(self, index_name: Optional[str] = None, embedding: Optional[Embeddings] = None, **kwargs: Any):
+        self.index_name = index_name
+        self.embeddings = embedding or FakeEmbeddings()
+        self.docs = fake_chunks()
+        self.matrix = np.array([FakeEmbeddings()._vector(d.page_content) for d in self.docs])
+
+    def _ranked(self, embedding, k):
+        scores = self.matrix @ np.asarray(embedding)
+        return [(self.docs[i], float(scores[i])) for i in np.argsort(-scores)[:k]]
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        vector = self.embeddings.embed_query(query)
+        time.sleep(_delay("vector"))
+        return [d for d, _ in self._ranked(vector, k)]
+
+    async def asimilarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        vector = await self.embeddings.aembed_query(query)
+        await asyncio.sleep(_delay("vector"))
+        return [d for d, _ in self._ranked(vector, k)]
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs: Any) -> List[Document]:
+        time.sleep(_delay("vector"))
+        return [d for d, _ in self._ranked(embedding, k)]
+
+    async def asimilarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs: Any) -> List[Document]:
+        await asyncio.sleep(_delay("vector"))
+        return [d for d, _ in self._ranked(embedding, k)]
+
+    async def asimilarity_search_by_vector_with_score(self, embedding: List[float], k: int = 4, **kwargs: Any):
+        await asyncio.sleep(_delay("vector"))
+        return self._ranked(embedding, k)
+
+
+# --- DNS STAND-IN ---
+# Domains the fake email deliverability check knows; anything else doesn't exist
+FAKE_MAIL_DOMAINS = {
+    "example.com": {"MX": ["10 mail.example.com."]},
+    "example.org": {"MX": ["10 mail.example.org."]},
+    "mhcockpit.com": {"MX": ["10 mail.mhcockpit.com."]},
+    "no-mail.example": {"MX": ["0 ."]},
+}
+
+
+class FakeResolver:
+    """StubResolver over FAKE_MAIL_DOMAINS with the "dns" latency."""
+
+    def __init__(self):
+        from backend.validators import StubResolver
+        self.stub = StubResolver(FAKE_MAIL_DOMAINS)
+
+    async def lookup(self, domain, rdtype):
+        await asyncio.sleep(_delay("dns"))
+        return await self.stub.lookup(domain, rdtype)
+
+
+# --- DYNAMODB STAND-IN ---
+def _split_top_level(expr: str) -> List[str]:
+    """Splits 'a = :x, b = f(c, :y)' on commas that are not inside parentheses."""
+    parts, depth, current = [], 0, ""
+    for ch in expr:
+        if ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        if ch == "," and depth == 0:
+            parts.append(current.strip())
+            current = ""
+        else:
+            current += ch
+    if current.strip():
+        parts.append(current.strip())
+    return parts
+
+
+class FakeBatchWriter:
+    def __init__(self, table):
+        self.table = table
+        self.pending = []
+
+    def put_item(self, Item):
+        self.pending.append(Item)
+
+    def delete_item(self, Key):
+        self.pending.append(("delete", Key))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        if exc[0] is None and self.pending:
+            self.table._count("batch_write_item")
+            time.sleep(_delay("dynamo"))
+            for item in self.pending:
+                if isinstance(item, tuple):
+                    self.table._remove(item[1])
+                else:
+                    self.table._store(item)
+        return False
+
+
+class FakeTable:
+    """
+    In-memory table that understands the UpdateExpression forms used in
+    backend/dynamo_db.py (SET with if_not_exists / list_append, and ADD),
+    batch writes, and Query on the hash key (sorted by the range key).
+    """
+
+    def __init__(self, name: str, key_names=("email",)):
+        self.name = name
+        self.key_names = tuple(key_names)
+        self.items = {}
+        self.calls = {}
+        self._lock = threading.Lock()
+
+    def _count(self, op):
+        self.calls[op] = self.calls.get(op, 0) + 1
+
+    def _key(self, key):
+        return tuple(sorted(key.items()))
+
+    def get_item(self, Key, **kwargs):
+        self._count("get_item")
+        time.sleep(_delay("dynamo"))
+        with self._lock:
+            item = self.items.get(self._key(Key))
+            return {"Item": dict(item)} if item else {}
+
+    def _store(self, item):
+        key = {k: item[k] for k in self.key_names}
+        with self._lock:
+            self.items[self._key(key)] = dict(item)
+
+    def _remove(self, key):
+        with self._lock:
+            self.items.pop(self._key(key), None)
+
+    def put_item(self, Item, **kwargs):
+        self._count("put_item")
+        time.sleep(_delay("dynamo"))
+        self._store(Item)
+        return {}
+
+    def batch_writer(self):
+        return FakeBatchWriter(self)
+
+    def query(self, KeyConditionExpression, Limit=None, ScanIndexForward=True,
+              ExclusiveStartKey=None, IndexName=None, **kwargs):
+        self._count("query")
+        time.sleep(_delay("dynamo"))
+        key_attr, value = KeyConditionExpression.get_expression()["values"]
+        hash_name = key_attr.name
+        range_name = INDEX_SCHEMAS[IndexName][1] if IndexName else self.key_names[-1]
+        key_fields = list(dict.fromkeys([hash_name, range_name, *self.key_names]))
+
+        def position(row):
+            return tuple(str(row.get(k, "")) for k in [range_name, *self.key_names])
+
+        with self._lock:
+            # Items missing the index key are not in a (sparse) GSI
+            rows = sorted(
+                (dict(i) for i in self.items.values() if i.get(hash_name) == value and range_name in i),
+                key=position,
+                reverse=not ScanIndexForward,
+            )
+        if ExclusiveStartKey:
+            marker = position(ExclusiveStartKey)
+            rows = [r for r in rows if (position(r) > marker if ScanIndexForward else position(r) < marker)]
+        result = {"Items": rows[:Limit] if Limit else rows}
+        if Limit and len(rows) > Limit:
+            last = rows[Limit - 1]
+            result["LastEvaluatedKey"] = {k: last[k] for k in key_fields}
+        return result
+
+    def scan(self, **kwargs):
+        self._count("scan")
+        time.sleep(_delay("dynamo"))
+        with self._lock:
+            return {"Items": [dict(i) for i in self.items.values()]}
+
+    def _value(self, token, item, values):
+        token = token.strip()
+        match = re.fullmatch(r"if_not_exists\((\w+),\s*(:\w+)\)", token)
+        if match:
+            return item.get(match.group(1), values[match.group(2)])
+        match = re.fullmatch(r"list_append\((.+),\s*(:\w+)\)", token)
+        if match:
+            return list(self._value(match.group(1), item, values)) + list(values[match.group(2)])
+        return values[token]
+
+    def update_item(self, Key, UpdateExpression, ExpressionAttributeValues=None,
+                    ExpressionAttributeNames=None, **kwargs):
+        self._count("update_item")
+        time.sleep(_delay("dynamo"))
+        values = ExpressionAttributeValues or {}
+        names = ExpressionAttributeNames or {}
+        with self._lock:
+            item = self.items.setdefault(self._key(Key), dict(Key))
+            for clause in re.split(r"\s(?=SET\s|ADD\s)", " " + UpdateExpression):
+                clause = clause.strip()
+                if clause.startswith("SET "):
+                    for assignment in _split_top_level(clause[4:]):
+                        field, expr = [x.strip() for x in assignment.split("=", 1)]
+                        item[names.get(field, field)] = self._value(expr, item, values)
+                elif clause.startswith("ADD "):
+                    for assignment in _split_top_level(clause[4:]):
+                        field, placeholder = assignment.split()
+                        field = names.get(field, field)
+                        item[field] = item.get(field, 0) + values[placeholder]
+            return {"Attributes": dict(item)}
+
+
+# Tables with a range key; everything else is keyed by email alone
+KEY_SCHEMAS = {
+    "MH_Aviation_Messages": ("email", "ts"),
+    "MH_Aviation_Config": ("config_key",),
+    "MH_Aviation_Sessions": ("thread_id", "checkpoint_ns"),
+}
+INDEX_SCHEMAS = {"leads_by_last_updated": ("lead_bucket", "last_updated")}
+
+
+class FakeDynamoResource:
+    def __init__(self):
+        self.tables = {}
+
+    def Table(self, name):
+        if name not in self.tables:
+            self.tables[name] = FakeTable(name, KEY_SCHEMAS.get(name, ("email",)))
+        return self.tables[name]
+
+
+FAKE_DYNAMO = FakeDynamoResource()
+
+
+def install_stand_ins(fakes=ALL_FAKES, **latency):
+    """
+    Patches the client classes that backend/ imports (only the ones named in
+    `fakes`). Must run before `import backend...`.
+    """
+    unknown = set(fakes) - set(ALL_FAKES)
+    if unknown:
+        raise ValueError(f"Unknown stand-ins: {', '.join(sorted(unknown))}")
+    LATENCY.update(latency)
+    for kind in LATENCY:
+        sample_latency(LATENCY[kind])  # a bad spec fails here, not in the middle of a run
+
+    import boto3
+    import langchain_google_genai
+    import langchain_pinecone
+
+    if "llm" in fakes:
+        langchain_google_genai.ChatGoogleGenerativeAI = lambda **kwargs: FakeChatModel()
+    if "embedding" in fakes:
+        langchain_google_genai.GoogleGenerativeAIEmbeddings = lambda **kwargs: FakeEmbeddings()
+    if "vector" in fakes:
+        langchain_pinecone.PineconeVectorStore = FakeVectorStore
+    if "dynamo" in fakes:
+        boto3.resource = lambda service, **kwargs: FAKE_DYNAMO
+    if "dns" in fakes:
+        from backend.validators import email_checker
+        email_checker.resolver = FakeResolver()
+
+    # The BM25 index ingest would write for the same chunks
+    if "vector" in fakes and "LEXICAL_INDEX_PATH" not in os.environ:
+        from backend.lexical_index import write_lexical_index
+        os.environ["LEXICAL_INDEX_PATH"] = tempfile.mkdtemp(prefix="mh_lexical_")
+        write_lexical_index(os.environ["LEXICAL_INDEX_PATH"], fake_chunks())
+    return FAKE_DYNAMO
@@ -0,0 +1,160 @@
+import asyncio
+import operator
+from typing import Annotated, List, TypedDict
+
+import pytest
+from langgraph.graph import StateGraph, END
+
+from backend.checkpointer import (
+    BoundedMemorySaver, DynamoCheckpointSaver, SQLiteCheckpointSaver, pack_record, unpack_record,
+)
+
+
+class State(TypedDict):
+    turns: Annotated[List[str], operator.add]
+
+
+async def echo(state):
+    return {"turns": [f"reply {len(state['turns'])}"]}
+
+
+def graph(saver):
+    workflow = StateGraph(State)
+    workflow.add_node("echo", echo)
+    workflow.set_entry_point("echo")
+    workflow.add_edge("echo", END)
+    return workflow.compile(checkpointer=saver)
+
+
+def turn(app, thread_id, text):
+    config = {"configurable": {"thread_id": thread_id}}
+    return asyncio.run(app.ainvoke({"turns": [text]}, config=config))["turns"]
+
+
+class FakeTable:
+    """Dict-backed stand-in for the boto3 Table calls DynamoCheckpointSaver makes."""
+
+    def __init__(self):
+        self.items = {}
+
+    def get_item(self, Key, ConsistentRead=False):
+        item = self.items.get((Key["thread_id"], Key["checkpoint_ns"]))
+        return {"Item": item} if item else {}
+
+    def put_item(self, Item):
+        self.items[(Item["thread_id"], Item["checkpoint_ns"])] = dict(Item)
+
+
+SAVERS = {
+    "memory": lambda tmp_path: BoundedMemorySaver(),
+    "sqlite": lambda tmp_path: SQLiteCheckpointSaver(str(tmp_path / "checkpoints.db")),
+    "dynamodb": lambda tmp_path: DynamoCheckpointSaver(FakeTable()),
+}
+
+
+@pytest.mark.parametrize("backend", SAVERS)
+def test_session_state_carries_over_between_turns(tmp_path, backend):
+    app = graph(SAVERS[backend](tmp_path))
+    turn(app, "s1", "hi")
+    assert turn(app, "s1", "fees?") == ["hi", "reply 1", "fees?", "reply 3"]
+    assert turn(app, "s2", "hello") == ["hello", "reply 1"]
+
+
+def test_sqlite_sessions_are_shared_between_workers(tmp_path):
+    path = str(tmp_path / "checkpoints.db")
+    turn(graph(SQLiteCheckpointSaver(path)), "s1", "hi")
+    # Another worker process opens the same file
+    assert turn(graph(SQLiteCheckpointSaver(path)), "s1", "fees?")[:2] == ["hi", "reply 1"]
+
+
+def test_sqlite_io_runs_off_the_event_loop(tmp_path):
+    assert SQLiteCheckpointSaver(str(tmp_path / "checkpoints.db")).blocking_io
+    assert DynamoCheckpointSaver(FakeTable()).blocking_io
+    assert not BoundedMemorySaver().blocking_io
+
+
+def test_session_locks_work_across_event_loops(tmp_path):
+    saver = SQLiteCheckpointSaver(str(tmp_path / "checkpoints.db"))
+    app = graph(saver)
+
+    async def burst(thread_id):
+        config = {"configurable": {"thread_id": thread_id}}
+        # Several turns of one session at once: they contend for its lock stripe
+        await asyncio.gather(*(app.ainvoke({"turns": [str(i)]}, config=config) for i in range(5)))
+
+    asyncio.run(burst("s1"))
+    asyncio.run(burst("s1"))  # a new loop: locks bound to the first one would raise here
+    assert saver.get_tuple({"configurable": {"thread_id": "s1"}}) is not None
+
+
+def test_memory_saver_expires_idle_sessions():
+    app = graph(BoundedMemorySaver(ttl=0))
+    turn(app, "s1", "hi")
+    assert turn(app, "s1", "fees?") == ["fees?", "reply 1"]
+
+
+def test_memory_saver_evicts_least_recent_sessions_over_the_byte_budget():
+    saver = BoundedMemorySaver(max_bytes=1)
+    app = graph(saver)
+    turn(app, "s1", "hi")
+    turn(app, "s2", "hi")
+    assert saver.snapshot()["threads"] <= 1
+    assert saver.stats["lru_evictions"] >= 1
+
+
+def test_only_the_latest_checkpoint_is_kept(tmp_path):
+    saver = SQLiteCheckpointSaver(str(tmp_path / "checkpoints.db"))
+    app = graph(saver)
+    for text in ["a", "b", "c"]:
+        turn(app, "s1", text)
+    assert saver.snapshot()["threads"] == 1
+    assert len(list(saver.list({"configurable": {"thread_id": "s1"}}))) == 1
+
+
+def test_records_round_trip_compressed():
+    record = {"id": "1", "parent": None, "checkpoint": ("msgpack", b"x" * 2000), "metadata": ("json", b"{}"),
+              "writes": {("task", 0): ("task", "turns", ("msgpack", b"v"), "")}}
+    blob = pack_record(record)
+    assert blob[:1] == b"z" and len(blob) < 200
+    assert unpack_record(blob) == record
+
+
+def park(saver, thread_id, checkpoint_id, value):
+    config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": "", "checkpoint_id": checkpoint_id}}
+    saver.put_writes(config, [("turns", [value])], task_id="task")
+
+
+def put(saver, thread_id, checkpoint_id):
+    from langgraph.checkpoint.base import empty_checkpoint
+    checkpoint = {**empty_checkpoint(), "id": checkpoint_id}
+    saver.put({"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}, checkpoint, {}, {})
+    return saver.get_tuple({"configurable": {"thread_id": thread_id}})
+
+
+def test_parked_writes_survive_past_the_parking_limit(monkeypatch):
+    monkeypatch.setattr("backend.checkpointer.MAX_PARKED", 2)
+    saver = BoundedMemorySaver()
+    saver._parked_limit = 2
+    park(saver, "s1", "cp-1", "first")  # the oldest: what a count-based eviction would drop
+    for i in range(2, 6):
+        park(saver, f"s{i}", "cp-1", "other")
+    # Its checkpoint's put arrives late: the writes are still attached
+    assert [w[2] for w in put(saver, "s1", "cp-1").pending_writes] == [["first"]]
+
+
+def test_parked_writes_whose_checkpoint_never_arrives_expire(monkeypatch):
+    monkeypatch.setattr("backend.checkpointer.MAX_PARKED", 1)
+    saver = BoundedMemorySaver(ttl=60)
+    saver._parked_limit = 1
+    park(saver, "dead", "cp-1", "lost")
+    saver._parked[("dead", "", "cp-1")]["at"] -= 61
+    park(saver, "s2", "cp-1", "kept")
+    assert list(saver._parked) == [("s2", "", "cp-1")]
+
+
+def test_writes_of_a_superseded_checkpoint_are_dropped():
+    saver = BoundedMemorySaver()
+    park(saver, "s1", "cp-1", "old")
+    park(saver, "s1", "cp-3", "new")
+    put(saver, "s1", "cp-2")
+    assert list(saver._parked) == [("s1", "", "cp-3")]
@@ -0,0 +1,53 @@
+from langchain_core.documents import Document
+
+from backend.context_packer import estimate_tokens, pack_context, select_chunks
+
+
+def docs(*scores):
+    return [(Document(page_content=f"chunk {i}"), s) for i, s in enumerate(scores)]
+
+
+def kept(scored, **selection):
+    return [d.page_content for d in select_chunks(scored, **selection)]
+
+
+def test_best_chunk_is_always_kept():
+    assert kept(docs(0.1, 0.05), min_score=0.3) == ["chunk 0"]
+
+
+def test_absolute_floor():
+    assert kept(docs(0.8, 0.75, 0.29), min_score=0.3, relative=0.1, gap=1) == ["chunk 0", "chunk 1"]
+
+
+def test_relative_cut():
+    assert kept(docs(0.8, 0.5, 0.47), min_score=0, relative=0.6, gap=1) == ["chunk 0", "chunk 1"]
+
+
+def test_gap_ends_the_list():
+    assert kept(docs(0.8, 0.75, 0.6, 0.59), min_score=0, relative=0, gap=0.1) == ["chunk 0", "chunk 1"]
+
+
+def test_max_chunks():
+    assert len(kept(docs(*[0.8] * 10), max_chunks=3)) == 3
+
+
+def test_unscored_chunks_keep_their_ranking():
+    assert kept(docs(None, None, None), max_chunks=2) == ["chunk 0", "chunk 1"]
+
+
+def test_splitter_overlap_and_repeated_sentences_are_packed_once():
+    shared = "The CPL course includes 200 hours of flying on Cessna 172 aircraft. "
+    first = Document(page_content="MH Cockpit trains pilots in Chennai. " + shared)
+    second = Document(page_content=shared + "Ground school covers DGCA theory subjects.")
+    context, used = pack_context([(first, 0.8), (second, 0.78)], relative=0, gap=1)
+    assert context.count("200 hours") == 1
+    assert "Ground school" in context
+    assert used == [first, second]
+
+
+def test_budget_is_respected():
+    long_docs = [(Document(page_content=" ".join(f"Aircraft {i}-{j} is part of our fleet." for j in range(40))), 0.8)
+                 for i in range(4)]
+    context, used = pack_context(long_docs, budget=100, relative=0, gap=1)
+    assert 60 < estimate_tokens(context) <= 100
+    assert len(used) == 1
@@ -0,0 +1,54 @@
+import re
+
+import pytest
+
+from backend.intents import INTENTS, SUPPORT_PHONES, canned_answer, classify, counts_as_question
+
+
+@pytest.mark.parametrize("message", [
+    "how much does the b sc cost",
+    "how much does hostel cost",
+    "what is the fee for cabin crew course",
+    "how much does a320 cost",
+    "fees for cpl",
+    "how much are the fees",
+    "how much does it cost",
+    "what is the course fee",
+])
+def test_fee_questions_beyond_the_exact_patterns_go_to_rag(message):
+    assert classify(message) is None
+
+
+@pytest.mark.parametrize("message", ["what are the fees", "Fees?", "fee structure", "What is the fee structure?"])
+def test_generic_fee_question_gets_the_canned_answer(message):
+    assert classify(message) == "fees"
+
+
+@pytest.mark.parametrize("message, intent", [
+    ("hi", "greeting"), ("Hello there!", "greeting"), ("good mornin", "greeting"),
+    ("thank you so much", "thanks"), ("thanks a lot sir", "thanks"),
+    ("ok bye", "goodbye"),
+    ("where are you located", "location"), ("contact number", "contact"), ("how can i contact you", "contact"),
+    ("how are you", "small_talk"), ("ok cool", "small_talk"),
+])
+def test_chit_chat_and_faq_intents(message, intent):
+    assert classify(message) == intent
+
+
+@pytest.mark.parametrize("message", [
+    "where is the hostel", "contact details of the hostel warden", "is the cessna 172 simulator available",
+    "hi, what are the eligibility criteria for the commercial pilot licence programme",
+])
+def test_knowledge_base_questions_go_to_rag(message):
+    assert classify(message) is None
+
+
+def test_only_answers_count_as_questions():
+    assert counts_as_question("fees") and not counts_as_question("greeting")
+
+
+def test_canned_replies_state_no_figures():
+    # Retrieval is skipped, so a fee or date in a canned reply would go stale when the brochures change
+    for intent in INTENTS:
+        answer = canned_answer(intent) or ""
+        assert not re.search(r"\d", answer.replace(SUPPORT_PHONES, "")), intent
@@ -0,0 +1,95 @@
+import asyncio
+
+import pytest
+from langchain_core.documents import Document
+from langchain_core.messages import HumanMessage
+
+from backend import chatbot_graph, retrieval
+from backend.context_packer import select_chunks
+from backend.lexical_index import LexicalIndex, fuse, lexical_only, write_lexical_index
+
+CHUNKS = [
+    "Our fleet includes the Cessna 172 and the Piper Seneca for multi-engine training.",
+    "The A320 type rating is offered with our partner VELS after the CPL.",
+    "Hostel accommodation is available on campus with meals included.",
+    "The CPL course fee is payable in three instalments.",
+]
+
+
+def doc(text, chunk_id=None):
+    return Document(page_content=text, metadata={"chunk_id": chunk_id or text[:12]})
+
+
+@pytest.fixture
+def index(tmp_path):
+    write_lexical_index(str(tmp_path), [doc(text, f"c{i}") for i, text in enumerate(CHUNKS)])
+    return LexicalIndex(str(tmp_path))
+
+
+def test_exact_term_is_found_and_decisive(index):
+    results, decisive = index.search("A320 type rating")
+    assert results[0][0].metadata["chunk_id"] == "c1"
+    assert decisive
+
+
+def test_unknown_terms_find_nothing(index):
+    assert index.search("helicopter") == ([], False)
+
+
+def test_partial_match_is_not_decisive(index):
+    _, decisive = index.search("Cessna hostel")
+    assert not decisive
+
+
+def test_fused_lexical_only_chunks_get_a_comparable_score():
+    a, b, c = doc("a"), doc("b"), doc("c")
+    fused = dict((d.page_content, s) for d, s in fuse([(a, 0.8), (b, 0.7)], [(a, 12.0), (c, 3.0)]))
+    assert fused["a"] == 0.8 and fused["b"] == 0.7
+    assert fused["c"] == pytest.approx(0.8 * 3.0 / 12.0)
+
+
+def test_weak_lexical_only_chunk_no_longer_bypasses_the_packer():
+    a, b, weak = doc("a"), doc("b"), doc("weak")
+    fused = fuse([(a, 0.8), (b, 0.75)], [(a, 10.0), (weak, 2.0)])
+    assert [d.page_content for d in select_chunks(fused, min_score=0.3, relative=0.6, gap=0.1)] == ["a", "b"]
+
+
+def test_packer_best_is_the_highest_score_not_the_first():
+    docs = [(doc("first"), 0.4), (doc("best"), 0.9), (doc("filler"), 0.45)]
+    assert [d.page_content for d in select_chunks(docs, min_score=0.3, relative=0.6, gap=1)] == ["first", "best"]
+
+
+def test_text_search_fusion_floors_lexical_hits():
+    a, strong, weak = doc("a"), doc("strong"), doc("weak")
+    fused = fuse([(a, None)], [(strong, 10.0), (weak, 2.0)])
+    assert [(d.page_content, s) for d, s in fused] == [("a", None), ("strong", None)]
+
+
+def test_lexical_only_drops_hits_under_the_floor():
+    strong, ok, weak = doc("strong"), doc("ok"), doc("weak")
+    kept = lexical_only([(strong, 10.0), (ok, 6.0), (weak, 2.0)], floor=0.5)
+    assert kept == [(strong, None), (ok, None)]
+
+
+def test_decisive_lexical_answers_are_cached(monkeypatch):
+    hit = doc(CHUNKS[1], "c1")
+    calls = []
+
+    async def generate(user_message, query_vector, generation, store, lexical, decisive):
+        calls.append(query_vector)
+        return "We offer the A320 type rating with VELS.", None, True
+
+    monkeypatch.setattr(chatbot_graph, "lexical_search", lambda text: ([(hit, 9.0)], True))
+    monkeypatch.setattr(chatbot_graph, "resolve_index", lambda published: (object(), object()))
+    monkeypatch.setattr(chatbot_graph, "generate_rag_reply", generate)
+    monkeypatch.setattr(retrieval, "lexical_answer_cache", retrieval.BoundedCache(1024 * 1024))
+    published = {"generation": 7}
+
+    first = asyncio.run(chatbot_graph.answer_question(HumanMessage(content="A320 type rating?"), published))
+    again = asyncio.run(chatbot_graph.answer_question(HumanMessage(content="a320 TYPE rating"), published))
+    assert first[0] == again[0] == "We offer the A320 type rating with VELS."
+    assert calls == [None]  # one Gemini call, no embedding
+
+    # A new knowledge-base generation drops the cached answer
+    asyncio.run(chatbot_graph.answer_question(HumanMessage(content="A320 type rating?"), {"generation": 8}))
+    assert len(calls) == 2
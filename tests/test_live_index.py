@@ -0,0 +1,73 @@
+import pytest
+
+from scripts import live_index
+
+
+def published(name):
+    return lambda: {"generation": 3, "index_name": name, "embedding_model": "m", "previous_index_name": None}
+
+
+def unreachable():
+    raise RuntimeError("Unable to locate credentials")
+
+
+def test_refuses_to_delete_the_live_index(monkeypatch):
+    monkeypatch.setattr(live_index, "get_index_generation", published("mh-aviation-index-v2"))
+    with pytest.raises(SystemExit):
+        live_index.refuse_if_live("mh-aviation-index-v2", force=False)
+
+
+def test_allows_a_retired_index(monkeypatch):
+    monkeypatch.setattr(live_index, "get_index_generation", published("mh-aviation-index-v2"))
+    live_index.refuse_if_live("mh-aviation-index", force=False)
+
+
+def test_env_index_is_live_until_an_alias_is_published(monkeypatch):
+    monkeypatch.setattr(live_index, "get_index_generation", published(None))
+    monkeypatch.setenv("PINECONE_INDEX_NAME", "mh-aviation-index")
+    with pytest.raises(SystemExit):
+        live_index.refuse_if_live("mh-aviation-index", force=False)
+
+
+def test_refuses_when_the_alias_cannot_be_read(monkeypatch):
+    monkeypatch.setattr(live_index, "get_index_generation", unreachable)
+    with pytest.raises(SystemExit):
+        live_index.refuse_if_live("mh-aviation-index", force=False)
+
+
+def test_force_skips_the_check(monkeypatch):
+    monkeypatch.setattr(live_index, "get_index_generation", unreachable)
+    live_index.refuse_if_live("mh-aviation-index", force=True)
+
+
+def test_reports_whether_the_index_is_live(monkeypatch):
+    monkeypatch.setattr(live_index, "get_index_generation", published("mh-aviation-index-v2"))
+    assert live_index.refuse_if_live("mh-aviation-index", force=False) is False
+    assert live_index.refuse_if_live("mh-aviation-index-v2", force=True) is True
+    monkeypatch.setattr(live_index, "get_index_generation", unreachable)
+    assert live_index.refuse_if_live("mh-aviation-index", force=True) is True  # may be live
+
+
+def local_state(tmp_path, monkeypatch):
+    monkeypatch.setattr("scripts.manifest.MANIFEST_DIR", str(tmp_path / ".ingest"))
+    monkeypatch.setattr(live_index, "LOCAL_INDEX_PATH", str(tmp_path / "index"))
+    monkeypatch.setattr(live_index, "LEXICAL_INDEX_PATH", str(tmp_path / "lexical"))
+    for folder in (".ingest", "index", "lexical"):
+        (tmp_path / folder).mkdir()
+    manifest = tmp_path / ".ingest" / "mh-aviation-index.jsonl"
+    manifest.write_text('{"model": "m"}\n{"id": "a", "source": "fees.txt"}\n', encoding="utf-8")
+    return manifest
+
+
+def test_reset_forgets_the_manifest_so_ingest_uploads_again(tmp_path, monkeypatch):
+    manifest = local_state(tmp_path, monkeypatch)
+    live_index.forget_index("mh-aviation-index", live=False)
+    assert not manifest.exists()
+    # Not the live index: the snapshot and BM25 index serve the live one, keep them
+    assert (tmp_path / "index").is_dir() and (tmp_path / "lexical").is_dir()
+
+
+def test_resetting_the_live_index_clears_its_local_copies(tmp_path, monkeypatch):
+    local_state(tmp_path, monkeypatch)
+    live_index.forget_index("mh-aviation-index", live=True)
+    assert not (tmp_path / "index").exists() and not (tmp_path / "lexical").exists()
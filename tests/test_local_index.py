@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+
+from backend.local_index import LocalVectorIndex, read_snapshot_vectors, write_snapshot
+
+VECTORS = np.array([[1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.7, 0.7, 0.0]])
+DOCS = [Document(page_content=t, metadata={"chunk_id": f"c{i}"}) for i, t in enumerate(["fees", "fleet", "fees and fleet"])]
+
+
+@pytest.mark.parametrize("dtype", ["float16", "int8"])
+def test_search_returns_nearest_chunks(tmp_path, dtype):
+    write_snapshot(str(tmp_path), VECTORS, DOCS, dtype=dtype, model="models/text-embedding-004")
+    index = LocalVectorIndex(str(tmp_path))
+    results = index.similarity_search_by_vector_with_score([1.0, 0.1, 0.0], k=2)
+    assert [d.page_content for d, _ in results] == ["fees", "fees and fleet"]
+    assert results[0][1] == pytest.approx(0.995, abs=0.01)
+
+
+def test_snapshot_vectors_can_be_reused(tmp_path):
+    write_snapshot(str(tmp_path), VECTORS, DOCS, model="m")
+    vectors = read_snapshot_vectors(str(tmp_path))
+    assert set(vectors) == {"c0", "c1", "c2"}
+    assert np.allclose(vectors["c2"], VECTORS[2] / np.linalg.norm(VECTORS[2]), atol=1e-3)
+
+
+def test_snapshot_only_matches_its_own_model(tmp_path):
+    write_snapshot(str(tmp_path), VECTORS, DOCS, model="models/text-embedding-004")
+    index = LocalVectorIndex(str(tmp_path))
+    assert index.matches("models/text-embedding-004")
+    assert not index.matches("models/gemini-embedding-001")
+
+
+def test_snapshot_without_a_model_is_not_used(tmp_path):
+    write_snapshot(str(tmp_path), VECTORS, DOCS)
+    assert not LocalVectorIndex(str(tmp_path)).matches("models/text-embedding-004")
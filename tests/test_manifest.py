@@ -0,0 +1,115 @@
+import pytest
+from langchain_core.documents import Document
+
+from scripts.manifest import IngestManifest, assign_chunk_ids, chunk_id
+from scripts.loaders import iter_documents
+
+
+def chunk(text, source="fees.txt"):
+    return Document(page_content=text, metadata={"source": source})
+
+
+def test_chunk_ids_depend_on_source_and_text_only():
+    assert chunk_id(chunk("CPL fees")) == chunk_id(chunk("CPL fees"))
+    assert chunk_id(chunk("CPL fees")) != chunk_id(chunk("CPL fees", source="other.txt"))
+    assert chunk_id(chunk("CPL fees")) != chunk_id(chunk("B.Sc fees"))
+
+
+def test_assign_chunk_ids_drops_exact_duplicates():
+    chunks = assign_chunk_ids([chunk("a"), chunk("a"), chunk("a", source="b.txt"), chunk("b")])
+    assert len(chunks) == 3
+    assert all(c.metadata["chunk_id"] for c in chunks)
+
+
+def test_manifest_resumes_from_committed_batches(tmp_path):
+    path = str(tmp_path / "index.jsonl")
+    first = assign_chunk_ids([chunk("a"), chunk("b")])
+    manifest = IngestManifest(path, "model-1")
+    manifest.commit(first[:1])  # the run dies before the second batch
+
+    resumed = IngestManifest(path, "model-1")
+    assert set(resumed.ids) == {first[0].metadata["chunk_id"]}
+
+
+def test_manifest_remove_and_compact(tmp_path):
+    path = str(tmp_path / "index.jsonl")
+    chunks = assign_chunk_ids([chunk("a"), chunk("b"), chunk("c")])
+    manifest = IngestManifest(path, "model-1")
+    manifest.commit(chunks)
+    manifest.remove([chunks[0].metadata["chunk_id"]])
+    manifest.compact()
+
+    reloaded = IngestManifest(path, "model-1")
+    assert set(reloaded.ids) == {c.metadata["chunk_id"] for c in chunks[1:]}
+    with open(path, encoding="utf-8") as f:
+        assert len(f.readlines()) == 3  # header + 2 live ids
+
+
+def test_manifest_from_another_model_is_ignored(tmp_path):
+    path = str(tmp_path / "index.jsonl")
+    IngestManifest(path, "model-1").commit(assign_chunk_ids([chunk("a")]))
+    assert IngestManifest(path, "model-2").ids == {}
+
+
+def test_stale_ids_skip_sources_that_failed_to_load(tmp_path):
+    manifest = IngestManifest(str(tmp_path / "index.jsonl"), "model-1")
+    old = assign_chunk_ids([chunk("fee table", "fees.txt"), chunk("fleet", "https://mhcockpit.com/our-fleet/"),
+                            chunk("old hostel text", "hostel.txt")])
+    manifest.commit(old)
+    current = {c.metadata["chunk_id"] for c in assign_chunk_ids([chunk("fee table", "fees.txt"),
+                                                                 chunk("new hostel text", "hostel.txt")])}
+
+    # The website didn't load this run: its chunks stay, the rewritten hostel chunk goes
+    stale = manifest.stale(current, keep_sources={"https://mhcockpit.com/our-fleet/"})
+    assert stale == {old[2].metadata["chunk_id"]}
+    assert manifest.stale(current) == {old[1].metadata["chunk_id"], old[2].metadata["chunk_id"]}
+
+
+def test_iter_documents_reports_failed_sources(tmp_path):
+    good = tmp_path / "courses.txt"
+    good.write_text("CPL and B.Sc Aviation", encoding="utf-8")
+    bad = tmp_path / "fees.txt"
+    bad.write_bytes(b"\xff\xfe not utf-8 \xff")
+
+    failed = set()
+    docs = list(iter_documents(str(tmp_path), processes=1, threads=2, failed=failed))
+    assert [d.metadata["source"] for d in docs] == [str(good)]
+    assert failed == {str(bad)}
+
+
+class StubBrowser:
+    """AsyncChromiumLoader stand-in: like it, returns the error as page content instead of raising."""
+
+    def __init__(self, pages):
+        self.pages = pages
+
+    async def ascrape_playwright(self, url):
+        return self.pages[url]
+
+
+def test_pages_that_fail_to_render_are_reported(monkeypatch, tmp_path):
+    import functools
+    from scripts import loaders
+    pages = {"https://mhcockpit.com/our-fleet/": "Error: timeout", "https://mhcockpit.com/fees/": "   "}
+    monkeypatch.setattr(loaders, "_fetch_pages",
+                        functools.partial(loaders._fetch_pages, loader=StubBrowser(pages)))
+
+    failed = set()
+    docs = list(iter_documents(str(tmp_path), urls=list(pages), processes=1, threads=2, failed=failed))
+    assert docs == []  # the error text is never indexed
+    assert failed == set(pages)
+
+
+def test_only_the_failed_pages_are_marked(monkeypatch, tmp_path):
+    pytest.importorskip("langchain_community")
+    import functools
+    from scripts import loaders
+    pages = {"https://mhcockpit.com/our-fleet/": "Error: timeout",
+             "https://mhcockpit.com/courses/": "<html><body><p>CPL and B.Sc Aviation</p></body></html>"}
+    monkeypatch.setattr(loaders, "_fetch_pages",
+                        functools.partial(loaders._fetch_pages, loader=StubBrowser(pages)))
+
+    failed = set()
+    docs = list(iter_documents(str(tmp_path), urls=list(pages), processes=1, threads=2, failed=failed))
+    assert [d.metadata["source"] for d in docs] == ["https://mhcockpit.com/courses/"]
+    assert failed == {"https://mhcockpit.com/our-fleet/"}
@@ -0,0 +1,118 @@
+import asyncio
+import threading
+
+from backend.outbox import ChatOutbox
+
+
+class Writer:
+    """Records writes; raises for entries whose content is in `poison`, or for everything while `down`."""
+
+    def __init__(self, poison=()):
+        self.poison = set(poison)
+        self.down = False
+        self.writes = []
+
+    def __call__(self, email, entries):
+        if self.down or any(e["content"] in self.poison for e in entries):
+            raise RuntimeError("ValidationException")
+        self.writes.append((email, [e["content"] for e in entries]))
+
+
+def outbox(tmp_path, writer, **kwargs):
+    return ChatOutbox(writer, path=str(tmp_path / "outbox.db"), background=False, **kwargs)
+
+
+def entries(*contents):
+    return [{"content": c} for c in contents]
+
+
+def test_entries_are_merged_per_email_in_order(tmp_path):
+    writer = Writer()
+    box = outbox(tmp_path, writer)
+    box.enqueue("a@example.com", entries("hi", "welcome"))
+    box.enqueue("b@example.com", entries("fees?"))
+    box.enqueue("a@example.com", entries("courses?", "CPL"))
+
+    assert box.drain_once() == 5
+    assert sorted(writer.writes) == [("a@example.com", ["hi", "welcome", "courses?", "CPL"]),
+                                     ("b@example.com", ["fees?"])]
+    assert box.pending() == 0
+
+
+def test_failed_write_is_kept_and_backs_off(tmp_path):
+    writer = Writer()
+    box = outbox(tmp_path, writer)
+    box.enqueue("a@example.com", entries("hi"))
+    writer.down = True
+    box.drain_once()
+
+    writer.down = False
+    assert box.pending() == 1
+    assert box.drain_once() == 0  # still backing off
+    assert box.flush(timeout=1) is False  # nothing due: returns instead of spinning
+
+
+def test_poison_entry_is_dead_lettered_and_later_history_flows(tmp_path):
+    writer = Writer(poison={"bad"})
+    box = outbox(tmp_path, writer, max_attempts=1)
+    box.enqueue("a@example.com", entries("hi", "bad", "fees?"))
+
+    box.drain_once()
+    # Batch failed on its last attempt: retried entry by entry, only the poison one is parked
+    assert writer.writes == [("a@example.com", ["hi"]), ("a@example.com", ["fees?"])]
+    assert box.pending() == 0
+    assert box.dead_letters() == 1
+    assert box.stats["dead_lettered"] == 1
+
+    box.enqueue("a@example.com", entries("thanks"))
+    box.drain_once()
+    assert writer.writes[-1] == ("a@example.com", ["thanks"])
+
+
+def test_requeue_dead(tmp_path):
+    writer = Writer(poison={"bad"})
+    box = outbox(tmp_path, writer, max_attempts=1)
+    box.enqueue("a@example.com", entries("bad"))
+    box.drain_once()
+
+    writer.poison.clear()
+    assert box.requeue_dead("a@example.com") == 1
+    assert box.flush(timeout=1) is True
+    assert writer.writes == [("a@example.com", ["bad"])]
+    assert box.dead_letters() == 0
+
+
+def test_entries_survive_a_restart(tmp_path):
+    box = outbox(tmp_path, Writer())
+    box.enqueue("a@example.com", entries("hi"))
+    writer = Writer()
+    assert outbox(tmp_path, writer).flush(timeout=1) is True
+    assert writer.writes == [("a@example.com", ["hi"])]
+
+
+def test_without_background_nothing_drains_until_flush(tmp_path):
+    writer = Writer()
+    box = outbox(tmp_path, writer)
+    box.enqueue("a@example.com", entries("hi"))
+    assert box._thread is None
+    assert writer.writes == []
+    assert box.flush(timeout=1) is True
+
+
+def test_aenqueue_runs_off_the_event_loop(tmp_path):
+    box = outbox(tmp_path, Writer())
+    threads = []
+    enqueue = box.enqueue
+
+    def spy(email, rows):
+        threads.append(threading.current_thread())
+        enqueue(email, rows)
+    box.enqueue = spy
+
+    async def turn():
+        await box.aenqueue("a@example.com", entries("hi"))
+        return threading.current_thread()
+
+    loop_thread = asyncio.run(turn())
+    assert threads and threads[0] is not loop_thread
+    assert box.pending() == 1
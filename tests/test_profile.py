@@ -0,0 +1,59 @@
+import asyncio
+
+import pytest
+from langchain_core.messages import HumanMessage
+
+from backend import chatbot_graph
+
+GUEST = {"is_registered": False, "guest_count": 1, "post_reg_count": 0}
+
+
+def failing(*args, **kwargs):
+    raise RuntimeError("ProvisionedThroughputExceededException")
+
+
+def test_failed_profile_read_is_not_cached(monkeypatch):
+    async def read_fails(email):
+        failing()
+    monkeypatch.setattr(chatbot_graph, "aget_user_stats", read_fails)
+    state = {"email": "lead@example.com", "profile": None, "messages": [HumanMessage(content="fees?")]}
+    # No zero-count profile is stored, so the next turn reads DynamoDB again
+    assert asyncio.run(chatbot_graph.load_profile_node(state)) == {}
+
+
+def test_profile_is_read_once_per_session(monkeypatch):
+    reads = []
+
+    async def read(email):
+        reads.append(email)
+        return dict(GUEST)
+    monkeypatch.setattr(chatbot_graph, "aget_user_stats", read)
+    update = asyncio.run(chatbot_graph.load_profile_node({"email": "lead@example.com", "profile": None}))
+    assert update == {"profile": GUEST}
+    assert asyncio.run(chatbot_graph.load_profile_node({"email": "lead@example.com", "profile": GUEST})) == {}
+    assert reads == ["lead@example.com"]
+
+
+def test_count_question_writes_through(monkeypatch):
+    async def increment(email, is_registered):
+        return None
+    monkeypatch.setattr(chatbot_graph, "aincrement_counter", increment)
+    profile = asyncio.run(chatbot_graph.count_question({"email": "lead@example.com", "profile": GUEST}))
+    assert profile == {**GUEST, "guest_count": 2}
+
+
+def test_count_question_keeps_the_profile_when_the_write_fails(monkeypatch, capsys):
+    async def increment(email, is_registered):
+        failing()
+    monkeypatch.setattr(chatbot_graph, "aincrement_counter", increment)
+    profile = asyncio.run(chatbot_graph.count_question({"email": "lead@example.com", "profile": GUEST}))
+    assert profile == GUEST
+    assert "⚠️ Question not counted" in capsys.readouterr().out
+
+
+def test_count_question_does_not_swallow_cancellation(monkeypatch):
+    async def increment(email, is_registered):
+        raise asyncio.CancelledError()
+    monkeypatch.setattr(chatbot_graph, "aincrement_counter", increment)
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(chatbot_graph.count_question({"email": "lead@example.com", "profile": GUEST}))
@@ -0,0 +1,113 @@
+import pytest
+
+from scripts.rate_limiter import AdaptiveRateLimiter
+
+
+class FakeClock:
+    """Virtual time: sleeping just moves the clock."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def throughput(rate_per_min, batch=50, batches=40, **kwargs):
+    """Texts/min the limiter lets through for `batches` calls of `batch` texts."""
+    clock = FakeClock()
+    limiter = AdaptiveRateLimiter(rate_per_min, clock=clock, sleep=clock.sleep, **kwargs)
+    for _ in range(batches):
+        limiter.acquire(batch)
+    return batch * batches / clock.now * 60, limiter
+
+
+@pytest.mark.parametrize("rate", [600, 150, 30])
+def test_batches_larger_than_the_bucket_run_at_the_configured_rate(rate):
+    # 50-text batches against a 2 s bucket (20 texts at 600/min): the whole batch is charged
+    observed, _ = throughput(rate)
+    assert observed == pytest.approx(rate, rel=0.05)
+
+
+def test_small_batches_run_at_the_configured_rate():
+    observed, _ = throughput(600, batch=5, batches=400)
+    assert observed == pytest.approx(600, rel=0.05)
+
+
+def test_throttle_halves_the_real_rate():
+    clock = FakeClock()
+    limiter = AdaptiveRateLimiter(600, clock=clock, sleep=clock.sleep, pause_seconds=0)
+    limiter.acquire(50)
+    limiter.on_rate_limited()
+    assert limiter.rate_per_min() == 300
+    assert limiter.ceiling == 10.0
+
+    started = clock.now
+    for _ in range(20):
+        limiter.acquire(50)
+    assert 50 * 20 / (clock.now - started) * 60 == pytest.approx(300, rel=0.05)
+
+
+def test_throttle_pauses_every_caller():
+    clock = FakeClock()
+    limiter = AdaptiveRateLimiter(600, clock=clock, sleep=clock.sleep, pause_seconds=5)
+    limiter.on_rate_limited()
+    limiter.acquire(1)
+    assert clock.now >= 5
+
+
+def test_throttles_inside_one_pause_count_once():
+    clock = FakeClock()
+    limiter = AdaptiveRateLimiter(600, clock=clock, sleep=clock.sleep, pause_seconds=5)
+    limiter.on_rate_limited()
+    limiter.on_rate_limited()
+    assert limiter.rate_per_min() == 300
+    assert limiter.stats["throttles"] == 2
+
+
+def test_rate_recovers_towards_the_learned_quota():
+    clock = FakeClock()
+    limiter = AdaptiveRateLimiter(600, clock=clock, sleep=clock.sleep, increase_after=1, pause_seconds=0)
+    limiter.on_rate_limited()
+    rates = [limiter.rate_per_min()]
+    for _ in range(10):
+        limiter.on_success()
+        rates.append(limiter.rate_per_min())
+    # +20% per step below 90% of the quota that was throttled, then a 2% probe
+    for before, after in zip(rates, rates[1:]):
+        step = 1.2 if before < 540 else 1.02
+        assert after == pytest.approx(before * step, rel=0.01)
+    assert rates[-1] > 600
+
+
+def test_with_retries_gives_up_after_max_throttles():
+    ingest = pytest.importorskip("scripts.ingest")
+    clock = FakeClock()
+    limiter = AdaptiveRateLimiter(600, clock=clock, sleep=clock.sleep, pause_seconds=0)
+    calls = []
+
+    def always_throttled():
+        calls.append(1)
+        raise RuntimeError("429 RESOURCE_EXHAUSTED")
+
+    with pytest.raises(RuntimeError):
+        ingest.with_retries(always_throttled, limiter, cost=50, max_throttles=4)
+    assert len(calls) == 4
+    assert limiter.stats["throttles"] == 4
+
+
+def test_with_retries_returns_after_a_throttle():
+    ingest = pytest.importorskip("scripts.ingest")
+    clock = FakeClock()
+    limiter = AdaptiveRateLimiter(600, clock=clock, sleep=clock.sleep, pause_seconds=0)
+    results = iter([RuntimeError("429"), "vectors"])
+
+    def flaky():
+        result = next(results)
+        if isinstance(result, Exception): raise result
+        return result
+
+    assert ingest.with_retries(flaky, limiter, cost=50) == "vectors"
@@ -0,0 +1,138 @@
+import asyncio
+
+import pytest
+from langchain_core.messages import HumanMessage
+
+from backend import chatbot_graph
+from backend.resilience import BreakerOpen, CircuitBreaker, call_with_backoff
+
+THROTTLE = RuntimeError("429 RESOURCE_EXHAUSTED")
+
+
+def opened(cooldown=30.0):
+    breaker = CircuitBreaker("test", threshold=2, window=30, cooldown=cooldown)
+    breaker.record_failure(THROTTLE)
+    breaker.record_failure(THROTTLE)
+    assert breaker.state == "open"
+    return breaker
+
+
+def half_open():
+    breaker = opened()
+    breaker._opened_at -= breaker.cooldown  # the cooldown has passed
+    return breaker
+
+
+def test_throttles_open_the_breaker_other_errors_dont():
+    breaker = CircuitBreaker("test", threshold=2, window=30, cooldown=30)
+    breaker.record_failure(ValueError("bad request"))
+    breaker.record_failure(ValueError("bad request"))
+    assert breaker.state == "closed"
+    breaker.record_failure(THROTTLE)
+    breaker.record_failure(THROTTLE)
+    assert breaker.state == "open"
+    assert not breaker.allow()
+    assert breaker.snapshot()["rejected"] == 1
+
+
+def test_one_probe_after_the_cooldown_and_its_success_closes():
+    breaker = half_open()
+    assert breaker.allow()
+    assert not breaker.allow()  # only one probe at a time
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.allow() and breaker.allow()
+
+
+def test_throttled_probe_reopens():
+    breaker = half_open()
+    assert breaker.allow()
+    breaker.record_failure(THROTTLE)
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+
+def test_cancelled_probe_frees_the_slot():
+    breaker = half_open()
+    started = asyncio.Event()
+
+    async def slow_call():
+        started.set()
+        await asyncio.sleep(60)
+
+    async def scenario():
+        probe = asyncio.create_task(call_with_backoff(breaker, slow_call))
+        await started.wait()
+        probe.cancel()  # the client disconnected mid-probe
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+
+    asyncio.run(scenario())
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+
+
+def test_a_probe_that_never_reports_back_expires():
+    breaker = half_open()
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker._probe_started -= breaker.cooldown
+    assert breaker.allow()
+
+
+def test_call_with_backoff_retries_then_raises(monkeypatch):
+    monkeypatch.setattr("backend.resilience.backoff_delay", lambda attempt: 0)
+    breaker = CircuitBreaker("test", threshold=10, window=30, cooldown=30)
+    calls = []
+
+    async def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise THROTTLE
+        return "ok"
+
+    assert asyncio.run(call_with_backoff(breaker, flaky, attempts=3)) == "ok"
+    calls.clear()
+    with pytest.raises(RuntimeError):
+        asyncio.run(call_with_backoff(breaker, flaky, attempts=2))
+    assert len(calls) == 2
+
+
+def test_open_breaker_refuses_without_calling():
+    async def never():
+        raise AssertionError("called through an open breaker")
+
+    with pytest.raises(BreakerOpen):
+        asyncio.run(call_with_backoff(opened(), never))
+
+
+def test_cancelled_small_talk_probe_frees_the_gemini_breaker(monkeypatch):
+    breaker = half_open()
+    monkeypatch.setattr(chatbot_graph, "llm_breaker", breaker)
+
+    class HangingLLM:
+        async def astream(self, messages):
+            await asyncio.sleep(60)
+            yield None
+
+    monkeypatch.setattr(chatbot_graph, "llm", HangingLLM())
+
+    async def scenario():
+        turn = asyncio.create_task(chatbot_graph.generate_small_talk(HumanMessage(content="hi")))
+        await asyncio.sleep(0.01)
+        turn.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await turn
+
+    asyncio.run(scenario())
+    assert breaker.allow()
+
+
+def test_degraded_reply_keeps_the_normal_cache_threshold(monkeypatch):
+    cache = chatbot_graph.SemanticAnswerCache(threshold=0.95)
+    monkeypatch.setattr(chatbot_graph, "answer_cache", cache)
+    cache.put([1.0, 0.0], "Our CPL course takes 18 months.", 1)
+    # cosine 0.89: close, but another question; its answer must not be served
+    reply = chatbot_graph.degraded_reply([0.89, 0.456], 1, [])
+    assert reply == chatbot_graph.BUSY_REPLY
+    assert chatbot_graph.degraded_reply([1.0, 0.01], 1, []) == "Our CPL course takes 18 months."
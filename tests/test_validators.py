@@ -0,0 +1,118 @@
+import asyncio
+
+import pytest
+
+from backend import validators
+from backend.validators import DeliverabilityChecker, StubResolver
+
+
+class FakeTime:
+    """Stands in for the `time` module inside backend.validators (cache expiry only)."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeTime()
+    monkeypatch.setattr(validators, "time", fake)
+    return fake
+
+
+def checker(records=None, **kwargs):
+    resolver = kwargs.pop("resolver", None) or StubResolver(records)
+    return DeliverabilityChecker(resolver=resolver, preload=(), **kwargs)
+
+
+def check(c, domain, budget=None):
+    return asyncio.run(c.check(domain, budget=budget))
+
+
+def test_mx_record_is_deliverable():
+    assert check(checker({"academy.in": {"MX": ["10 mail.academy.in."]}}), "Academy.IN") is True
+
+
+def test_null_mx_takes_no_mail():
+    c = checker({"nomail.example": {"MX": ["0 ."], "A": ["192.0.2.1"]}})
+    assert check(c, "nomail.example") is False
+    assert c.snapshot()["undeliverable"] == 1
+
+
+def test_implicit_mx_falls_back_to_the_a_record():
+    assert check(checker({"webonly.example": {"MX": [], "A": ["192.0.2.1"]}}), "webonly.example") is True
+    assert check(checker({"aaaa.example": {"MX": [], "AAAA": ["2001:db8::1"]}}), "aaaa.example") is True
+    assert check(checker({"bare.example": {"MX": []}}), "bare.example") is False
+
+
+def test_missing_domain_is_remembered_for_the_negative_ttl(clock):
+    resolver = StubResolver({})
+    c = checker(resolver=resolver, ttl=3600, negative_ttl=60)
+    assert check(c, "typo.example") is False
+    assert check(c, "typo.example") is False
+    assert resolver.calls == 1
+    clock.now += 61
+    assert check(c, "typo.example") is False
+    assert resolver.calls == 2
+
+
+def test_deliverable_domain_is_kept_for_the_full_ttl(clock):
+    resolver = StubResolver({"academy.in": {"MX": ["10 mail.academy.in."]}})
+    c = checker(resolver=resolver, ttl=3600, negative_ttl=60)
+    check(c, "academy.in")
+    clock.now += 3599
+    assert check(c, "academy.in") is True
+    assert resolver.calls == 1
+
+
+def test_dns_failure_is_unknown_and_not_cached():
+    resolver = StubResolver({}, failing={"flaky.example"})
+    c = checker(resolver=resolver)
+    assert check(c, "flaky.example") is None
+    assert check(c, "flaky.example") is None
+    assert resolver.calls == 2
+    assert c.snapshot()["errors"] == 2
+
+
+def test_budget_timeout_returns_none_and_the_lookup_still_fills_the_cache():
+    resolver = StubResolver({"slow.example": {"MX": ["10 mx.slow.example."]}}, delay=0.05)
+    c = checker(resolver=resolver)
+
+    async def scenario():
+        first = await c.check("slow.example", budget=0.01)
+        await asyncio.sleep(0.1)  # the shielded lookup carries on
+        return first, c.cached("slow.example")
+
+    assert asyncio.run(scenario()) == (None, True)
+    assert c.snapshot()["timeouts"] == 1
+    assert resolver.calls == 1
+
+
+def test_concurrent_checks_share_one_lookup():
+    resolver = StubResolver({"academy.in": {"MX": ["10 mail.academy.in."]}}, delay=0.02)
+    c = checker(resolver=resolver)
+
+    async def scenario():
+        return await asyncio.gather(*(c.check("academy.in") for _ in range(20)))
+
+    assert asyncio.run(scenario()) == [True] * 20
+    assert resolver.calls == 1  # one MX lookup for all 20
+
+
+def test_common_providers_are_never_looked_up():
+    resolver = StubResolver({})
+    c = DeliverabilityChecker(resolver=resolver)
+    assert check(c, "gmail.com") is True
+    assert resolver.calls == 0
+    assert c.snapshot()["preloaded"] == 1
+
+
+def test_acheck_email_rejects_a_domain_without_mail():
+    email_validator = pytest.importorskip("email_validator")
+    c = checker({"nomail.example": {"MX": ["0 ."]}, "academy.in": {"MX": ["10 mail.academy.in."]}})
+    assert asyncio.run(validators.acheck_email("Lead@Academy.in", checker=c)) == "Lead@academy.in"
+    with pytest.raises(email_validator.EmailNotValidError):
+        asyncio.run(validators.acheck_email("lead@nomail.example", checker=c))